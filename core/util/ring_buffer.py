@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains Qudi data structures for fixed length traces of streamed data.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import bisect
+import collections
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Circular buffer holding the last <length> values of one or more channels.
+
+    Each value is written twice into an array of twice the length, so the trace (oldest value
+    first) is always available as contiguous view without rolling or copying the data. Appending a
+    value per channel therefore costs two writes instead of a copy of the whole trace.
+    The view returned by data is only valid until the next call of append or set_last.
+    """
+
+    def __init__(self, length, channels=1, dtype='float64', fill_value=0):
+        """
+        @param int length: The number of values per channel held in the buffer
+        @param int channels: The number of channels
+        @param str dtype: The data type of the values
+        @param fill_value: The value the buffer is initially filled with
+        """
+        self._length = max(int(length), 1)
+        self._buffer = np.full((int(channels), 2 * self._length), fill_value, dtype=dtype)
+        self._index = 0
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def channels(self):
+        return self._buffer.shape[0]
+
+    @property
+    def data(self):
+        """ View of the buffered values with shape (channels, length), oldest value first.
+        """
+        return self._buffer[:, self._index:self._index + self._length]
+
+    def clear(self, fill_value=0):
+        """ Fills the whole buffer with fill_value.
+
+        @param fill_value: The value to fill the buffer with
+        """
+        self._buffer[:] = fill_value
+        self._index = 0
+
+    def append(self, values):
+        """ Appends one value per channel or a number of values per channel.
+
+        @param numpy.ndarray values: array of shape (channels,) holding one value per channel or
+                                     array of shape (channels, n) holding n values per channel
+        """
+        values = np.asarray(values)
+        if values.ndim < 2:
+            values = values.reshape(self.channels, 1)
+        number = values.shape[1]
+        if number >= self._length:
+            self._buffer[:, :self._length] = values[:, -self._length:]
+            self._buffer[:, self._length:] = values[:, -self._length:]
+            self._index = 0
+            return
+        first = min(number, self._length - self._index)
+        self._buffer[:, self._index:self._index + first] = values[:, :first]
+        self._buffer[:, self._index + self._length:self._index + self._length + first] = \
+            values[:, :first]
+        if first < number:
+            rest = number - first
+            self._buffer[:, :rest] = values[:, first:]
+            self._buffer[:, self._length:self._length + rest] = values[:, first:]
+        self._index = (self._index + number) % self._length
+
+    def set_last(self, values, number):
+        """ Overwrites the last values of each channel with a constant value per channel.
+
+        @param numpy.ndarray values: array of shape (channels,) holding one value per channel
+        @param int number: The number of newest values to overwrite
+        """
+        values = np.asarray(values).reshape(self.channels, 1)
+        number = min(int(number), self._length)
+        start = self._index + self._length - number
+        stop = self._index + self._length
+        self._buffer[:, start:stop] = values
+        # keep the other copy of the overwritten values consistent
+        if start < self._length:
+            self._buffer[:, start + self._length:min(stop, self._length) + self._length] = values
+        if stop > self._length:
+            self._buffer[:, max(start, self._length) - self._length:stop - self._length] = values
+
+
+class RunningMedian:
+    """
+    Median over the last <window> values of one or more channels, updated with each new value.
+
+    Each channel keeps its window sorted, so an update costs a binary search and a single
+    insertion/removal instead of a full median calculation.
+    """
+
+    def __init__(self, window, channels=1):
+        """
+        @param int window: The number of values the median is taken over
+        @param int channels: The number of channels
+        """
+        self._window = max(int(window), 1)
+        self._values = [collections.deque() for _ in range(int(channels))]
+        self._sorted = [list() for _ in range(int(channels))]
+
+    def reset(self):
+        """ Discards all values.
+        """
+        for values, sorted_values in zip(self._values, self._sorted):
+            values.clear()
+            sorted_values.clear()
+
+    def update(self, values):
+        """ Adds one value per channel and returns the new median of each channel.
+
+        @param numpy.ndarray values: array of shape (channels,) holding one value per channel
+
+        @return numpy.ndarray: The median of each channel
+        """
+        medians = np.empty(len(self._values), dtype='float64')
+        for ch, value in enumerate(np.asarray(values, dtype='float64').ravel()):
+            window_values = self._values[ch]
+            sorted_values = self._sorted[ch]
+            if len(window_values) == self._window:
+                del sorted_values[bisect.bisect_left(sorted_values, window_values.popleft())]
+            window_values.append(value)
+            bisect.insort(sorted_values, value)
+            middle = len(sorted_values) // 2
+            if len(sorted_values) % 2:
+                medians[ch] = sorted_values[middle]
+            else:
+                medians[ch] = (sorted_values[middle - 1] + sorted_values[middle]) / 2
+        return medians
+
+
+class RunningMean:
+    """
+    Mean over the last <window> values of one or more channels, updated with each new value.
+
+    Keeps a running sum per channel, which is recalculated once per window to avoid the
+    accumulation of rounding errors.
+    """
+
+    def __init__(self, window, channels=1):
+        """
+        @param int window: The number of values the mean is taken over
+        @param int channels: The number of channels
+        """
+        self._window = max(int(window), 1)
+        self._values = RingBuffer(self._window, channels)
+        self._sum = np.zeros(int(channels), dtype='float64')
+        self._count = 0
+
+    def reset(self):
+        """ Discards all values.
+        """
+        self._values.clear()
+        self._sum[:] = 0
+        self._count = 0
+
+    def update(self, values):
+        """ Adds one value per channel and returns the new mean of each channel.
+
+        @param numpy.ndarray values: array of shape (channels,) holding one value per channel
+
+        @return numpy.ndarray: The mean of each channel
+        """
+        values = np.asarray(values, dtype='float64').ravel()
+        # The oldest value drops out of the window (0 while the window is not filled)
+        self._sum += values - self._values.data[:, 0]
+        self._values.append(values)
+        self._count += 1
+        if self._count % self._window == 0:
+            self._sum = self._values.data.sum(axis=1)
+        return self._sum / min(self._count, self._window)
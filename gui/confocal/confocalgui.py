@@ -38,6 +38,63 @@ from qtpy import QtWidgets
 from qtpy import uic
 
 
+class SortedImageValues:
+    """
+    Keeps the nonzero values of an image sorted, so percentiles of the image are available without
+    sorting the whole image each time some of its lines change.
+    """
+
+    def __init__(self):
+        self._image = None
+        self._sorted = np.empty(0)
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def reset(self, image):
+        """ Sorts all values of a new image.
+
+        @param numpy.ndarray image: the image (lines, pixels)
+        """
+        self._image = np.array(image, dtype='float64')
+        self._sorted = np.sort(self._image[np.nonzero(self._image)])
+
+    def update_lines(self, image, start, stop):
+        """ Replaces the values of the lines [start, stop) by the ones of image.
+
+        @param numpy.ndarray image: the image (lines, pixels)
+        @param int start: the first changed line
+        @param int stop: the last changed line + 1
+        """
+        if self._image is None or self._image.shape != np.shape(image):
+            self.reset(image)
+            return
+        old_values = self._image[start:stop]
+        old_values = np.sort(old_values[np.nonzero(old_values)])
+        self._image[start:stop] = image[start:stop]
+        new_values = self._image[start:stop]
+        new_values = np.sort(new_values[np.nonzero(new_values)])
+
+        # equal values are removed one after the other
+        indices = np.searchsorted(self._sorted, old_values) \
+                  + np.arange(len(old_values)) - np.searchsorted(old_values, old_values)
+        self._sorted = np.delete(self._sorted, indices)
+        self._sorted = np.insert(self._sorted, np.searchsorted(self._sorted, new_values),
+                                 new_values)
+
+    def percentile(self, centile):
+        """ Percentile of the nonzero values with linear interpolation (like numpy.percentile).
+
+        @param float centile: the percentile in %
+
+        @return float: the percentile
+        """
+        position = min(max(centile, 0), 100) / 100 * (len(self._sorted) - 1)
+        index = int(position)
+        upper = min(index + 1, len(self._sorted) - 1)
+        return self._sorted[index] + (self._sorted[upper] - self._sorted[index]) * (position - index)
+
+
 class ConfocalMainWindow(QtWidgets.QMainWindow):
     """ Create the Mainwindow based on the corresponding *.ui file. """
 
@@ -109,6 +166,8 @@ class ConfocalGui(GUIBase):
     image_z_padding = ConfigOption('image_z_padding', 0.02)
 
     default_meter_prefix = ConfigOption('default_meter_prefix', None)  # assume the unit prefix of position spinbox
+    # maximal number of image refreshes per second while scanning (0: refresh after every update)
+    max_image_frame_rate = ConfigOption('max_image_frame_rate', 20)
 
     # status var
     adjust_cursor_roi = StatusVar(default=True)
@@ -174,6 +233,25 @@ class ConfocalGui(GUIBase):
         self.xy_image = ScanImageItem(image=raw_data_xy, axisOrder='row-major')
         self.depth_image = ScanImageItem(image=raw_data_depth, axisOrder='row-major')
 
+        # The nonzero values of the displayed images are kept sorted for the colour scale.
+        self._xy_values = SortedImageValues()
+        self._xy_values.reset(raw_data_xy)
+        self._depth_values = SortedImageValues()
+        self._depth_values.reset(raw_data_depth)
+
+        # Lines changed during a scan are collected and refreshed by these timers, so the images
+        # are refreshed at most max_image_frame_rate times per second.
+        self._xy_changed_lines = None
+        self._depth_changed_lines = None
+        self._xy_last_refresh = 0
+        self._depth_last_refresh = 0
+        self._xy_refresh_timer = QtCore.QTimer()
+        self._xy_refresh_timer.setSingleShot(True)
+        self._xy_refresh_timer.timeout.connect(self.refresh_xy_image_lines)
+        self._depth_refresh_timer = QtCore.QTimer()
+        self._depth_refresh_timer.setSingleShot(True)
+        self._depth_refresh_timer.timeout.connect(self.refresh_depth_image_lines)
+
         # Hide tilt correction window
         self._mw.tilt_correction_dockWidget.hide()
 
@@ -474,6 +552,8 @@ class ConfocalGui(GUIBase):
         self._scanning_logic.signal_xy_image_updated.connect(self.refresh_scan_line)
         self._scanning_logic.signal_depth_image_updated.connect(self.refresh_scan_line)
         self._scanning_logic.signal_depth_image_updated.connect(self.refresh_depth_image)
+        self._scanning_logic.sigImageXYLinesUpdated.connect(self.xy_image_lines_updated)
+        self._scanning_logic.sigImageDepthLinesUpdated.connect(self.depth_image_lines_updated)
         self._optimizer_logic.sigImageUpdated.connect(self.refresh_refocus_image)
         self._scanning_logic.sigImageXYInitialized.connect(self.adjust_xy_window)
         self._scanning_logic.sigImageDepthInitialized.connect(self.adjust_depth_window)
@@ -628,6 +708,8 @@ class ConfocalGui(GUIBase):
 
         @return int: error code (0:OK, -1:error)
         """
+        self._xy_refresh_timer.stop()
+        self._depth_refresh_timer.stop()
         self._mw.close()
         return 0
 
@@ -685,21 +767,20 @@ class ConfocalGui(GUIBase):
         """ Determines the cb_min and cb_max values for the xy scan image
         """
         # If "Manual" is checked, or the image data is empty (all zeros), then take manual cb range.
-        if self._mw.xy_cb_manual_RadioButton.isChecked() or np.count_nonzero(self.xy_image.image) < 1:
+        if self._mw.xy_cb_manual_RadioButton.isChecked() or len(self._xy_values) < 1:
             cb_min = self._mw.xy_cb_min_DoubleSpinBox.value()
             cb_max = self._mw.xy_cb_max_DoubleSpinBox.value()
 
         # Otherwise, calculate cb range from percentiles.
         else:
-            # Exclude any zeros (which are typically due to unfinished scan)
-            xy_image_nonzero = self.xy_image.image[np.nonzero(self.xy_image.image)]
+            # Zeros (which are typically due to unfinished scan) are excluded from the sorted values
 
             # Read centile range
             low_centile = self._mw.xy_cb_low_percentile_DoubleSpinBox.value()
             high_centile = self._mw.xy_cb_high_percentile_DoubleSpinBox.value()
 
-            cb_min = np.percentile(xy_image_nonzero, low_centile)
-            cb_max = np.percentile(xy_image_nonzero, high_centile)
+            cb_min = self._xy_values.percentile(low_centile)
+            cb_max = self._xy_values.percentile(high_centile)
 
         cb_range = [cb_min, cb_max]
 
@@ -709,21 +790,20 @@ class ConfocalGui(GUIBase):
         """ Determines the cb_min and cb_max values for the xy scan image
         """
         # If "Manual" is checked, or the image data is empty (all zeros), then take manual cb range.
-        if self._mw.depth_cb_manual_RadioButton.isChecked() or np.count_nonzero(self.depth_image.image) < 1:
+        if self._mw.depth_cb_manual_RadioButton.isChecked() or len(self._depth_values) < 1:
             cb_min = self._mw.depth_cb_min_DoubleSpinBox.value()
             cb_max = self._mw.depth_cb_max_DoubleSpinBox.value()
 
         # Otherwise, calculate cb range from percentiles.
         else:
-            # Exclude any zeros (which are typically due to unfinished scan)
-            depth_image_nonzero = self.depth_image.image[np.nonzero(self.depth_image.image)]
+            # Zeros (which are typically due to unfinished scan) are excluded from the sorted values
 
             # Read centile range
             low_centile = self._mw.depth_cb_low_percentile_DoubleSpinBox.value()
             high_centile = self._mw.depth_cb_high_percentile_DoubleSpinBox.value()
 
-            cb_min = np.percentile(depth_image_nonzero, low_centile)
-            cb_max = np.percentile(depth_image_nonzero, high_centile)
+            cb_min = self._depth_values.percentile(low_centile)
+            cb_max = self._depth_values.percentile(high_centile)
 
         cb_range = [cb_min, cb_max]
         return cb_range
@@ -1362,11 +1442,15 @@ class ConfocalGui(GUIBase):
 
         xy_image_data = self._scanning_logic.xy_image[:, :, 3 + self.xy_channel]
 
+        # Lines changed before are contained in the new image
+        self._xy_changed_lines = None
+        self.xy_image.setImage(image=xy_image_data, autoLevels=False)
+        self._xy_values.reset(self.xy_image.image)
         cb_range = self.get_xy_cb_range()
 
         # Now update image with new color scale, and update colorbar
-        self.xy_image.setImage(image=xy_image_data, levels=(cb_range[0], cb_range[1]))
-        self.refresh_xy_colorbar()
+        self.xy_image.setLevels((cb_range[0], cb_range[1]))
+        self.xy_cb.refresh_colorbar(cb_range[0], cb_range[1])
 
         # Unlock state widget if scan is finished
         if self._scanning_logic.module_state() != 'locked':
@@ -1382,16 +1466,119 @@ class ConfocalGui(GUIBase):
         self.depth_image.getViewBox().enableAutoRange()
 
         depth_image_data = self._scanning_logic.depth_image[:, :, 3 + self.depth_channel]
+
+        # Lines changed before are contained in the new image
+        self._depth_changed_lines = None
+        self.depth_image.setImage(image=depth_image_data, autoLevels=False)
+        self._depth_values.reset(self.depth_image.image)
         cb_range = self.get_depth_cb_range()
 
         # Now update image with new color scale, and update colorbar
-        self.depth_image.setImage(image=depth_image_data, levels=(cb_range[0], cb_range[1]))
-        self.refresh_depth_colorbar()
+        self.depth_image.setLevels((cb_range[0], cb_range[1]))
+        self.depth_cb.refresh_colorbar(cb_range[0], cb_range[1])
 
         # Unlock state widget if scan is finished
         if self._scanning_logic.module_state() != 'locked':
             self.enable_scan_actions()
 
+    def xy_image_lines_updated(self, start, stop):
+        """ Collects the lines of the xy image changed during a scan and schedules their refresh.
+
+        @param int start: the first changed line
+        @param int stop: the last changed line + 1
+        """
+        if self._xy_changed_lines is None:
+            self._xy_changed_lines = [start, stop]
+        else:
+            self._xy_changed_lines = [min(start, self._xy_changed_lines[0]),
+                                      max(stop, self._xy_changed_lines[1])]
+        if not self._xy_refresh_timer.isActive():
+            self._xy_refresh_timer.start(self._get_refresh_delay(self._xy_last_refresh))
+
+    def depth_image_lines_updated(self, start, stop):
+        """ Collects the lines of the depth image changed during a scan and schedules their
+        refresh.
+
+        @param int start: the first changed line
+        @param int stop: the last changed line + 1
+        """
+        if self._depth_changed_lines is None:
+            self._depth_changed_lines = [start, stop]
+        else:
+            self._depth_changed_lines = [min(start, self._depth_changed_lines[0]),
+                                         max(stop, self._depth_changed_lines[1])]
+        if not self._depth_refresh_timer.isActive():
+            self._depth_refresh_timer.start(self._get_refresh_delay(self._depth_last_refresh))
+
+    def refresh_xy_image_lines(self):
+        """ Refreshes only the lines of the XY image changed since the last refresh.
+
+        The whole image is only rendered again if the colour scale changed noticeably.
+        """
+        self._xy_last_refresh = time.time()
+        if self._xy_changed_lines is None:
+            return
+        start, stop = self._xy_changed_lines
+        self._xy_changed_lines = None
+
+        xy_image_data = self._scanning_logic.xy_image[:, :, 3 + self.xy_channel]
+        # blink correction filters the whole image
+        if (self.xy_image.image is None or self.xy_image.use_blink_correction
+                or self.xy_image.image.shape != xy_image_data.shape):
+            self.refresh_xy_image()
+            return
+        self._xy_values.update_lines(xy_image_data, start, stop)
+        cb_range = self.get_xy_cb_range()
+        if self._colour_scale_changed(self.xy_image.levels, cb_range):
+            self.xy_image.setImage(image=xy_image_data, levels=(cb_range[0], cb_range[1]))
+            self.xy_cb.refresh_colorbar(cb_range[0], cb_range[1])
+        else:
+            self.xy_image.update_image_rows(xy_image_data, start, stop)
+        self.refresh_scan_line()
+
+    def refresh_depth_image_lines(self):
+        """ Refreshes only the lines of the depth image changed since the last refresh.
+
+        The whole image is only rendered again if the colour scale changed noticeably.
+        """
+        self._depth_last_refresh = time.time()
+        if self._depth_changed_lines is None:
+            return
+        start, stop = self._depth_changed_lines
+        self._depth_changed_lines = None
+
+        depth_image_data = self._scanning_logic.depth_image[:, :, 3 + self.depth_channel]
+        # blink correction filters the whole image
+        if (self.depth_image.image is None or self.depth_image.use_blink_correction
+                or self.depth_image.image.shape != depth_image_data.shape):
+            self.refresh_depth_image()
+            return
+        self._depth_values.update_lines(depth_image_data, start, stop)
+        cb_range = self.get_depth_cb_range()
+        if self._colour_scale_changed(self.depth_image.levels, cb_range):
+            self.depth_image.setImage(image=depth_image_data, levels=(cb_range[0], cb_range[1]))
+            self.depth_cb.refresh_colorbar(cb_range[0], cb_range[1])
+        else:
+            self.depth_image.update_image_rows(depth_image_data, start, stop)
+        self.refresh_scan_line()
+
+    def _get_refresh_delay(self, last_refresh):
+        """ Returns the time to wait until the next image refresh in ms. """
+        if self.max_image_frame_rate <= 0:
+            return 0
+        return max(int(1000 * (last_refresh + 1 / self.max_image_frame_rate - time.time())), 0)
+
+    @staticmethod
+    def _colour_scale_changed(levels, cb_range):
+        """ Checks if the colour scale changed by more than 1 % of its range, i.e. if the whole
+        image has to be rendered again.
+        """
+        if levels is None:
+            return True
+        tolerance = 0.01 * abs(levels[1] - levels[0])
+        return (abs(cb_range[0] - levels[0]) > tolerance
+                or abs(cb_range[1] - levels[1]) > tolerance)
+
     def refresh_refocus_image(self):
         """Refreshes the xy image, the crosshair and the colorbar. """
         ##########
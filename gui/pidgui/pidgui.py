@@ -198,18 +198,20 @@ class PIDGui(GUIBase):
         """
 
         if self._pid_logic.get_enabled():
+            # each access returns a copy of the history, so get it only once
+            history = self._pid_logic.history
             self._mw.process_value_Label.setText(
                 '<font color={0}>{1:,.3f}</font>'.format(
                 palette.c1.name(),
-                self._pid_logic.history[0, -1]))
+                history[0, -1]))
             self._mw.control_value_Label.setText(
                 '<font color={0}>{1:,.3f}</font>'.format(
                 palette.c3.name(),
-                self._pid_logic.history[1, -1]))
+                history[1, -1]))
             self._mw.setpoint_value_Label.setText(
                 '<font color={0}>{1:,.3f}</font>'.format(
                 palette.c2.name(),
-                self._pid_logic.history[2, -1]))
+                history[2, -1]))
             extra = self._pid_logic._controller.get_extra()
             if 'P' in extra:
                 self._mw.labelkP.setText('{0:,.6f}'.format(extra['P']))
@@ -218,15 +220,15 @@ class PIDGui(GUIBase):
             if 'D' in extra:
                 self._mw.labelkD.setText('{0:,.6f}'.format(extra['D']))
             self._curve1.setData(
-                y=self._pid_logic.history[0],
+                y=history[0],
                 x=np.arange(0, self._pid_logic.getBufferLength()) * self._pid_logic.timestep
                 )
             self._curve2.setData(
-                y=self._pid_logic.history[1],
+                y=history[1],
                 x=np.arange(0, self._pid_logic.getBufferLength()) * self._pid_logic.timestep
                 )
             self._curve3.setData(
-                y=self._pid_logic.history[2],
+                y=history[2],
                 x=np.arange(0, self._pid_logic.getBufferLength()) * self._pid_logic.timestep
                 )
 
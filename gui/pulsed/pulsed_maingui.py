@@ -805,14 +805,16 @@ class PulsedMeasurementGui(GUIBase):
         self.pulsedmasterlogic().set_timer_interval(timer_interval)
         return
 
-    @QtCore.Slot(float, int, float)
-    def measurement_timer_updated(self, elapsed_time, elapsed_sweeps, timer_interval):
+    @QtCore.Slot(float, int, float, dict)
+    def measurement_timer_updated(self, elapsed_time, elapsed_sweeps, timer_interval,
+                                  stage_latencies):
         """
         Refreshes the elapsed time and sweeps of the measurement.
 
         @param float elapsed_time:
         @param int elapsed_sweeps:
         @param float timer_interval:
+        @param dict stage_latencies: latencies of the analysis loop stages in seconds
         @return:
         """
         time_str = str(datetime.timedelta(seconds=elapsed_time)).rsplit('.', 1)[0]
@@ -824,6 +826,10 @@ class PulsedMeasurementGui(GUIBase):
         self._pa.time_param_elapsed_time_LineEdit.setText(time_str)
         self._pa.time_param_ana_periode_DoubleSpinBox.setValue(timer_interval)
         self._pa.time_param_elapsed_sweep_SpinBox.setValue(elapsed_sweeps)
+        self._pa.time_param_elapsed_time_LineEdit.setToolTip('\n'.join(
+            '{0}: {1}'.format(stage, value if stage == 'dropped_frames' else
+                              '{0:.1f} ms'.format(1000 * value))
+            for stage, value in stage_latencies.items()))
         # unblock signals
         self._pa.time_param_elapsed_time_LineEdit.blockSignals(False)
         self._pa.time_param_ana_periode_DoubleSpinBox.blockSignals(False)
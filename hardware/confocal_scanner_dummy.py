@@ -34,6 +34,8 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
     confocal_scanner_dummy:
         module.Class: 'confocal_scanner_dummy.ConfocalScannerDummy'
         clock_frequency: 100 # in Hz
+        number_of_nvs: 500 # optional, number of simulated NVs
+        simulate_timing: True # optional, False returns the counts without waiting for the scan
         fitlogic: 'fitlogic' # name of the fitlogic module, see default config
 
     """
@@ -46,17 +48,26 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
 
     # config
     _clock_frequency = ConfigOption('clock_frequency', 100, missing='warn')
+    # number of randomly distributed NVs
+    _num_points = ConfigOption('number_of_nvs', 500, missing='nothing')
+    # wait for the duration of a scan like the real hardware. Turn off for fast simulations.
+    _simulate_timing = ConfigOption('simulate_timing', True, missing='nothing')
+
+    # NVs further away from a pixel than this number of sigmas are neglected
+    _cutoff_sigmas = 5
 
     def __init__(self, config, **kwargs):
         super().__init__(config=config, **kwargs)
 
         # Internal parameters
         self._line_length = None
+        self._block_path = None
+        self._block_start_time = 0
+        self._block_read_pixels = 0
         self._voltage_range = [-10, 10]
 
         self._position_range = [[0, 100e-6], [0, 100e-6], [0, 100e-6], [0, 1e-6]]
         self._current_position = [0, 0, 0, 0][0:len(self.get_scanner_axes())]
-        self._num_points = 500
 
     def on_activate(self):
         """ Initialisation performed during activation of the module.
@@ -121,6 +132,8 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
         # offset
         self._points_z[:, 3] = 0
 
+        self._build_nv_index()
+
     def on_deactivate(self):
         """ Deactivate properly the confocal scanner dummy.
         """
@@ -236,7 +249,8 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
             self._clock_frequency = float(clock_frequency)
 
         self.log.debug('ConfocalScannerDummy>set_up_scanner_clock')
-        time.sleep(0.2)
+        if self._simulate_timing:
+            time.sleep(0.2)
         return 0
 
 
@@ -257,7 +271,8 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
         """
 
         self.log.debug('ConfocalScannerDummy>set_up_scanner')
-        time.sleep(0.2)
+        if self._simulate_timing:
+            time.sleep(0.2)
         return 0
 
 
@@ -276,7 +291,8 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
             self.log.error('A Scanner is already running, close this one first.')
             return -1
 
-        time.sleep(0.01)
+        if self._simulate_timing:
+            time.sleep(0.01)
 
         self._current_position = [x, y, z, a][0:len(self.get_scanner_axes())]
         return 0
@@ -317,29 +333,161 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
         if np.shape(line_path)[1] != self._line_length:
             self._set_up_line(np.shape(line_path)[1])
 
-        count_data = np.random.uniform(0, 2e4, self._line_length)
-        z_data = line_path[2, :]
+        count_data = self._simulate_counts(line_path)
 
-        #TODO: Change the gaussian function here to the one from fitlogic and delete the local modules to calculate
-        #the gaussian functions
-        x_data = np.array(line_path[0, :])
-        y_data = np.array(line_path[1, :])
-        for i in range(self._num_points):
-            count_data += self.twoD_gaussian_function((x_data, y_data), *(self._points[i])
-                ) * self.gaussian_function(np.array(z_data), *(self._points_z[i]))
-
-        time.sleep(self._line_length * 1. / self._clock_frequency)
-        time.sleep(self._line_length * 1. / self._clock_frequency)
+        if self._simulate_timing:
+            time.sleep(self._line_length * 1. / self._clock_frequency)
 
         # update the scanner position instance variable
         self._current_position = list(line_path[:, -1])
 
+        return count_data
+
+    def start_block_scan(self, block_path=None, pixel_clock=False):
+        """ Starts scanning a block of several lines (including the return paths in between) as
+        one hardware timed waveform. The counts are fetched with read_block_scan while the block
+        is scanned.
+
+        @param float[k][n] block_path: array k of n-part tuples defining the pixel positions of
+                                       the whole block
+        @param bool pixel_clock: whether we need to output a pixel clock for this block
+
+        @return int: error code (0:OK, -1:error or block scanning not supported)
+        """
+        if not isinstance(block_path, (frozenset, list, set, tuple, np.ndarray, )):
+            self.log.error('Given voltage list is no array type.')
+            return -1
+
+        self._block_path = np.array(block_path)
+        self._block_read_pixels = 0
+        self._block_start_time = time.time()
+        return 0
+
+    def read_block_scan(self):
+        """ Returns the counts of the pixels of the running block scan, which were acquired since
+        the last call. The block scan is finished after the counts of all n pixels were returned.
+
+        @return float[j][m]: the photon counts per second for j new pixels with m channels
+                             (j may be 0). [[-1.]] on error.
+        """
+        if self._block_path is None:
+            self.log.error('No block scan running.')
+            return np.array([[-1.]])
+
+        # Simulate the timing of scan_line, i.e. one clock cycle per pixel
+        if self._simulate_timing:
+            acquired = int((time.time() - self._block_start_time) * self._clock_frequency)
+            acquired = min(acquired, self._block_path.shape[1])
+        else:
+            acquired = self._block_path.shape[1]
+        count_data = self._simulate_counts(self._block_path[:, self._block_read_pixels:acquired])
+        self._block_read_pixels = acquired
+
+        if acquired == self._block_path.shape[1]:
+            # update the scanner position instance variable
+            self._current_position = list(self._block_path[:, -1])
+            self._block_path = None
+        return count_data
+
+    def stop_block_scan(self):
+        """ Stops a running block scan (e.g. to abort a scan) and cleans up afterwards.
+
+        @return int: error code (0:OK, -1:error)
+        """
+        if self._block_path is not None:
+            self._current_position = list(self._block_path[:, max(self._block_read_pixels - 1, 0)])
+            self._block_path = None
+        return 0
+
+    def _simulate_counts(self, path):
+        """ Simulates the count rates of the dummy NVs along a path.
+
+        @param float[k][n] path: array k of n-part tuples defining the pixel positions
+
+        @return float[n][3]: the simulated photon counts per second of the 3 channels
+        """
+        path = np.asarray(path, dtype='float64')
+        pixels = path.shape[1]
+        x_data, y_data, z_data = path[0], path[1], path[2]
+        count_data = np.random.uniform(0, 2e4, pixels)
+
+        # The NVs contributing to a pixel lie in the grid cell of the pixel or its 8 neighbours.
+        grid_x, grid_y = self._grid_shape
+        cell_x, cell_y = self._get_cell_indices(x_data, y_data)
+        neighbours_x = (cell_x[:, None] + np.arange(-1, 2))[:, :, None]
+        neighbours_y = (cell_y[:, None] + np.arange(-1, 2))[:, None, :]
+        valid = ((neighbours_x >= 0) & (neighbours_x < grid_x)
+                 & (neighbours_y >= 0) & (neighbours_y < grid_y)).ravel()
+        cells = np.where(valid, (neighbours_x * grid_y + neighbours_y).ravel(), 0)
+        starts = self._cell_starts[cells]
+        numbers = np.where(valid, self._cell_starts[cells + 1] - starts, 0)
+
+        # pair each pixel with all NVs of these cells and evaluate all pairs at once
+        pair_pixels = np.repeat(np.repeat(np.arange(pixels), 9), numbers)
+        pair_nvs = np.repeat(starts - np.cumsum(numbers) + numbers, numbers) \
+                   + np.arange(np.sum(numbers))
+        amplitude, x_zero, y_zero, _, _, _, offset = self._points[pair_nvs].transpose()
+        a, b, c = self._nv_shapes[pair_nvs].transpose()
+        dx = x_data[pair_pixels] - x_zero
+        dy = y_data[pair_pixels] - y_zero
+        xy_signal = offset + amplitude * np.exp(-(a * dx ** 2 + 2 * b * dx * dy + c * dy ** 2))
+        amplitude_z, z_zero, sigma_z, offset_z = self._points_z[pair_nvs].transpose()
+        z_signal = amplitude_z * np.exp(
+            -(z_data[pair_pixels] - z_zero) ** 2 / (2 * sigma_z ** 2)) + offset_z
+        count_data += np.bincount(pair_pixels, weights=xy_signal * z_signal, minlength=pixels)
+
         return np.array([
                 count_data,
                 5e5 - count_data,
-                np.ones(count_data.shape) * line_path[1, 0] * 100
+                y_data * 100
             ]).transpose()
 
+    def _build_nv_index(self):
+        """ Sorts the NVs into a grid of square cells in the xy plane. A cell is as large as the
+        distance beyond which a NV does not contribute to the counts of a pixel, so only the NVs in
+        the cell of a pixel and its neighbouring cells have to be evaluated.
+        """
+        if self._num_points > 0:
+            sigma = np.max(np.abs(self._points[:, 3:5]))
+        else:
+            sigma = 1e-6
+        self._cell_size = self._cutoff_sigmas * sigma
+        self._grid_origin = np.array([self._position_range[0][0], self._position_range[1][0]])
+        extent = np.array([self._position_range[0][1], self._position_range[1][1]]) \
+                 - self._grid_origin
+        self._grid_shape = np.maximum(np.ceil(extent / self._cell_size).astype(int), 1)
+
+        cell_x, cell_y = self._get_cell_indices(self._points[:, 1], self._points[:, 2])
+        cells = cell_x * self._grid_shape[1] + cell_y
+        order = np.argsort(cells, kind='stable')
+        self._points = self._points[order]
+        self._points_z = self._points_z[order]
+        # the NVs of cell i are self._points[self._cell_starts[i]:self._cell_starts[i + 1]]
+        self._cell_starts = np.searchsorted(cells[order],
+                                            np.arange(np.prod(self._grid_shape) + 1))
+
+        # coefficients of the elliptical gaussians (see twoD_gaussian_function)
+        sigma_x, sigma_y, theta = self._points[:, 3], self._points[:, 4], self._points[:, 5]
+        self._nv_shapes = np.array([
+            np.cos(theta) ** 2 / (2 * sigma_x ** 2) + np.sin(theta) ** 2 / (2 * sigma_y ** 2),
+            -np.sin(2 * theta) / (4 * sigma_x ** 2) + np.sin(2 * theta) / (4 * sigma_y ** 2),
+            np.sin(theta) ** 2 / (2 * sigma_x ** 2) + np.cos(theta) ** 2 / (2 * sigma_y ** 2)
+        ]).transpose()
+
+    def _get_cell_indices(self, x_data, y_data):
+        """ Returns the grid cells of positions. Positions outside of the grid are assigned to the
+        closest cell at the border.
+
+        @param numpy.ndarray x_data: x positions
+        @param numpy.ndarray y_data: y positions
+
+        @return (numpy.ndarray, numpy.ndarray): the x and y indices of the cells
+        """
+        cell_x = np.floor((np.asarray(x_data) - self._grid_origin[0]) / self._cell_size)
+        cell_y = np.floor((np.asarray(y_data) - self._grid_origin[1]) / self._cell_size)
+        return (np.clip(cell_x, 0, self._grid_shape[0] - 1).astype(int),
+                np.clip(cell_y, 0, self._grid_shape[1] - 1).astype(int))
+
     def close_scanner(self):
         """ Closes the scanner and cleans up afterwards.
 
@@ -136,6 +136,10 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         self._scanner_ao_task = None
         self._scanner_counter_daq_tasks = []
         self._line_length = None
+        self._block_scan_running = False
+        self._block_read_pixels = 0
+        self._block_pixel_clock = False
+        self._block_end_position = None
         self._odmr_length = None
         self._gated_counter_daq_task = None
         self._scanner_analog_daq_task = None
@@ -1417,6 +1421,196 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         # return values is a rate of counts/s
         return all_data.transpose()
 
+    def start_block_scan(self, block_path=None, pixel_clock=False):
+        """ Starts scanning a block of several lines (including the return paths in between) as
+        one hardware timed waveform. The counts are fetched with read_block_scan while the block
+        is scanned.
+
+        @param float[c][m] block_path: array of c-tuples defining the voltage points of the whole
+                                       block (m = samples per block)
+        @param bool pixel_clock: whether we need to output a pixel clock for this block
+
+        @return int: error code (0:OK, -1:error)
+
+        The whole block is written to the analog output buffer at once and the counter and analog
+        input tasks acquire continuously, so there is no software overhead between the lines of
+        the block.
+        """
+        if len(self._scanner_counter_channels) > 0 and len(self._scanner_counter_daq_tasks) < 1:
+            self.log.error('Configured counter is not running, cannot scan a block.')
+            return -1
+
+        if len(self._scanner_ai_channels) > 0 and self._scanner_analog_daq_task is None:
+            self.log.error('Configured analog input is not running, cannot scan a block.')
+            return -1
+
+        if not isinstance(block_path, (frozenset, list, set, tuple, np.ndarray, )):
+            self.log.error('Given block_path list is not array type.')
+            return -1
+
+        if self._block_scan_running:
+            self.stop_block_scan()
+
+        try:
+            daq.DAQmxSetSampTimingType(self._scanner_ao_task, daq.DAQmx_Val_SampClk)
+            self._set_up_line(np.shape(block_path)[1])
+            block_volts = self._scanner_position_to_volt(block_path)
+            # write the positions of the whole block to the analog output buffer
+            self._write_scanner_ao(voltages=block_volts, length=self._line_length, start=False)
+
+            # The counts are read in several chunks, so the read position is given relative to the
+            # first sample (the first counter sample is skipped as in scan_line).
+            for task in self._scanner_counter_daq_tasks:
+                daq.DAQmxSetReadRelativeTo(task, daq.DAQmx_Val_FirstSample)
+            if len(self._scanner_ai_channels) > 0:
+                daq.DAQmxSetReadRelativeTo(self._scanner_analog_daq_task,
+                                           daq.DAQmx_Val_FirstSample)
+
+            # start the timed analog output task
+            daq.DAQmxStartTask(self._scanner_ao_task)
+
+            for task in self._scanner_counter_daq_tasks:
+                daq.DAQmxStopTask(task)
+
+            daq.DAQmxStopTask(self._scanner_clock_daq_task)
+
+            if pixel_clock and self._pixel_clock_channel is not None:
+                daq.DAQmxConnectTerms(
+                    self._scanner_clock_channel + 'InternalOutput',
+                    self._pixel_clock_channel,
+                    daq.DAQmx_Val_DoNotInvertPolarity)
+
+            # start the scanner counting task that acquires counts synchroneously
+            for task in self._scanner_counter_daq_tasks:
+                daq.DAQmxStartTask(task)
+
+            if len(self._scanner_ai_channels) > 0:
+                daq.DAQmxStartTask(self._scanner_analog_daq_task)
+
+            daq.DAQmxStartTask(self._scanner_clock_daq_task)
+        except:
+            self.log.exception('Error while starting block scan.')
+            self._block_scan_running = True
+            self._block_pixel_clock = pixel_clock
+            self._block_end_position = None
+            self.stop_block_scan()
+            return -1
+
+        self._block_scan_running = True
+        self._block_read_pixels = 0
+        self._block_pixel_clock = pixel_clock
+        self._block_end_position = np.array(block_path[:, -1])
+        return 0
+
+    def read_block_scan(self):
+        """ Returns the counts of the pixels of the running block scan, which were acquired since
+        the last call. The block scan is finished after the counts of all pixels were returned.
+
+        @return float[j][n]: j new pixels with n-channel photon counts per second (j may be 0)
+        """
+        if not self._block_scan_running:
+            self.log.error('No block scan running, cannot read counts.')
+            return np.array([[-1.]])
+
+        try:
+            # Number of pixels acquired by all tasks. Each pixel consists of two counter samples
+            # (high and low time of the clock) after the skipped first sample.
+            acquired = daq.uInt64()
+            ready_pixels = self._line_length
+            for task in self._scanner_counter_daq_tasks:
+                daq.DAQmxGetReadTotalSampPerChanAcquired(task, daq.byref(acquired))
+                ready_pixels = min(ready_pixels, max(int(acquired.value) - 1, 0) // 2)
+            if len(self._scanner_ai_channels) > 0:
+                daq.DAQmxGetReadTotalSampPerChanAcquired(self._scanner_analog_daq_task,
+                                                         daq.byref(acquired))
+                ready_pixels = min(ready_pixels, int(acquired.value))
+
+            n_pixels = ready_pixels - self._block_read_pixels
+            all_data = np.full((max(n_pixels, 0), len(self.get_scanner_count_channels())),
+                               2,
+                               dtype=np.float64)
+            if n_pixels <= 0:
+                return all_data
+
+            count_data = np.empty(2 * n_pixels, dtype=np.uint32)
+            n_read_samples = daq.int32()
+            for i, task in enumerate(self._scanner_counter_daq_tasks):
+                daq.DAQmxSetReadOffset(task, 1 + 2 * self._block_read_pixels)
+                daq.DAQmxReadCounterU32(
+                    task,
+                    2 * n_pixels,
+                    self._RWTimeout,
+                    count_data,
+                    2 * n_pixels,
+                    daq.byref(n_read_samples),
+                    None)
+                # add up adjoint pixels to also get the counts from the low time of the clock
+                all_data[:, i] = (count_data[::2] + count_data[1::2]) * self._scanner_clock_frequency
+
+            if len(self._scanner_ai_channels) > 0:
+                analog_data = np.empty((len(self._scanner_ai_channels), n_pixels),
+                                       dtype=np.float64)
+                analog_read_samples = daq.int32()
+                daq.DAQmxSetReadOffset(self._scanner_analog_daq_task, self._block_read_pixels)
+                daq.DAQmxReadAnalogF64(
+                    self._scanner_analog_daq_task,
+                    n_pixels,
+                    self._RWTimeout,
+                    daq.DAQmx_Val_GroupByChannel,
+                    analog_data,
+                    len(self._scanner_ai_channels) * n_pixels,
+                    daq.byref(analog_read_samples),
+                    None)
+                all_data[:, len(self._scanner_counter_channels):] = analog_data.transpose()
+
+            self._block_read_pixels = ready_pixels
+        except:
+            self.log.exception('Error while reading block scan.')
+            self.stop_block_scan()
+            return np.array([[-1.]])
+
+        if self._block_read_pixels >= self._line_length:
+            # update the scanner position instance variable
+            self._current_position = self._block_end_position
+            self.stop_block_scan()
+        return all_data
+
+    def stop_block_scan(self):
+        """ Stops a running block scan (e.g. to abort a scan) and cleans up afterwards.
+
+        @return int: error code (0:OK, -1:error)
+        """
+        if not self._block_scan_running:
+            return 0
+        self._block_scan_running = False
+        retval = 0
+        try:
+            for task in self._scanner_counter_daq_tasks:
+                daq.DAQmxStopTask(task)
+                # restore the read position used by scan_line
+                daq.DAQmxSetReadRelativeTo(task, daq.DAQmx_Val_CurrReadPos)
+                daq.DAQmxSetReadOffset(task, 1)
+            if len(self._scanner_ai_channels) > 0:
+                daq.DAQmxStopTask(self._scanner_analog_daq_task)
+                daq.DAQmxSetReadRelativeTo(self._scanner_analog_daq_task,
+                                           daq.DAQmx_Val_CurrReadPos)
+                daq.DAQmxSetReadOffset(self._scanner_analog_daq_task, 0)
+            daq.DAQmxStopTask(self._scanner_clock_daq_task)
+        except:
+            self.log.exception('Error while stopping block scan.')
+            retval = -1
+        if self._stop_analog_output() < 0:
+            retval = -1
+        if self._block_pixel_clock and self._pixel_clock_channel is not None:
+            try:
+                daq.DAQmxDisconnectTerms(
+                    self._scanner_clock_channel + 'InternalOutput',
+                    self._pixel_clock_channel)
+            except:
+                self.log.exception('Error while disconnecting the pixel clock.')
+                retval = -1
+        return retval
+
     def close_scanner(self):
         """ Closes the scanner and cleans up afterwards.
 
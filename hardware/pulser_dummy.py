@@ -191,6 +191,9 @@ class PulserDummy(Base, PulserInterface):
         constraints.event_triggers = ['A', 'B']
         constraints.flags = ['A', 'B', 'C', 'D']
 
+        # Purely digital waveforms can be passed run-length encoded
+        constraints.digital_run_lengths = True
+
         constraints.sequence_steps.min = 0
         constraints.sequence_steps.max = 8000
         constraints.sequence_steps.step = 1
@@ -261,7 +264,8 @@ class PulserDummy(Base, PulserInterface):
                                     voltage samples.
         @param dict digital_samples: keys are the generic digital channel names (i.e. 'd_ch1') and
                                      values are 1D numpy arrays of type bool containing the marker
-                                     states.
+                                     states or tuples (<run_lengths>, <states>) of run-length
+                                     encoded marker states.
         @param bool is_first_chunk: Flag indicating if it is the first chunk to write.
                                     If True this method will create a new empty wavveform.
                                     If False the samples are appended to the existing waveform.
@@ -275,11 +279,15 @@ class PulserDummy(Base, PulserInterface):
         """
         waveforms = list()
 
+        # Number of samples for each digital channel. Run-length encoded samples are not expanded.
+        digital_lengths = {chnl: int(samples[0].sum()) if isinstance(samples, tuple) else
+                           len(samples) for chnl, samples in digital_samples.items()}
+
         # Sanity checks
         if len(analog_samples) > 0:
             number_of_samples = len(analog_samples[list(analog_samples)[0]])
         elif len(digital_samples) > 0:
-            number_of_samples = len(digital_samples[list(digital_samples)[0]])
+            number_of_samples = digital_lengths[list(digital_samples)[0]]
         else:
             self.log.error('No analog or digital samples passed to write_waveform method in dummy '
                            'pulser.')
@@ -290,8 +298,8 @@ class PulserDummy(Base, PulserInterface):
                 self.log.error('Unequal length of sample arrays for different channels in dummy '
                                'pulser.')
                 return -1, waveforms
-        for chnl, samples in digital_samples.items():
-            if len(samples) != number_of_samples:
+        for chnl, length in digital_lengths.items():
+            if length != number_of_samples:
                 self.log.error('Unequal length of sample arrays for different channels in dummy '
                                'pulser.')
                 return -1, waveforms
@@ -1273,6 +1273,10 @@ class PulseBlasterESRPRO(Base, SwitchInterface, PulserInterface):
         constraints.event_triggers = ['A', 'B']
         constraints.flags = ['A', 'B', 'C', 'D']
 
+        # The pulse sequence is created from the channel edges, so the digital
+        # samples can be passed run-length encoded.
+        constraints.digital_run_lengths = True
+
         constraints.sequence_steps.min = 0
         constraints.sequence_steps.max = 8000
         constraints.sequence_steps.step = 1
@@ -1736,7 +1740,10 @@ class PulseBlasterESRPRO(Base, SwitchInterface, PulserInterface):
         @param numpy.ndarray digital_samples: array of type bool containing the
                                                marker states (if analog channels
                                                are active, this must be the same
-                                               length as analog_samples)
+                                               length as analog_samples). Each
+                                               value can also be a run-length
+                                               encoded tuple of two arrays
+                                               (<run_lengths>, <states>).
         @param bool is_first_chunk: flag indicating if it is the first chunk to
                                     write. If True this method will create a new
                                     empty waveform. If False the samples are
@@ -1787,20 +1794,26 @@ class PulseBlasterESRPRO(Base, SwitchInterface, PulserInterface):
         # same length.
         chan = list(digital_samples)
         chan.sort()
-        chunk_length = len(digital_samples[chan[0]])
+        run_length_encoded = isinstance(digital_samples[chan[0]], tuple)
+        if run_length_encoded:
+            chunk_length = int(np.sum(digital_samples[chan[0]][0]))
+            convert_to_pb_sequence = self._convert_run_lengths_to_pb_sequence
+        else:
+            chunk_length = len(digital_samples[chan[0]])
+            convert_to_pb_sequence = self._convert_sample_to_pb_sequence
 
         # assume that the number of channels are specified correct from the
         # instance, which called this method.
         self._current_activation_config = chan
 
         if is_first_chunk:
-            self._current_pb_waveform_theoretical = self._convert_sample_to_pb_sequence(digital_samples)
+            self._current_pb_waveform_theoretical = convert_to_pb_sequence(digital_samples)
 
             self._current_pb_waveform_name = name
 
         else:
 
-            pb_waveform_temp = self._convert_sample_to_pb_sequence(digital_samples)
+            pb_waveform_temp = convert_to_pb_sequence(digital_samples)
 
             # check if last of existing waveform is the same as the first one of
             # the coming one, then combine them,
@@ -1905,6 +1918,65 @@ class PulseBlasterESRPRO(Base, SwitchInterface, PulserInterface):
 
         return pb_sequence_list
 
+    def _convert_run_lengths_to_pb_sequence(self, digital_samples):
+        """ Helper method to create a pulse blaster sequence from run-length
+            encoded marker states without expanding them sample by sample.
+
+        @param dict digital_samples: keys are the generic digital channel names
+                                     and values are tuples of two arrays
+                                     (<run_lengths>, <states>) of type int and
+                                     bool. Each run holds the given state for
+                                     <run_length> samples.
+
+        @return list: a sequence list with dictionaries formated for the generic
+                      method 'write_pulse_form' (see
+                      _convert_sample_to_pb_sequence).
+        """
+
+        ch_list = list(digital_samples)
+        ch_list.sort()
+
+        # sample index at the end of each run for each channel
+        run_ends = {ch_name: np.cumsum(digital_samples[ch_name][0]) for ch_name in ch_list}
+
+        # all sample indices at which any of the channels changes
+        interval_ends = np.unique(np.concatenate(list(run_ends.values())))
+        interval_ends = interval_ends[interval_ends > 0]
+        interval_starts = np.concatenate(([0], interval_ends[:-1]))
+
+        # state of each channel within each interval
+        states = dict()
+        for ch_name in ch_list:
+            run_index = np.searchsorted(run_ends[ch_name], interval_starts, side='right')
+            states[ch_name] = np.asarray(digital_samples[ch_name][1], dtype=bool)[run_index]
+
+        pb_sequence_list = list()
+        for index, length in enumerate(interval_ends - interval_starts):
+            active_channels = [int(ch_name.replace('d_ch', ''))-1 for ch_name in ch_list
+                               if states[ch_name][index]]
+
+            # if the same channels as in the last entry, accumulate length
+            if pb_sequence_list and pb_sequence_list[-1]['active_channels'] == active_channels:
+                pb_sequence_list[-1]['length'] += int(length) * self.GRAN_MIN
+                continue
+
+            # increase length by 1%, to remove the ambiguity for the comparison
+            if pb_sequence_list and pb_sequence_list[-1]['length']*1.01 < self.LEN_MIN:
+                self.log.warning('Current waveform contains a pulse of '
+                                 'length {0:.2f}ns, which is smaller '
+                                 'than the minimal allowed length of '
+                                 '{1:.2f}ns! Pulse sequence might '
+                                 'most probably look unexpected. '
+                                 'Increase the length of the smallest '
+                                 'pulse!'
+                                 ''.format(pb_sequence_list[-1]['length']*1e9,
+                                           self.LEN_MIN*1e9))
+
+            pb_sequence_list.append({'active_channels': active_channels,
+                                     'length': int(length) * self.GRAN_MIN})
+
+        return pb_sequence_list
+
     def write_sequence(self, name, sequence_parameters):
         """
         Write a new sequence on the device memory.
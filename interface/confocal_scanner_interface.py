@@ -162,6 +162,38 @@ class ConfocalScannerInterface(metaclass=InterfaceMetaclass):
         """
         pass
 
+    @abc.abstractmethod
+    def start_block_scan(self, block_path=None, pixel_clock=False):
+        """ Starts scanning a block of several lines (including the return paths in between) as
+        one hardware timed waveform. The counts are fetched with read_block_scan while the block
+        is scanned.
+
+        @param float[k][n] block_path: array k of n-part tuples defining the pixel positions of
+                                       the whole block
+        @param bool pixel_clock: whether we need to output a pixel clock for this block
+
+        @return int: error code (0:OK, -1:error or block scanning not supported)
+        """
+        pass
+
+    @abc.abstractmethod
+    def read_block_scan(self):
+        """ Returns the counts of the pixels of the running block scan, which were acquired since
+        the last call. The block scan is finished after the counts of all n pixels were returned.
+
+        @return float[j][m]: the photon counts per second for j new pixels with m channels
+                             (j may be 0). [[-1.]] on error.
+        """
+        pass
+
+    @abc.abstractmethod
+    def stop_block_scan(self):
+        """ Stops a running block scan (e.g. to abort a scan) and cleans up afterwards.
+
+        @return int: error code (0:OK, -1:error)
+        """
+        pass
+
     @abc.abstractmethod
     def close_scanner(self):
         """ Closes the scanner and cleans up afterwards.
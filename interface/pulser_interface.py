@@ -119,6 +119,10 @@ class PulserInterface(metaclass=InterfaceMetaclass):
         constraints.event_triggers = ['A', 'B']
         constraints.flags = ['A', 'B', 'C', 'D']
 
+        # Set to True if write_waveform accepts run-length encoded digital samples (only used for
+        # waveforms without analog channels)
+        constraints.digital_run_lengths = False
+
         constraints.sequence_steps.min = 0
         constraints.sequence_steps.max = 8000
         constraints.sequence_steps.step = 1
@@ -432,6 +436,11 @@ class PulserInterface(metaclass=InterfaceMetaclass):
         @param dict digital_samples: keys are the generic digital channel names (i.e. 'd_ch1') and
                                      values are 1D numpy arrays of type bool containing the marker
                                      states.
+                                     If the constraint "digital_run_lengths" is True, waveforms
+                                     without analog channels are passed run-length encoded
+                                     instead. Each value is then a tuple of two 1D numpy arrays
+                                     (<run_lengths>, <states>) of type int64 and bool. Each run
+                                     holds the given state for <run_length> samples.
         @param bool is_first_chunk: Flag indicating if it is the first chunk to write.
                                     If True this method will create a new empty wavveform.
                                     If False the samples are appended to the existing waveform.
@@ -563,5 +572,8 @@ class PulserConstraints:
         self.repetitions = ScalarConstraint(unit='#')
         self.event_triggers = list()
         self.flags = list()
+        # Flag indicating that write_waveform accepts run-length encoded digital samples for
+        # waveforms without analog channels (see write_waveform)
+        self.digital_run_lengths = False
 
         self.activation_config = dict()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the disk backed store for the images of the ConfocalLogic history.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import os
+import uuid
+import numpy as np
+
+
+class ConfocalImageStore:
+    """
+    Stores confocal images line by line in .npy files (chunks) in a directory, e.g. in the
+    application status directory.
+
+    Committing an image writes only the lines which changed since the image it is based on into a
+    new chunk. All other lines are shared with the base image. An image is referred to by a small
+    dict (image reference) holding its shape and the chunk segments its lines are stored in:
+        {'shape': [lines, pixels, values], 'segments': [[<chunk>, <first chunk line>, <lines>], ...]}
+    Image references can be saved as status variables. The images themselves are only read (from
+    memory mapped chunks) when they are loaded.
+    """
+
+    def __init__(self, directory):
+        """
+        @param str directory: The directory to store the chunks in. Will be created if not present.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # Memory maps of the chunks read so far
+        self._chunks = dict()
+
+    def commit(self, image, base=None, changed_lines=None):
+        """ Stores an image.
+
+        @param numpy.ndarray image: The image to store (shape (lines, pixels, values))
+        @param dict base: optional, reference of the stored image this image is based on
+        @param iterable changed_lines: optional, the lines which changed since base. Ignored (all
+                                       lines are stored) if base is None or of a different shape.
+
+        @return dict: The image reference of the stored image
+        """
+        shape = [int(n) for n in np.shape(image)]
+        if base is None or base['shape'] != shape or changed_lines is None:
+            line_sources = [None] * shape[0]
+            changed_lines = range(shape[0])
+        else:
+            line_sources = self._expand_segments(base)
+            changed_lines = sorted(line for line in changed_lines if 0 <= line < shape[0])
+            if len(changed_lines) == 0:
+                return base
+
+        chunk = uuid.uuid4().hex
+        np.save(self._chunk_path(chunk), np.asarray(image)[list(changed_lines)])
+        for chunk_line, line in enumerate(changed_lines):
+            line_sources[line] = (chunk, chunk_line)
+
+        # merge consecutive lines of the same chunk into segments
+        segments = list()
+        for chunk, chunk_line in line_sources:
+            if (len(segments) > 0 and segments[-1][0] == chunk
+                    and segments[-1][1] + segments[-1][2] == chunk_line):
+                segments[-1][2] += 1
+            else:
+                segments.append([chunk, chunk_line, 1])
+        return {'shape': shape, 'segments': segments}
+
+    def load(self, reference):
+        """ Reads a stored image.
+
+        @param dict reference: The image reference
+
+        @return numpy.ndarray: A new (writable) array holding the image
+        """
+        image = np.empty(reference['shape'], dtype='float64')
+        line = 0
+        for chunk, chunk_line, lines in reference['segments']:
+            image[line:line + lines] = self._get_chunk(chunk)[chunk_line:chunk_line + lines]
+            line += lines
+        return image
+
+    def contains(self, reference):
+        """ Checks if all chunks of an image are stored, e.g. after restoring a reference from
+        the status variables.
+
+        @param dict reference: The image reference
+
+        @return bool: True if the image can be loaded
+        """
+        try:
+            if sum(segment[2] for segment in reference['segments']) != reference['shape'][0]:
+                return False
+            return all(os.path.isfile(self._chunk_path(segment[0]))
+                       for segment in reference['segments'])
+        except (KeyError, IndexError, TypeError):
+            return False
+
+    def collect_garbage(self, references):
+        """ Removes all chunks not used by the given images.
+
+        @param list references: The references of all images to keep (None entries are ignored)
+        """
+        used = set(segment[0]
+                   for reference in references if reference is not None
+                   for segment in reference['segments'])
+        for chunk in list(self._chunks):
+            if chunk not in used:
+                del self._chunks[chunk]
+        for filename in os.listdir(self.directory):
+            chunk, ext = os.path.splitext(filename)
+            if ext == '.npy' and chunk not in used:
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except OSError:
+                    pass
+
+    def close(self):
+        """ Releases the memory maps of all chunks.
+        """
+        self._chunks.clear()
+
+    def _chunk_path(self, chunk):
+        return os.path.join(self.directory, chunk + '.npy')
+
+    def _get_chunk(self, chunk):
+        if chunk not in self._chunks:
+            self._chunks[chunk] = np.load(self._chunk_path(chunk), mmap_mode='r')
+        return self._chunks[chunk]
+
+    @staticmethod
+    def _expand_segments(reference):
+        line_sources = list()
+        for chunk, chunk_line, lines in reference['segments']:
+            line_sources.extend((chunk, chunk_line + i) for i in range(lines))
+        return line_sources
@@ -22,6 +22,7 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 from qtpy import QtCore
 from collections import OrderedDict
 from copy import copy
+import os
 import time
 import datetime
 import numpy as np
@@ -32,6 +33,7 @@ from io import BytesIO
 from logic.generic_logic import GenericLogic
 from core.util.mutex import Mutex
 from core.module import Connector, ConfigOption, StatusVar
+from logic.confocal_image_store import ConfocalImageStore
 
 
 class OldConfigFileError(Exception):
@@ -44,12 +46,19 @@ class OldConfigFileError(Exception):
 class ConfocalHistoryEntry(QtCore.QObject):
     """ This class contains all relevant parameters of a Confocal scan.
         It provides methods to extract, restore and serialize this data.
+
+        The images are kept in the ConfocalImageStore of the confocal logic, the entry only holds
+        references to them. They are read from disk when the entry is restored.
     """
 
     def __init__(self, confocal):
         """ Make a confocal data setting with default values. """
         super().__init__()
 
+        self._image_store = confocal._image_store
+        self.xy_image_ref = None
+        self.depth_image_ref = None
+
         self.depth_scan_dir_is_xz = True
         self.depth_img_is_xz = True
 
@@ -131,19 +140,17 @@ class ConfocalHistoryEntry(QtCore.QObject):
         confocal._scanning_device.tiltcorrection = self.tilt_correction
 
         confocal.initialize_image()
-        try:
-            if confocal.xy_image.shape == self.xy_image.shape:
-                confocal.xy_image = np.copy(self.xy_image)
-        except AttributeError:
-            self.xy_image = np.copy(confocal.xy_image)
+        if self.xy_image_ref is not None and \
+                list(confocal.xy_image.shape) == self.xy_image_ref['shape']:
+            confocal.xy_image = self._image_store.load(self.xy_image_ref)
+            confocal._image_refs['xy'] = self.xy_image_ref
 
         confocal._zscan = True
         confocal.initialize_image()
-        try:
-            if confocal.depth_image.shape == self.depth_image.shape:
-                confocal.depth_image = np.copy(self.depth_image)
-        except AttributeError:
-            self.depth_image = np.copy(confocal.depth_image)
+        if self.depth_image_ref is not None and \
+                list(confocal.depth_image.shape) == self.depth_image_ref['shape']:
+            confocal.depth_image = self._image_store.load(self.depth_image_ref)
+            confocal._image_refs['depth'] = self.depth_image_ref
         confocal._zscan = False
 
     def snapshot(self, confocal):
@@ -172,8 +179,9 @@ class ConfocalHistoryEntry(QtCore.QObject):
         self.point1 = np.copy(confocal.point1)
         self.point2 = np.copy(confocal.point2)
         self.point3 = np.copy(confocal.point3)
-        self.xy_image = np.copy(confocal.xy_image)
-        self.depth_image = np.copy(confocal.depth_image)
+        # only the lines changed since the last snapshot are written to the image store
+        self.xy_image_ref = confocal._commit_image('xy')
+        self.depth_image_ref = confocal._commit_image('depth')
 
     def serialize(self):
         """ Give out a dictionary that can be saved via the usual means """
@@ -197,8 +205,8 @@ class ConfocalHistoryEntry(QtCore.QObject):
         serialized['tilt_point3'] = list(self.point3)
         serialized['tilt_reference'] = [self.tilt_reference_x, self.tilt_reference_y]
         serialized['tilt_slope'] = [self.tilt_slope_x, self.tilt_slope_y]
-        serialized['xy_image'] = self.xy_image
-        serialized['depth_image'] = self.depth_image
+        serialized['xy_image_ref'] = self.xy_image_ref
+        serialized['depth_image_ref'] = self.depth_image_ref
         return serialized
 
     def deserialize(self, serialized):
@@ -236,14 +244,21 @@ class ConfocalHistoryEntry(QtCore.QObject):
             self.point2 = np.array(serialized['tilt_point2'])
         if 'tilt_point3' in serialized and len(serialized['tilt_point3']) == 3:
             self.point3 = np.array(serialized['tilt_point3'])
-        if 'xy_image' in serialized:
+        if serialized.get('xy_image_ref') is not None:
+            if self._image_store.contains(serialized['xy_image_ref']):
+                self.xy_image_ref = serialized['xy_image_ref']
+        elif 'xy_image' in serialized:
+            # images of status files written before the image store was introduced
             if isinstance(serialized['xy_image'], np.ndarray):
-                self.xy_image = serialized['xy_image']
+                self.xy_image_ref = self._image_store.commit(serialized['xy_image'])
             else:
                 raise OldConfigFileError()
-        if 'depth_image' in serialized:
+        if serialized.get('depth_image_ref') is not None:
+            if self._image_store.contains(serialized['depth_image_ref']):
+                self.depth_image_ref = serialized['depth_image_ref']
+        elif 'depth_image' in serialized:
             if isinstance(serialized['depth_image'], np.ndarray):
-                self.depth_image = serialized['depth_image'].copy()
+                self.depth_image_ref = self._image_store.commit(serialized['depth_image'])
             else:
                 raise OldConfigFileError()
 
@@ -259,6 +274,13 @@ class ConfocalLogic(GenericLogic):
     confocalscanner1 = Connector(interface='ConfocalScannerInterface')
     savelogic = Connector(interface='SaveLogic')
 
+    # config options
+    # Number of lines (including their return paths) scanned as one block by the hardware.
+    # 0 scans line by line.
+    _scan_block_lines = ConfigOption('scan_block_lines', 0, missing='nothing')
+    # Time to wait for new counts of a block scan in s
+    _block_poll_interval = ConfigOption('block_poll_interval', 0.01, missing='nothing')
+
     # status vars
     _clock_frequency = StatusVar('clock_frequency', 500)
     return_slowness = StatusVar(default=50)
@@ -271,6 +293,9 @@ class ConfocalLogic(GenericLogic):
     signal_scan_lines_next = QtCore.Signal()
     signal_xy_image_updated = QtCore.Signal()
     signal_depth_image_updated = QtCore.Signal()
+    # first and last + 1 line of the image changed during a scan
+    sigImageXYLinesUpdated = QtCore.Signal(int, int)
+    sigImageDepthLinesUpdated = QtCore.Signal(int, int)
     signal_change_position = QtCore.Signal(str)
     signal_xy_data_saved = QtCore.Signal()
     signal_depth_data_saved = QtCore.Signal()
@@ -297,6 +322,9 @@ class ConfocalLogic(GenericLogic):
         self.depth_scan_dir_is_xz = True
         self.depth_img_is_xz = True
         self.permanent_scan = False
+        # the running block scan and whether the scanner can scan blocks
+        self._block = None
+        self._block_scan_unsupported = False
 
     def on_activate(self):
         """ Initialisation performed during activation of the module.
@@ -304,6 +332,14 @@ class ConfocalLogic(GenericLogic):
         self._scanning_device = self.confocalscanner1()
         self._save_logic = self.savelogic()
 
+        # The images of the history are stored on disk. The references to the stored images the
+        # current images are based on and the lines changed since then are tracked, so a
+        # snapshot only writes the changed lines.
+        self._image_store = ConfocalImageStore(os.path.join(
+            self._manager.getStatusDir(), 'confocal_history_{0}'.format(self._name)))
+        self._image_refs = {'xy': None, 'depth': None}
+        self._changed_lines = {'xy': set(), 'depth': set()}
+
         # Reads in the maximal scanning range. The unit of that scan range is micrometer!
         self.x_range = self._scanning_device.get_position_range()[0]
         self.y_range = self._scanning_device.get_position_range()[1]
@@ -336,6 +372,8 @@ class ConfocalLogic(GenericLogic):
             self.history.append(new_state)
 
         self.history_index = len(self.history) - 1
+        self._image_store.collect_garbage(
+            [ref for entry in self.history for ref in (entry.xy_image_ref, entry.depth_image_ref)])
 
         # Sets connections between signals and functions
         self.signal_scan_lines_next.connect(self._scan_line, QtCore.Qt.QueuedConnection)
@@ -356,6 +394,12 @@ class ConfocalLogic(GenericLogic):
         for state in reversed(self.history):
             self._statusVariables['history_{0}'.format(histindex)] = state.serialize()
             histindex += 1
+        # remove the images of entries which are not saved anymore
+        self._image_store.collect_garbage(
+            [ref
+             for state in self.history[-self.max_history_length:]
+             for ref in (state.xy_image_ref, state.depth_image_ref)])
+        self._image_store.close()
         return 0
 
     def switch_hardware(self, to_on=False):
@@ -534,6 +578,8 @@ class ConfocalLogic(GenericLogic):
                 self._return_YL = np.linspace(self._YL[-1], self._YL[0], self.return_slowness)
                 self._return_AL = np.zeros(self._return_YL.shape)
 
+            self._image_refs['depth'] = None
+            self._changed_lines['depth'].clear()
             self.sigImageDepthInitialized.emit()
 
         # xy scan is in xy plane
@@ -556,6 +602,8 @@ class ConfocalLogic(GenericLogic):
             self.xy_image[:, :, 2] = self._current_z * np.ones(
                 (len(self._image_vert_axis), len(self._X)))
 
+            self._image_refs['xy'] = None
+            self._changed_lines['xy'].clear()
             self.sigImageXYInitialized.emit()
         return 0
 
@@ -590,6 +638,8 @@ class ConfocalLogic(GenericLogic):
             self.set_position('scanner')
             return -1
 
+        self._block = None
+        self._block_scan_unsupported = False
         self.signal_scan_lines_next.emit()
         return 0
 
@@ -619,6 +669,8 @@ class ConfocalLogic(GenericLogic):
             self.set_position('scanner')
             return -1
 
+        self._block = None
+        self._block_scan_unsupported = False
         self.signal_scan_lines_next.emit()
         return 0
 
@@ -714,6 +766,9 @@ class ConfocalLogic(GenericLogic):
         # stops scanning
         if self.stopRequested:
             with self.threadlock:
+                if self._block is not None:
+                    self._scanning_device.stop_block_scan()
+                    self._block = None
                 self.kill_scanner()
                 self.stopRequested = False
                 self.module_state.unlock()
@@ -733,120 +788,275 @@ class ConfocalLogic(GenericLogic):
                 self.history_index = len(self.history) - 1
                 return
 
+        if self._scan_block_lines > 0 and not self._block_scan_unsupported:
+            self._scan_block()
+            return
+
         image = self.depth_image if self._zscan else self.xy_image
         n_ch = len(self.get_scanner_axes())
-        s_ch = len(self.get_scanner_count_channels())
 
         try:
             if self._scan_counter == 0:
-                # make a line from the current cursor position to
-                # the starting position of the first scan line of the scan
-                rs = self.return_slowness
-                lsx = np.linspace(self._current_x, image[self._scan_counter, 0, 0], rs)
-                lsy = np.linspace(self._current_y, image[self._scan_counter, 0, 1], rs)
-                lsz = np.linspace(self._current_z, image[self._scan_counter, 0, 2], rs)
-                if n_ch <= 3:
-                    start_line = np.vstack([lsx, lsy, lsz][0:n_ch])
-                else:
-                    start_line = np.vstack(
-                        [lsx, lsy, lsz, np.ones(lsx.shape) * self._current_a])
                 # move to the start position of the scan, counts are thrown away
-                start_line_counts = self._scanning_device.scan_line(start_line)
+                start_line_counts = self._scanning_device.scan_line(
+                    self._get_start_line(image, n_ch))
                 if np.any(start_line_counts == -1):
                     self.stopRequested = True
                     self.signal_scan_lines_next.emit()
                     return
 
-            # adjust z of line in image to current z before building the line
-            if not self._zscan:
-                z_shape = image[self._scan_counter, :, 2].shape
-                image[self._scan_counter, :, 2] = self._current_z * np.ones(z_shape)
-
-            # make a line in the scan, _scan_counter says which one it is
-            lsx = image[self._scan_counter, :, 0]
-            lsy = image[self._scan_counter, :, 1]
-            lsz = image[self._scan_counter, :, 2]
-            if n_ch <= 3:
-                line = np.vstack([lsx, lsy, lsz][0:n_ch])
-            else:
-                line = np.vstack(
-                    [lsx, lsy, lsz, np.ones(lsx.shape) * self._current_a])
-
             # scan the line in the scan
-            line_counts = self._scanning_device.scan_line(line, pixel_clock=True)
+            line_counts = self._scanning_device.scan_line(
+                self._get_scan_line(image, self._scan_counter, n_ch), pixel_clock=True)
             if np.any(line_counts == -1):
                 self.stopRequested = True
                 self.signal_scan_lines_next.emit()
                 return
 
-            # make a line to go to the starting position of the next scan line
-            if self.depth_img_is_xz or not self._zscan:
-                if n_ch <= 3:
-                    return_line = np.vstack([
-                        self._return_XL,
-                        image[self._scan_counter, 0, 1] * np.ones(self._return_XL.shape),
-                        image[self._scan_counter, 0, 2] * np.ones(self._return_XL.shape)
-                    ][0:n_ch])
-                else:
-                    return_line = np.vstack([
-                            self._return_XL,
-                            image[self._scan_counter, 0, 1] * np.ones(self._return_XL.shape),
-                            image[self._scan_counter, 0, 2] * np.ones(self._return_XL.shape),
-                            np.ones(self._return_XL.shape) * self._current_a
-                        ])
-            else:
-                if n_ch <= 3:
-                    return_line = np.vstack([
-                            image[self._scan_counter, 0, 1] * np.ones(self._return_YL.shape),
-                            self._return_YL,
-                            image[self._scan_counter, 0, 2] * np.ones(self._return_YL.shape)
-                        ][0:n_ch])
-                else:
-                    return_line = np.vstack([
-                            image[self._scan_counter, 0, 1] * np.ones(self._return_YL.shape),
-                            self._return_YL,
-                            image[self._scan_counter, 0, 2] * np.ones(self._return_YL.shape),
-                            np.ones(self._return_YL.shape) * self._current_a
-                        ])
-
             # return the scanner to the start of next line, counts are thrown away
-            return_line_counts = self._scanning_device.scan_line(return_line)
+            return_line_counts = self._scanning_device.scan_line(
+                self._get_return_line(image, self._scan_counter, n_ch))
             if np.any(return_line_counts == -1):
                 self.stopRequested = True
                 self.signal_scan_lines_next.emit()
                 return
 
             # update image with counts from the line we just scanned
-            if self._zscan:
-                if self.depth_img_is_xz:
-                    self.depth_image[self._scan_counter, :, 3:3 + s_ch] = line_counts
-                else:
-                    self.depth_image[self._scan_counter, :, 3:3 + s_ch] = line_counts
-                self.signal_depth_image_updated.emit()
-            else:
-                self.xy_image[self._scan_counter, :, 3:3 + s_ch] = line_counts
-                self.signal_xy_image_updated.emit()
+            self._update_image_line(self._scan_counter, line_counts)
 
             # next line in scan
-            self._scan_counter += 1
+            self._next_scan_line()
 
-            # stop scanning when last line scan was performed and makes scan not continuable
-            if self._scan_counter >= np.size(self._image_vert_axis):
-                if not self.permanent_scan:
-                    self.stop_scanning()
-                    if self._zscan:
-                        self._zscan_continuable = False
-                    else:
-                        self._xyscan_continuable = False
+            self.signal_scan_lines_next.emit()
+        except:
+            self.log.exception('The scan went wrong, killing the scanner.')
+            self.stop_scanning()
+            self.signal_scan_lines_next.emit()
+
+    def _scan_block(self):
+        """ Scans the image in blocks of scan_block_lines lines.
+
+        Each block (the lines of the block including their return paths) is handed to the
+        scanning hardware as one path. Every call either starts the next block or fetches the
+        counts acquired so far and writes them into the image, so the image is updated while the
+        block is scanned. If the hardware does not support block scanning, the scan continues
+        line by line.
+        """
+        image = self.depth_image if self._zscan else self.xy_image
+        n_ch = len(self.get_scanner_axes())
+
+        try:
+            if self._block is None:
+                first_line = self._scan_counter
+                last_line = min(first_line + self._scan_block_lines, np.size(self._image_vert_axis))
+                paths = list()
+                # (line index, first pixel in block, number of pixels) of each scan line
+                segments = list()
+                offset = 0
+                if first_line == 0:
+                    # move to the start position of the scan, counts are thrown away
+                    paths.append(self._get_start_line(image, n_ch))
+                    offset += paths[-1].shape[1]
+                for line_index in range(first_line, last_line):
+                    paths.append(self._get_scan_line(image, line_index, n_ch))
+                    segments.append((line_index, offset, paths[-1].shape[1]))
+                    offset += paths[-1].shape[1]
+                    paths.append(self._get_return_line(image, line_index, n_ch))
+                    offset += paths[-1].shape[1]
+
+                if self._scanning_device.start_block_scan(np.hstack(paths), pixel_clock=True) < 0:
+                    self.log.warning('Scanning device could not start a block scan. '
+                                     'Continue scanning line by line.')
+                    self._block_scan_unsupported = True
                 else:
-                    self._scan_counter = 0
+                    self._block = {'segments': segments, 'read_pixels': 0, 'pixels': offset}
+                self.signal_scan_lines_next.emit()
+                return
+
+            counts = self._scanning_device.read_block_scan()
+            if np.any(counts == -1):
+                self._block = None
+                self.stopRequested = True
+                self.signal_scan_lines_next.emit()
+                return
 
+            if len(counts) == 0:
+                # wait for the hardware to acquire more pixels
+                time.sleep(self._block_poll_interval)
+            else:
+                start = self._block['read_pixels']
+                stop = start + len(counts)
+                self._block['read_pixels'] = stop
+                # write all new pixels of the scan lines into the image
+                changed_lines = list()
+                for line_index, offset, length in self._block['segments']:
+                    first = max(start, offset)
+                    last = min(stop, offset + length)
+                    if first < last:
+                        self._update_image_line(line_index,
+                                                counts[first - start:last - start],
+                                                first - offset,
+                                                emit=False)
+                        changed_lines.append(line_index)
+                if len(changed_lines) > 0:
+                    if self._zscan:
+                        self.sigImageDepthLinesUpdated.emit(min(changed_lines),
+                                                            max(changed_lines) + 1)
+                    else:
+                        self.sigImageXYLinesUpdated.emit(min(changed_lines),
+                                                         max(changed_lines) + 1)
+                # lines are complete once the counts of all their pixels arrived
+                segments = self._block['segments']
+                while len(segments) > 0 and segments[0][1] + segments[0][2] <= stop:
+                    segments.pop(0)
+                    self._next_scan_line()
+
+            if self._block['read_pixels'] >= self._block['pixels']:
+                self._block = None
             self.signal_scan_lines_next.emit()
         except:
             self.log.exception('The scan went wrong, killing the scanner.')
+            if self._block is not None:
+                self._scanning_device.stop_block_scan()
+                self._block = None
             self.stop_scanning()
             self.signal_scan_lines_next.emit()
 
+    def _get_start_line(self, image, n_ch):
+        """ Makes a line from the current cursor position to the starting position of the first
+        scan line of the scan.
+
+        @param numpy.ndarray image: the image to scan
+        @param int n_ch: number of scanner axes
+
+        @return numpy.ndarray: the line path with shape (n_ch, return_slowness)
+        """
+        rs = self.return_slowness
+        lsx = np.linspace(self._current_x, image[self._scan_counter, 0, 0], rs)
+        lsy = np.linspace(self._current_y, image[self._scan_counter, 0, 1], rs)
+        lsz = np.linspace(self._current_z, image[self._scan_counter, 0, 2], rs)
+        if n_ch <= 3:
+            start_line = np.vstack([lsx, lsy, lsz][0:n_ch])
+        else:
+            start_line = np.vstack(
+                [lsx, lsy, lsz, np.ones(lsx.shape) * self._current_a])
+        return start_line
+
+    def _get_scan_line(self, image, line_index, n_ch):
+        """ Makes a line in the scan.
+
+        @param numpy.ndarray image: the image to scan
+        @param int line_index: which line of the image to make
+        @param int n_ch: number of scanner axes
+
+        @return numpy.ndarray: the line path with shape (n_ch, pixels per line)
+        """
+        # adjust z of line in image to current z before building the line
+        if not self._zscan:
+            z_shape = image[line_index, :, 2].shape
+            image[line_index, :, 2] = self._current_z * np.ones(z_shape)
+            self._changed_lines['xy'].add(line_index)
+
+        lsx = image[line_index, :, 0]
+        lsy = image[line_index, :, 1]
+        lsz = image[line_index, :, 2]
+        if n_ch <= 3:
+            line = np.vstack([lsx, lsy, lsz][0:n_ch])
+        else:
+            line = np.vstack(
+                [lsx, lsy, lsz, np.ones(lsx.shape) * self._current_a])
+        return line
+
+    def _get_return_line(self, image, line_index, n_ch):
+        """ Makes a line to go to the starting position of the next scan line.
+
+        @param numpy.ndarray image: the image to scan
+        @param int line_index: which line of the image to return from
+        @param int n_ch: number of scanner axes
+
+        @return numpy.ndarray: the line path with shape (n_ch, return_slowness)
+        """
+        if self.depth_img_is_xz or not self._zscan:
+            if n_ch <= 3:
+                return_line = np.vstack([
+                    self._return_XL,
+                    image[line_index, 0, 1] * np.ones(self._return_XL.shape),
+                    image[line_index, 0, 2] * np.ones(self._return_XL.shape)
+                ][0:n_ch])
+            else:
+                return_line = np.vstack([
+                        self._return_XL,
+                        image[line_index, 0, 1] * np.ones(self._return_XL.shape),
+                        image[line_index, 0, 2] * np.ones(self._return_XL.shape),
+                        np.ones(self._return_XL.shape) * self._current_a
+                    ])
+        else:
+            if n_ch <= 3:
+                return_line = np.vstack([
+                        image[line_index, 0, 1] * np.ones(self._return_YL.shape),
+                        self._return_YL,
+                        image[line_index, 0, 2] * np.ones(self._return_YL.shape)
+                    ][0:n_ch])
+            else:
+                return_line = np.vstack([
+                        image[line_index, 0, 1] * np.ones(self._return_YL.shape),
+                        self._return_YL,
+                        image[line_index, 0, 2] * np.ones(self._return_YL.shape),
+                        np.ones(self._return_YL.shape) * self._current_a
+                    ])
+        return return_line
+
+    def _update_image_line(self, line_index, counts, start=0, emit=True):
+        """ Writes counts of a scan line into the image.
+
+        @param int line_index: the line of the image
+        @param numpy.ndarray counts: counts of shape (pixels, channels)
+        @param int start: the first pixel of the line to write to
+        @param bool emit: whether to emit the lines updated signal
+        """
+        s_ch = len(self.get_scanner_count_channels())
+        stop = start + len(counts)
+        if self._zscan:
+            self.depth_image[line_index, start:stop, 3:3 + s_ch] = counts
+            self._changed_lines['depth'].add(line_index)
+            if emit:
+                self.sigImageDepthLinesUpdated.emit(line_index, line_index + 1)
+        else:
+            self.xy_image[line_index, start:stop, 3:3 + s_ch] = counts
+            self._changed_lines['xy'].add(line_index)
+            if emit:
+                self.sigImageXYLinesUpdated.emit(line_index, line_index + 1)
+
+    def _commit_image(self, kind):
+        """ Writes the lines of an image changed since the last commit to the image store.
+
+        @param str kind: 'xy' or 'depth'
+
+        @return dict: reference of the stored image
+        """
+        image = self.xy_image if kind == 'xy' else self.depth_image
+        self._image_refs[kind] = self._image_store.commit(
+            image, self._image_refs[kind], self._changed_lines[kind])
+        self._changed_lines[kind].clear()
+        return self._image_refs[kind]
+
+    def _next_scan_line(self):
+        """ Advances to the next line of the scan. Stops scanning (and makes the scan not
+        continuable) after the last line unless scanning permanently.
+        """
+        self._scan_counter += 1
+
+        # stop scanning when last line scan was performed and makes scan not continuable
+        if self._scan_counter >= np.size(self._image_vert_axis):
+            if not self.permanent_scan:
+                self.stop_scanning()
+                if self._zscan:
+                    self._zscan_continuable = False
+                else:
+                    self._xyscan_continuable = False
+            else:
+                self._scan_counter = 0
+
     def save_xy_data(self, colorscale_range=None, percentile_range=None):
         """ Save the current confocal xy data to file.
 
@@ -907,14 +1117,14 @@ class ConfocalLogic(GenericLogic):
                 'of entries where the Signal is in counts/s:'] = self.xy_image[:, :, 3 + n]
 
             filelabel = 'confocal_xy_image_{0}'.format(ch.replace('/', ''))
-            self._save_logic.save_data(image_data,
-                                       filepath=filepath,
-                                       timestamp=timestamp,
-                                       parameters=parameters,
-                                       filelabel=filelabel,
-                                       fmt='%.6e',
-                                       delimiter='\t',
-                                       plotfig=figs[ch])
+            self._save_logic.save_data_async(image_data,
+                                             filepath=filepath,
+                                             timestamp=timestamp,
+                                             parameters=parameters,
+                                             filelabel=filelabel,
+                                             fmt='%.6e',
+                                             delimiter='\t',
+                                             plotfig=figs[ch])
 
         # prepare the full raw data in an OrderedDict:
         data = OrderedDict()
@@ -927,13 +1137,13 @@ class ConfocalLogic(GenericLogic):
 
         # Save the raw data to file
         filelabel = 'confocal_xy_data'
-        self._save_logic.save_data(data,
-                                   filepath=filepath,
-                                   timestamp=timestamp,
-                                   parameters=parameters,
-                                   filelabel=filelabel,
-                                   fmt='%.6e',
-                                   delimiter='\t')
+        self._save_logic.save_data_async(data,
+                                         filepath=filepath,
+                                         timestamp=timestamp,
+                                         parameters=parameters,
+                                         filelabel=filelabel,
+                                         fmt='%.6e',
+                                         delimiter='\t')
 
         self.log.debug('Confocal Image saved.')
         self.signal_xy_data_saved.emit()
@@ -1000,14 +1210,14 @@ class ConfocalLogic(GenericLogic):
                 'of entries where the Signal is in counts/s:'] = self.depth_image[:, :, 3 + n]
 
             filelabel = 'confocal_depth_image_{0}'.format(ch.replace('/', ''))
-            self._save_logic.save_data(image_data,
-                                       filepath=filepath,
-                                       timestamp=timestamp,
-                                       parameters=parameters,
-                                       filelabel=filelabel,
-                                       fmt='%.6e',
-                                       delimiter='\t',
-                                       plotfig=figs[ch])
+            self._save_logic.save_data_async(image_data,
+                                             filepath=filepath,
+                                             timestamp=timestamp,
+                                             parameters=parameters,
+                                             filelabel=filelabel,
+                                             fmt='%.6e',
+                                             delimiter='\t',
+                                             plotfig=figs[ch])
 
         # prepare the full raw data in an OrderedDict:
         data = OrderedDict()
@@ -1020,13 +1230,13 @@ class ConfocalLogic(GenericLogic):
 
         # Save the raw data to file
         filelabel = 'confocal_depth_data'
-        self._save_logic.save_data(data,
-                                   filepath=filepath,
-                                   timestamp=timestamp,
-                                   parameters=parameters,
-                                   filelabel=filelabel,
-                                   fmt='%.6e',
-                                   delimiter='\t')
+        self._save_logic.save_data_async(data,
+                                         filepath=filepath,
+                                         timestamp=timestamp,
+                                         parameters=parameters,
+                                         filelabel=filelabel,
+                                         fmt='%.6e',
+                                         delimiter='\t')
 
         self.log.debug('Confocal Image saved.')
         self.signal_depth_data_saved.emit()
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the data recorder used by the CounterLogic to record count traces.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import os
+import tempfile
+import threading
+import numpy as np
+
+
+class CounterDataRecorder:
+    """
+    Append-only recorder for rows of a fixed number of columns (e.g. time and counts per channel).
+
+    The rows are written into a preallocated array which grows by doubling its size. If
+    max_memory_rows is given, the recorded rows are spilled to a raw binary file each time the
+    in-memory buffer is full, so the memory used by long recordings stays bounded. Spilled rows are
+    read back via a read-only memory map.
+
+    Recorded rows are never modified (growing and spilling allocate a new buffer), so the read-only
+    arrays returned by get_rows, last and window are views and stay valid while recording goes on.
+    Only a range spanning spilled and in-memory rows has to be copied.
+    The first column is assumed to be a monotonically increasing time column for window.
+    """
+
+    def __init__(self, columns, initial_rows=1024, max_memory_rows=0, spill_directory=None):
+        """
+        @param int columns: The number of columns of each row
+        @param int initial_rows: The number of rows to preallocate
+        @param int max_memory_rows: The number of rows to hold in memory before spilling them to a
+                                    binary file. 0 (default) keeps all rows in memory.
+        @param str spill_directory: The directory to create the spill file in. Default (None) is
+                                    the temporary directory of the system.
+        """
+        self._initial_rows = max(int(initial_rows), 1)
+        self._max_memory_rows = max(int(max_memory_rows), 0)
+        if self._max_memory_rows > 0:
+            self._initial_rows = min(self._initial_rows, self._max_memory_rows)
+        self._spill_directory = spill_directory
+        self._lock = threading.Lock()
+
+        self._columns = 0
+        self._buffer = None
+        self._length = 0
+        self._spill_path = None
+        self._spill_map = None
+        self._spilled_rows = 0
+        self.clear(columns)
+
+    def __len__(self):
+        return self._spilled_rows + self._length
+
+    @property
+    def columns(self):
+        return self._columns
+
+    def clear(self, columns=None):
+        """ Discards all recorded rows including the spill file.
+
+        @param int columns: optional, the new number of columns of each row
+        """
+        with self._lock:
+            if columns is not None:
+                self._columns = int(columns)
+            self._buffer = np.empty((self._initial_rows, self._columns), dtype='float64')
+            self._length = 0
+            self._spill_map = None
+            self._spilled_rows = 0
+            if self._spill_path is not None:
+                try:
+                    os.remove(self._spill_path)
+                except OSError:
+                    # Still mapped by a view handed out before (Windows). Left to the OS.
+                    pass
+                self._spill_path = None
+
+    def close(self):
+        """ Discards all recorded rows and removes the spill file.
+        """
+        self.clear()
+
+    def append(self, rows):
+        """ Appends a single row or a 2D array of rows.
+
+        @param numpy.ndarray rows: A single row of length columns or an array of shape (n, columns)
+        """
+        rows = np.asarray(rows, dtype='float64').reshape(-1, self._columns)
+        if rows.shape[0] == 0:
+            return
+        with self._lock:
+            if self._length + rows.shape[0] > self._buffer.shape[0]:
+                self._make_room(rows.shape[0])
+            self._buffer[self._length:self._length + rows.shape[0]] = rows
+            self._length += rows.shape[0]
+
+    def get_rows(self, start=0, stop=None):
+        """ Returns the recorded rows in the range [start, stop) (slice semantics).
+
+        @param int start: index of the first row
+        @param int stop: index after the last row, None for all rows
+
+        @return numpy.ndarray: read-only array of shape (n, columns). A view if the range lies
+                               completely in memory or in the spill file.
+        """
+        spill_map, spilled_rows, buffer, length = self._snapshot()
+        start, stop, _ = slice(start, stop).indices(spilled_rows + length)
+        return self._get_rows(spill_map, spilled_rows, buffer, start, max(start, stop))
+
+    def get_data(self):
+        """ Returns all recorded rows.
+
+        @return numpy.ndarray: read-only array of shape (n, columns)
+        """
+        return self.get_rows()
+
+    def last(self, number):
+        """ Returns the last recorded rows.
+
+        @param int number: The maximum number of rows to return
+
+        @return numpy.ndarray: read-only array of shape (n, columns), n <= number
+        """
+        spill_map, spilled_rows, buffer, length = self._snapshot()
+        total = spilled_rows + length
+        return self._get_rows(spill_map, spilled_rows, buffer, max(total - int(number), 0), total)
+
+    def window(self, start_time, stop_time):
+        """ Returns the recorded rows with start_time <= time < stop_time. The time is taken from
+        the first column.
+
+        @param float start_time: start of the time window
+        @param float stop_time: end of the time window (excluded)
+
+        @return numpy.ndarray: read-only array of shape (n, columns)
+        """
+        spill_map, spilled_rows, buffer, length = self._snapshot()
+        start = self._searchsorted(spill_map, spilled_rows, buffer, length, start_time)
+        stop = self._searchsorted(spill_map, spilled_rows, buffer, length, stop_time)
+        return self._get_rows(spill_map, spilled_rows, buffer, start, max(start, stop))
+
+    def _snapshot(self):
+        with self._lock:
+            return self._spill_map, self._spilled_rows, self._buffer, self._length
+
+    @staticmethod
+    def _searchsorted(spill_map, spilled_rows, buffer, length, value):
+        if spilled_rows > 0 and (length == 0 or value <= buffer[0, 0]):
+            return int(np.searchsorted(spill_map[:, 0], value))
+        return spilled_rows + int(np.searchsorted(buffer[:length, 0], value))
+
+    def _get_rows(self, spill_map, spilled_rows, buffer, start, stop):
+        if start >= spilled_rows:
+            rows = buffer[start - spilled_rows:stop - spilled_rows]
+            rows.flags.writeable = False
+            return rows
+        if stop <= spilled_rows:
+            return spill_map[start:stop]
+        rows = np.concatenate((spill_map[start:], buffer[:stop - spilled_rows]))
+        rows.flags.writeable = False
+        return rows
+
+    def _make_room(self, number):
+        """ Provides a buffer for at least number more rows. Has to be called with the lock held.
+        Existing buffers are never written to again, so views handed out before stay valid.
+        """
+        if 0 < self._max_memory_rows < self._length + number and self._length > 0:
+            self._spill()
+        size = self._buffer.shape[0]
+        while size < self._length + number:
+            size *= 2
+        if self._max_memory_rows > 0:
+            size = max(min(size, self._max_memory_rows), self._length + number)
+        buffer = np.empty((size, self._columns), dtype='float64')
+        buffer[:self._length] = self._buffer[:self._length]
+        self._buffer = buffer
+
+    def _spill(self):
+        """ Appends all in-memory rows to the spill file. Has to be called with the lock held.
+        """
+        if self._spill_path is None:
+            handle, self._spill_path = tempfile.mkstemp(prefix='counter_data_', suffix='.bin',
+                                                        dir=self._spill_directory)
+            os.close(handle)
+        with open(self._spill_path, 'ab') as file:
+            self._buffer[:self._length].tofile(file)
+        self._spilled_rows += self._length
+        self._length = 0
+        self._spill_map = np.memmap(self._spill_path, dtype='float64', mode='r',
+                                    shape=(self._spilled_rows, self._columns))
@@ -25,10 +25,12 @@ import numpy as np
 import time
 import matplotlib.pyplot as plt
 
-from core.module import Connector, StatusVar
+from core.module import Connector, ConfigOption, StatusVar
 from logic.generic_logic import GenericLogic
+from logic.counter_data_recorder import CounterDataRecorder
 from interface.slow_counter_interface import CountingMode
 from core.util.mutex import Mutex
+from core.util.ring_buffer import RingBuffer, RunningMedian
 
 
 class CounterLogic(GenericLogic):
@@ -62,6 +64,12 @@ class CounterLogic(GenericLogic):
     counter1 = Connector(interface='SlowCounterInterface')
     savelogic = Connector(interface='SaveLogic')
 
+    # config options
+    # Number of saved rows to hold in memory before they are spilled to a binary file (0: never)
+    _recorder_memory_rows = ConfigOption('recorder_memory_rows', 1000000, missing='nothing')
+    # Directory of the spill file. Default is the temporary directory of the system.
+    _recorder_spill_directory = ConfigOption('recorder_spill_directory', '', missing='nothing')
+
     # status vars
     _count_length = StatusVar('count_length', 300)
     _smooth_window_length = StatusVar('smooth_window_length', 10)
@@ -115,11 +123,12 @@ class CounterLogic(GenericLogic):
         number_of_detectors = constraints.max_detectors
 
         # initialize data arrays
-        self.countdata = np.zeros([len(self.get_channels()), self._count_length])
-        self.countdata_smoothed = np.zeros([len(self.get_channels()), self._count_length])
-        self.rawdata = np.zeros([len(self.get_channels()), self._counting_samples])
+        self._init_count_buffers()
         self._already_counted_samples = 0  # For gated counting
-        self._data_to_save = []
+        self._data_recorder = CounterDataRecorder(
+            columns=self._get_saved_columns(),
+            max_memory_rows=self._recorder_memory_rows,
+            spill_directory=self._recorder_spill_directory if self._recorder_spill_directory else None)
 
         # Flag to stop the loop
         self.stopRequested = False
@@ -141,6 +150,7 @@ class CounterLogic(GenericLogic):
             self._stopCount_wait()
 
         self.sigCountDataNext.disconnect()
+        self._data_recorder.close()
         return
 
     def get_hardware_constraints(self):
@@ -251,6 +261,55 @@ class CounterLogic(GenericLogic):
         """
         return self._counting_samples
 
+    @property
+    def countdata(self):
+        """ Copy of the count trace of each channel with shape (channels, count_length).
+        The underlying ring buffer is changed in-place by the counting loop.
+        """
+        return self._count_buffer.data.copy()
+
+    @property
+    def countdata_smoothed(self):
+        """ Copy of the median smoothed count trace of each channel with shape
+        (channels, count_length).
+        """
+        return self._smoothed_buffer.data.copy()
+
+    def _init_count_buffers(self):
+        """ (Re-)creates the count trace buffers and the smoother for the current settings. The
+        channel names are fetched once here instead of asking the hardware for every sample.
+        """
+        self._channels = self.get_channels()
+        self.rawdata = np.zeros([len(self._channels), self._counting_samples])
+        self._count_buffer = RingBuffer(self._count_length, len(self._channels))
+        self._smoothed_buffer = RingBuffer(self._count_length, len(self._channels))
+        self._smoother = RunningMedian(self._smooth_window_length, len(self._channels))
+
+    def _append_counts(self, counts):
+        """ Appends one value per channel to the count trace and updates the smoothed trace.
+        The last half of the smoothing window is set to the current median.
+
+        @param numpy.ndarray counts: array of shape (channels,) holding the new count values
+        """
+        self._count_buffer.append(counts)
+        median = self._smoother.update(counts)
+        self._smoothed_buffer.append(median)
+        self._smoothed_buffer.set_last(median, int(self._smooth_window_length / 2) + 1)
+
+    @property
+    def data_recorder(self):
+        """ The CounterDataRecorder holding the saved count trace. Each row contains the time in s
+        since the start of saving followed by the counts of each channel (gated modes: one column).
+        """
+        return self._data_recorder
+
+    def _get_saved_columns(self):
+        """ Returns the number of columns of the saved count trace for the current counting mode.
+        """
+        if self._counting_mode == CountingMode.CONTINUOUS:
+            return len(self.get_channels()) + 1
+        return 2
+
     def get_saving_state(self):
         """ Returns if the data is saved in the moment.
 
@@ -265,8 +324,8 @@ class CounterLogic(GenericLogic):
 
         @return bool: saving state
         """
-        if not resume:
-            self._data_to_save = []
+        if not resume or self._data_recorder.columns != self._get_saved_columns():
+            self._data_recorder.clear(columns=self._get_saved_columns())
             self._saving_start_time = time.time()
 
         self._saving = True
@@ -299,6 +358,8 @@ class CounterLogic(GenericLogic):
         parameters['Oversampling (Samples)'] = self._counting_samples
         parameters['Smooth Window Length (# of events)'] = self._smooth_window_length
 
+        saved_data = self._data_recorder.get_data()
+
         if to_file:
             # If there is a postfix then add separating underscore
             if postfix == '':
@@ -308,14 +369,14 @@ class CounterLogic(GenericLogic):
 
             # prepare the data in a dict or in an OrderedDict:
             header = 'Time (s)'
-            for i, detector in enumerate(self.get_channels()):
+            for i in range(self._data_recorder.columns - 1):
                 header = header + ',Signal{0} (counts/s)'.format(i)
 
-            data = {header: self._data_to_save}
+            data = {header: saved_data}
             filepath = self._save_logic.get_path_for_module(module_name='Counter')
 
             if save_figure:
-                fig = self.draw_figure(data=np.array(self._data_to_save))
+                fig = self.draw_figure(data=saved_data)
             else:
                 fig = None
             self._save_logic.save_data(data, filepath=filepath, parameters=parameters,
@@ -323,7 +384,7 @@ class CounterLogic(GenericLogic):
             self.log.info('Counter Trace saved to:\n{0}'.format(filepath))
 
         self.sigSavingStatusChanged.emit(self._saving)
-        return self._data_to_save, parameters
+        return saved_data, parameters
 
     def draw_figure(self, data):
         """ Draw figure to save with data file.
@@ -428,10 +489,7 @@ class CounterLogic(GenericLogic):
                 return -1
 
             # initialising the data arrays
-            self.rawdata = np.zeros([len(self.get_channels()), self._counting_samples])
-            self.countdata = np.zeros([len(self.get_channels()), self._count_length])
-            self.countdata_smoothed = np.zeros([len(self.get_channels()), self._count_length])
-            self._sampling_data = np.empty([len(self.get_channels()), self._counting_samples])
+            self._init_count_buffers()
 
             # the sample index for gated counting
             self._already_counted_samples = 0
@@ -512,19 +570,18 @@ class CounterLogic(GenericLogic):
         else:
             filelabel = 'snapshot_count_trace_' + name_tag
 
-        stop_time = self._count_length / self._count_frequency
-        time_step_size = stop_time / len(self.countdata)
-        x_axis = np.arange(0, stop_time, time_step_size)
+        x_axis = np.arange(self._count_length) / self._count_frequency
 
         # prepare the data in a dict or in an OrderedDict:
         data = OrderedDict()
-        chans = self.get_channels()
+        chans = self._channels
         savearr = np.empty((len(chans) + 1, len(x_axis)))
         savearr[0] = x_axis
         datastr = 'Time (s)'
 
+        countdata = self.countdata
         for i, ch in enumerate(chans):
-            savearr[i+1] = self.countdata[i]
+            savearr[i+1] = countdata[i]
             datastr += ',Signal {0} (counts/s)'.format(i)
 
         data[datastr] = savearr.transpose()
@@ -556,39 +613,26 @@ class CounterLogic(GenericLogic):
         Processes the raw data from the counting device
         @return:
         """
-        for i, ch in enumerate(self.get_channels()):
-            # remember the new count data in circular array
-            self.countdata[i, 0] = np.average(self.rawdata[i])
-        # move the array to the left to make space for the new data
-        self.countdata = np.roll(self.countdata, -1, axis=1)
-        # also move the smoothing array
-        self.countdata_smoothed = np.roll(self.countdata_smoothed, -1, axis=1)
-        # calculate the median and save it
-        window = -int(self._smooth_window_length / 2) - 1
-        for i, ch in enumerate(self.get_channels()):
-            self.countdata_smoothed[i, window:] = np.median(self.countdata[i,
-                                                            -self._smooth_window_length:])
+        # remember the new count data (average over the oversampling) in the circular buffers
+        counts = np.mean(self.rawdata, axis=1)
+        self._append_counts(counts)
 
         # save the data if necessary
         if self._saving:
              # if oversampling is necessary
             if self._counting_samples > 1:
-                chans = self.get_channels()
-                self._sampling_data = np.empty([len(chans) + 1, self._counting_samples])
-                self._sampling_data[0, :] = time.time() - self._saving_start_time
-                for i, ch in enumerate(chans):
-                    self._sampling_data[i+1, 0] = self.rawdata[i]
+                self._sampling_data = np.empty((self._counting_samples, len(self._channels) + 1))
+                self._sampling_data[:, 0] = time.time() - self._saving_start_time
+                self._sampling_data[:, 1:] = self.rawdata.transpose()
 
-                self._data_to_save.extend(list(self._sampling_data))
+                self._data_recorder.append(self._sampling_data)
             # if we don't want to use oversampling
             else:
                 # append tuple to data stream (timestamp, average counts)
-                chans = self.get_channels()
-                newdata = np.empty((len(chans) + 1, ))
+                newdata = np.empty((len(self._channels) + 1, ))
                 newdata[0] = time.time() - self._saving_start_time
-                for i, ch in enumerate(chans):
-                    newdata[i+1] = self.countdata[i, -1]
-                self._data_to_save.append(newdata)
+                newdata[1:] = counts
+                self._data_recorder.append(newdata)
         return
 
     def _process_data_gated(self):
@@ -596,15 +640,9 @@ class CounterLogic(GenericLogic):
         Processes the raw data from the counting device
         @return:
         """
-        # remember the new count data in circular array
-        self.countdata[0] = np.average(self.rawdata[0])
-        # move the array to the left to make space for the new data
-        self.countdata = np.roll(self.countdata, -1)
-        # also move the smoothing array
-        self.countdata_smoothed = np.roll(self.countdata_smoothed, -1)
-        # calculate the median and save it
-        self.countdata_smoothed[-int(self._smooth_window_length / 2) - 1:] = np.median(
-            self.countdata[-self._smooth_window_length:])
+        # remember the new count data in the circular buffers
+        counts = np.mean(self.rawdata, axis=1)
+        self._append_counts(counts)
 
         # save the data if necessary
         if self._saving:
@@ -613,12 +651,11 @@ class CounterLogic(GenericLogic):
                 self._sampling_data = np.empty((self._counting_samples, 2))
                 self._sampling_data[:, 0] = time.time() - self._saving_start_time
                 self._sampling_data[:, 1] = self.rawdata[0]
-                self._data_to_save.extend(list(self._sampling_data))
+                self._data_recorder.append(self._sampling_data)
             # if we don't want to use oversampling
             else:
                 # append tuple to data stream (timestamp, average counts)
-                self._data_to_save.append(np.array((time.time() - self._saving_start_time,
-                                                    self.countdata[-1])))
+                self._data_recorder.append((time.time() - self._saving_start_time, counts[0]))
         return
 
     def _process_data_finite_gated(self):
@@ -626,19 +663,16 @@ class CounterLogic(GenericLogic):
         Processes the raw data from the counting device
         @return:
         """
-        if self._already_counted_samples+len(self.rawdata[0]) >= len(self.countdata):
-            needed_counts = len(self.countdata) - self._already_counted_samples
-            self.countdata[0:needed_counts] = self.rawdata[0][0:needed_counts]
-            self.countdata = np.roll(self.countdata, -needed_counts)
+        needed_counts = self._count_length - self._already_counted_samples
+        if self.rawdata.shape[1] >= needed_counts:
+            self._count_buffer.append(self.rawdata[:, :needed_counts])
             self._already_counted_samples = 0
             self.stopRequested = True
         else:
-            # replace the first part of the array with the new data:
-            self.countdata[0:len(self.rawdata[0])] = self.rawdata[0]
-            # roll the array by the amount of data it had been inserted:
-            self.countdata = np.roll(self.countdata, -len(self.rawdata[0]))
+            # append the new data to the circular buffer
+            self._count_buffer.append(self.rawdata)
             # increment the index counter:
-            self._already_counted_samples += len(self.rawdata[0])
+            self._already_counted_samples += self.rawdata.shape[1]
         return
 
     def _stopCount_wait(self, timeout=5.0):
@@ -215,6 +215,31 @@ class SpectrometerScannerInterfuse(Base, ConfocalScannerInterface):
 
         return count_data
 
+    def start_block_scan(self, block_path=None, pixel_clock=False):
+        """ Block scanning is not supported by this interfuse. Use scan_line instead.
+
+        @param float[k][n] block_path: array k of n-part tuples defining the pixel positions of
+                                       the whole block
+        @param bool pixel_clock: whether we need to output a pixel clock for this block
+
+        @return int: error code (-1: block scanning not supported)
+        """
+        return -1
+
+    def read_block_scan(self):
+        """ Block scanning is not supported by this interfuse.
+
+        @return float[j][m]: [[-1.]] (error)
+        """
+        return np.array([[-1.]])
+
+    def stop_block_scan(self):
+        """ Block scanning is not supported by this interfuse. Nothing to stop.
+
+        @return int: error code (0:OK, -1:error)
+        """
+        return 0
+
     def close_scanner(self):
         """ Closes the scanner and cleans up afterwards.
 
@@ -189,6 +189,35 @@ class ScannerTiltInterfuse(GenericLogic, ConfocalScannerInterface):
             line_path[:][2] += self._calc_dz(line_path[:][0], line_path[:][1])
         return self._scanning_device.scan_line(line_path, pixel_clock)
 
+    def start_block_scan(self, block_path=None, pixel_clock=False):
+        """ Starts scanning a block of several lines (including the return paths in between) as
+        one hardware timed waveform.
+
+        @param float[k][n] block_path: array k of n-part tuples defining the pixel positions of
+                                       the whole block
+        @param bool pixel_clock: whether we need to output a pixel clock for this block
+
+        @return int: error code (0:OK, -1:error or block scanning not supported)
+        """
+        if self.tiltcorrection:
+            block_path[:][2] += self._calc_dz(block_path[:][0], block_path[:][1])
+        return self._scanning_device.start_block_scan(block_path, pixel_clock)
+
+    def read_block_scan(self):
+        """ Returns the counts of the pixels of the running block scan, which were acquired since
+        the last call.
+
+        @return float[j][m]: the photon counts per second for j new pixels with m channels
+        """
+        return self._scanning_device.read_block_scan()
+
+    def stop_block_scan(self):
+        """ Stops a running block scan and cleans up afterwards.
+
+        @return int: error code (0:OK, -1:error)
+        """
+        return self._scanning_device.stop_block_scan()
+
     def close_scanner(self):
         """ Closes the scanner and cleans up afterwards.
 
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the accumulator for the sweep lines recorded by the ODMRLogic.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import numpy as np
+
+from core.util.ring_buffer import RingBuffer
+from logic.counter_data_recorder import CounterDataRecorder
+
+
+class ODMRDataAccumulator:
+    """
+    Accumulates ODMR sweep lines of shape (channels, frequencies).
+
+    All lines are kept in a CounterDataRecorder (one flattened line per row), which can spill old
+    lines to a binary file to bound the memory usage. The mean over all lines and over the last
+    <average_lines> lines are updated with running sums, and the last <matrix_lines> lines are
+    held in a RingBuffer for the matrix plot. Adding a line therefore does not depend on the number
+    of lines recorded so far.
+    """
+
+    def __init__(self, channels, frequencies, matrix_lines, average_lines=0, initial_lines=1024,
+                 max_memory_lines=0, spill_directory=None):
+        """
+        @param int channels: The number of ODMR channels
+        @param int frequencies: The number of frequencies of each sweep line
+        @param int matrix_lines: The number of last lines provided by matrix
+        @param int average_lines: The number of last lines to average (0 means all)
+        @param int initial_lines: The number of lines to preallocate
+        @param int max_memory_lines: The number of lines to hold in memory before spilling them
+                                     to a binary file. 0 (default) keeps all lines in memory.
+        @param str spill_directory: The directory to create the spill file in. Default (None) is
+                                    the temporary directory of the system.
+        """
+        self._shape = (int(channels), int(frequencies))
+        self._lines = CounterDataRecorder(columns=self._shape[0] * self._shape[1],
+                                          initial_rows=initial_lines,
+                                          max_memory_rows=max_memory_lines,
+                                          spill_directory=spill_directory)
+        self._matrix = RingBuffer(matrix_lines, channels=self._shape[0] * self._shape[1])
+        self._sum = np.zeros(self._shape, dtype='float64')
+        self._window_sum = np.zeros(self._shape, dtype='float64')
+        self._average_lines = max(int(average_lines), 0)
+        self._lines_since_resync = 0
+
+    def __len__(self):
+        return len(self._lines)
+
+    @property
+    def matrix(self):
+        """ Copy of the last matrix_lines lines with shape (matrix_lines, channels, frequencies),
+        newest line first. Lines not recorded yet are zero. A copy, since the underlying ring
+        buffer is changed in-place by add_line.
+        """
+        return self._matrix.data.transpose().reshape((-1,) + self._shape)[::-1].copy()
+
+    @property
+    def matrix_lines(self):
+        return len(self._matrix)
+
+    @matrix_lines.setter
+    def matrix_lines(self, lines):
+        self._matrix = RingBuffer(lines, channels=self._shape[0] * self._shape[1])
+        self._matrix.append(self._lines.last(lines).transpose())
+
+    @property
+    def average_lines(self):
+        return self._average_lines
+
+    @average_lines.setter
+    def average_lines(self, lines):
+        self._average_lines = max(int(lines), 0)
+        self._resync_window_sum()
+
+    def clear(self):
+        """ Discards all lines.
+        """
+        self._lines.clear()
+        self._matrix.clear()
+        self._sum[:] = 0
+        self._window_sum[:] = 0
+        self._lines_since_resync = 0
+
+    def close(self):
+        """ Discards all lines and removes the spill file.
+        """
+        self._lines.close()
+
+    def add_line(self, line):
+        """ Adds a new sweep line and updates the running sums.
+
+        @param numpy.ndarray line: The sweep line of shape (channels, frequencies)
+        """
+        line = np.asarray(line, dtype='float64').reshape(self._shape)
+        if 0 < self._average_lines <= len(self._lines):
+            index = len(self._lines) - self._average_lines
+            self._window_sum -= self._lines.get_rows(index, index + 1).reshape(self._shape)
+        self._lines.append(line.ravel())
+        self._matrix.append(line.ravel())
+        self._sum += line
+        self._window_sum += line
+        # Recalculate the window sum once per window to avoid the accumulation of rounding errors
+        self._lines_since_resync += 1
+        if 0 < self._average_lines <= self._lines_since_resync:
+            self._resync_window_sum()
+
+    def get_lines(self):
+        """ Returns all recorded lines.
+
+        @return numpy.ndarray: read-only array of shape (lines, channels, frequencies), newest line
+                               first. A view unless the lines are partly spilled to disk.
+        """
+        return self._lines.get_data().reshape((-1,) + self._shape)[::-1]
+
+    def mean(self):
+        """ Returns the mean over the last average_lines lines (all lines if average_lines is 0).
+
+        @return numpy.ndarray: The mean signal of shape (channels, frequencies)
+        """
+        if self._average_lines <= 0 or self._average_lines >= len(self._lines):
+            return self._sum / max(len(self._lines), 1)
+        return self._window_sum / self._average_lines
+
+    def _resync_window_sum(self):
+        self._lines_since_resync = 0
+        if self._average_lines <= 0:
+            self._window_sum[:] = 0
+            return
+        lines = self._lines.last(self._average_lines)
+        self._window_sum = lines.reshape((-1,) + self._shape).sum(axis=0)
@@ -32,6 +32,7 @@ import lmfit
 
 from logic.generic_logic import GenericLogic
 from core.util.mutex import Mutex
+from logic.odmr_data_accumulator import ODMRDataAccumulator
 from core.module import Connector, ConfigOption, StatusVar
 
 
@@ -54,6 +55,10 @@ class ODMRLogic(GenericLogic):
                     'LIST',
                     missing='warn',
                     converter=lambda x: MicrowaveMode[x.upper()])
+    # Number of raw data lines to hold in memory before spilling them to disk (0: never)
+    _raw_data_memory_lines = ConfigOption('raw_data_memory_lines', 0, missing='nothing')
+    # Directory of the spill file. Default is the temporary directory of the system.
+    _raw_data_spill_directory = ConfigOption('raw_data_spill_directory', '', missing='nothing')
 
     clock_frequency = StatusVar('clock_frequency', 200)
     cw_mw_frequency = StatusVar('cw_mw_frequency', 2870e6)
@@ -124,12 +129,9 @@ class ODMRLogic(GenericLogic):
 
         # Initalize the ODMR data arrays (mean signal and sweep matrix)
         self._initialize_odmr_plots()
-        # Raw data array
-        self.odmr_raw_data = np.zeros(
-            [self.number_of_lines,
-             len(self._odmr_counter.get_odmr_channels()),
-            self.odmr_plot_x.size]
-            )
+        # Raw data accumulator
+        self._raw_data = None
+        self._initialize_raw_data(self.number_of_lines)
 
         # Switch off microwave and set CW frequency and power
         self.mw_off()
@@ -158,6 +160,7 @@ class ODMRLogic(GenericLogic):
         self._mw_device.off()
         # Disconnect signals
         self.sigNextLine.disconnect()
+        self._raw_data.close()
 
     @fc.constructor
     def sv_set_fits(self, val):
@@ -214,6 +217,30 @@ class ODMRLogic(GenericLogic):
         self.sigOdmrFitUpdated.emit(self.odmr_fit_x, self.odmr_fit_y, {}, current_fit)
         return
 
+    def _initialize_raw_data(self, initial_lines):
+        """ (Re-)creates the raw data accumulator for the current frequency list.
+
+        @param int initial_lines: The number of raw data lines to preallocate
+        """
+        if self._raw_data is not None:
+            self._raw_data.close()
+        if self._raw_data_memory_lines > 0:
+            initial_lines = min(initial_lines, self._raw_data_memory_lines)
+        self._raw_data = ODMRDataAccumulator(
+            channels=len(self._odmr_counter.get_odmr_channels()),
+            frequencies=self.odmr_plot_x.size,
+            matrix_lines=self.number_of_lines,
+            average_lines=self.lines_to_average,
+            initial_lines=initial_lines,
+            max_memory_lines=self._raw_data_memory_lines,
+            spill_directory=self._raw_data_spill_directory if self._raw_data_spill_directory else None)
+
+    @property
+    def odmr_raw_data(self):
+        """ All recorded sweep lines with shape (lines, channels, frequencies), newest line first.
+        """
+        return self._raw_data.get_lines()
+
     def set_trigger(self, trigger_pol, frequency):
         """
         Set trigger polarity of external microwave trigger (for list and sweep mode).
@@ -245,18 +272,9 @@ class ODMRLogic(GenericLogic):
         """
         self.lines_to_average = int(lines_to_average)
 
-        if self.lines_to_average <= 0:
-            self.odmr_plot_y = np.mean(
-                self.odmr_raw_data[:max(1, self.elapsed_sweeps), :, :],
-                axis=0,
-                dtype=np.float64
-            )
-        else:
-            self.odmr_plot_y = np.mean(
-                self.odmr_raw_data[:max(1, min(self.lines_to_average, self.elapsed_sweeps)), :, :],
-                axis=0,
-                dtype=np.float64
-            )
+        with self.threadlock:
+            self._raw_data.average_lines = self.lines_to_average
+            self.odmr_plot_y = self._raw_data.mean()
 
         self.sigOdmrPlotsUpdated.emit(self.odmr_plot_x, self.odmr_plot_y, self.odmr_plot_xy)
         self.sigParameterUpdated.emit({'average_length': self.lines_to_average})
@@ -342,6 +360,9 @@ class ODMRLogic(GenericLogic):
         """
         if isinstance(number_of_lines, int):
             self.number_of_lines = number_of_lines
+            with self.threadlock:
+                self._raw_data.matrix_lines = self.number_of_lines
+                self.odmr_plot_xy = self._raw_data.matrix
         else:
             self.log.warning('set_matrix_line_number failed. '
                              'Input parameter number_of_lines is no integer.')
@@ -613,11 +634,7 @@ class ODMRLogic(GenericLogic):
                 estimated_number_of_lines = self.number_of_lines
             self.log.debug('Estimated number of raw data lines: {0:d}'
                            ''.format(estimated_number_of_lines))
-            self.odmr_raw_data = np.zeros(
-                [estimated_number_of_lines,
-                 len(self._odmr_counter.get_odmr_channels()),
-                 self.odmr_plot_x.size]
-            )
+            self._initialize_raw_data(estimated_number_of_lines)
             self.sigNextLine.emit()
             return 0
 
@@ -710,45 +727,14 @@ class ODMRLogic(GenericLogic):
                 self.sigNextLine.emit()
                 return
 
-            # Add new count data to raw_data array and append if array is too small
+            # Add new count data to the raw data. The mean signal and the plot matrix are updated
+            # by the accumulator without touching the older lines.
             if self._clearOdmrData:
-                self.odmr_raw_data[:, :, :] = 0
+                self._raw_data.clear()
                 self._clearOdmrData = False
-            if self.elapsed_sweeps == (self.odmr_raw_data.shape[0] - 1):
-                expanded_array = np.zeros(self.odmr_raw_data.shape)
-                self.odmr_raw_data = np.concatenate((self.odmr_raw_data, expanded_array), axis=0)
-                self.log.warning('raw data array in ODMRLogic was not big enough for the entire '
-                                 'measurement. Array will be expanded.\nOld array shape was '
-                                 '({0:d}, {1:d}), new shape is ({2:d}, {3:d}).'
-                                 ''.format(self.odmr_raw_data.shape[0] - self.number_of_lines,
-                                           self.odmr_raw_data.shape[1],
-                                           self.odmr_raw_data.shape[0],
-                                           self.odmr_raw_data.shape[1]))
-
-            # shift data in the array "up" and add new data at the "bottom"
-            self.odmr_raw_data = np.roll(self.odmr_raw_data, 1, axis=0)
-
-            self.odmr_raw_data[0] = new_counts
-
-            # Add new count data to mean signal
-            if self._clearOdmrData:
-                self.odmr_plot_y[:, :] = 0
-
-            if self.lines_to_average <= 0:
-                self.odmr_plot_y = np.mean(
-                    self.odmr_raw_data[:max(1, self.elapsed_sweeps), :, :],
-                    axis=0,
-                    dtype=np.float64
-                )
-            else:
-                self.odmr_plot_y = np.mean(
-                    self.odmr_raw_data[:max(1, min(self.lines_to_average, self.elapsed_sweeps)), :, :],
-                    axis=0,
-                    dtype=np.float64
-                )
-
-            # Set plot slice of matrix
-            self.odmr_plot_xy = self.odmr_raw_data[:self.number_of_lines, :, :]
+            self._raw_data.add_line(new_counts)
+            self.odmr_plot_y = self._raw_data.mean()
+            self.odmr_plot_xy = self._raw_data.matrix
 
             # Update elapsed time/sweeps
             self.elapsed_sweeps += 1
@@ -810,6 +796,7 @@ class ODMRLogic(GenericLogic):
 
         if tag is None:
             tag = ''
+        raw_data = self.odmr_raw_data
         for nch, channel in enumerate(self.get_odmr_channels()):
             # two paths to save the raw data and the odmr scan data.
             filepath = self._save_logic.get_path_for_module(module_name='ODMR')
@@ -827,7 +814,7 @@ class ODMRLogic(GenericLogic):
             data2 = OrderedDict()
             data['frequency (Hz)'] = self.odmr_plot_x
             data['count data (counts/s)'] = self.odmr_plot_y[nch]
-            data2['count data (counts/s)'] = self.odmr_raw_data[:self.elapsed_sweeps, nch, :]
+            data2['count data (counts/s)'] = raw_data[:, nch, :]
 
             parameters = OrderedDict()
             parameters['Microwave CW Power (dBm)'] = self.cw_mw_power
@@ -851,22 +838,22 @@ class ODMRLogic(GenericLogic):
                 cbar_range=colorscale_range,
                 percentile_range=percentile_range)
 
-            self._save_logic.save_data(data,
-                                       filepath=filepath,
-                                       parameters=parameters,
-                                       filelabel=filelabel,
-                                       fmt='%.6e',
-                                       delimiter='\t',
-                                       timestamp=timestamp,
-                                       plotfig=fig)
-
-            self._save_logic.save_data(data2,
-                                       filepath=filepath2,
-                                       parameters=parameters,
-                                       filelabel=filelabel2,
-                                       fmt='%.6e',
-                                       delimiter='\t',
-                                       timestamp=timestamp)
+            self._save_logic.save_data_async(data,
+                                             filepath=filepath,
+                                             parameters=parameters,
+                                             filelabel=filelabel,
+                                             fmt='%.6e',
+                                             delimiter='\t',
+                                             timestamp=timestamp,
+                                             plotfig=fig)
+
+            self._save_logic.save_data_async(data2,
+                                             filepath=filepath2,
+                                             parameters=parameters,
+                                             filelabel=filelabel2,
+                                             fmt='%.6e',
+                                             delimiter='\t',
+                                             timestamp=timestamp)
 
             self.log.info('ODMR data saved to:\n{0}'.format(filepath))
         return
@@ -40,6 +40,15 @@ class OptimizerLogic(GenericLogic):
     confocalscanner1 = Connector(interface='ConfocalScannerInterface')
     fitlogic = Connector(interface='FitLogic')
 
+    # config options
+    # 'raster' scans the whole xy refocus image. 'cross' and 'spiral' sample a sparse pattern around
+    # the last position and fit after each scanned line until the position is precise enough.
+    refocus_mode = ConfigOption('refocus_mode', 'raster', missing='nothing')
+    # standard error of the fitted xy position (in m) at which an adaptive refocus stops
+    adaptive_precision = ConfigOption('adaptive_precision', 10e-9, missing='nothing')
+    # maximal number of patterns sampled by an adaptive refocus
+    adaptive_max_rounds = ConfigOption('adaptive_max_rounds', 5, missing='nothing')
+
     # declare status vars
     _clock_frequency = StatusVar('clock_frequency', 50)
     return_slowness = StatusVar(default=20)
@@ -55,6 +64,7 @@ class OptimizerLogic(GenericLogic):
 
     # "private" signals to keep track of activities here in the optimizer logic
     _sigScanNextXyLine = QtCore.Signal()
+    _sigScanNextAdaptiveLine = QtCore.Signal()
     _sigScanZLine = QtCore.Signal()
     _sigCompletedXyOptimizerScan = QtCore.Signal()
     _sigDoNextOptimizationStep = QtCore.Signal()
@@ -81,6 +91,18 @@ class OptimizerLogic(GenericLogic):
         # Keep track of who called the refocus
         self._caller_tag = ''
 
+        # state of the adaptive xy refocus
+        self._adaptive_lines = list()
+        self._adaptive_positions = list()
+        self._adaptive_counts = list()
+        self._adaptive_center = (0., 0.)
+        self._adaptive_fit = None
+        self._adaptive_round = 0
+        self._adaptive_pixels = 0
+        # scan time saved by the adaptive xy refocus compared to the raster scan in s (negative if
+        # the adaptive refocus took longer)
+        self.refocus_time_saved = 0.
+
     def on_activate(self):
         """ Initialisation performed during activation of the module.
 
@@ -106,6 +128,12 @@ class OptimizerLogic(GenericLogic):
 
         self._max_offset = 3.
 
+        if self.refocus_mode not in ('raster', 'cross', 'spiral'):
+            self.log.error('Unknown refocus_mode "{0}". Please use "raster", "cross" or "spiral". '
+                           'The xy refocus image will be scanned completely.'
+                           ''.format(self.refocus_mode))
+            self.refocus_mode = 'raster'
+
         # Sets the current position to the center of the maximal scanning range
         self._current_x = (self.x_range[0] + self.x_range[1]) / 2
         self._current_y = (self.y_range[0] + self.y_range[1]) / 2
@@ -126,6 +154,8 @@ class OptimizerLogic(GenericLogic):
 
         # Sets connections between signals and functions
         self._sigScanNextXyLine.connect(self._refocus_xy_line, QtCore.Qt.QueuedConnection)
+        self._sigScanNextAdaptiveLine.connect(
+            self._refocus_adaptive_line, QtCore.Qt.QueuedConnection)
         self._sigScanZLine.connect(self.do_z_optimization, QtCore.Qt.QueuedConnection)
         self._sigCompletedXyOptimizerScan.connect(self._set_optimized_xy_from_fit, QtCore.Qt.QueuedConnection)
 
@@ -222,6 +252,7 @@ class OptimizerLogic(GenericLogic):
         self.optim_sigma_x = 0.
         self.optim_sigma_y = 0.
         self.optim_sigma_z = 0.
+        self.refocus_time_saved = 0.
         #
         self._xy_scan_line_count = 0
         self._optimization_step = 0
@@ -423,6 +454,196 @@ class OptimizerLogic(GenericLogic):
         self.sigImageUpdated.emit()
         self._sigDoNextOptimizationStep.emit()
 
+    def _initialize_adaptive_refocus(self):
+        """Initialisation of the adaptive xy refocus around the current optim pos."""
+        self._adaptive_positions = list()
+        self._adaptive_counts = list()
+        self._adaptive_center = (self.optim_pos_x, self.optim_pos_y)
+        self._adaptive_fit = None
+        self._adaptive_round = 0
+        self._adaptive_pixels = 0
+        self._adaptive_lines = self._make_adaptive_pattern(*self._adaptive_center)
+
+    def _make_adaptive_pattern(self, x0, y0):
+        """ Makes the lines of a sparse sampling pattern of the size of the xy refocus image.
+
+        @param float x0: x position of the pattern center
+        @param float y0: y position of the pattern center
+
+        @return list: arrays of shape (2, n) with the x and y positions of the lines to scan
+        """
+        half_size = 0.5 * self.refocus_XY_size
+        if self.refocus_mode == 'spiral':
+            # archimedean spiral with 3 turns from the center outwards
+            phi = np.linspace(0, 6 * np.pi, 2 * self.optimizer_XY_res)
+            radius = half_size * phi / phi[-1]
+            lines = [np.vstack((x0 + radius * np.cos(phi), y0 + radius * np.sin(phi)))]
+        else:
+            offsets = np.linspace(-half_size, half_size, self.optimizer_XY_res)
+            lines = [np.vstack((x0 + offsets, np.full(offsets.shape, y0))),
+                     np.vstack((np.full(offsets.shape, x0), y0 + offsets))]
+        for line in lines:
+            line[0] = np.clip(line[0], self.x_range[0], self.x_range[1])
+            line[1] = np.clip(line[1], self.y_range[0], self.y_range[1])
+        return lines
+
+    def _refocus_adaptive_line(self):
+        """Scanning a line of the adaptive xy optimization pattern and fitting all points
+        sampled so far.
+        This method repeats itself using the _sigScanNextAdaptiveLine
+        until the position is precise enough or adaptive_max_rounds patterns are scanned.
+        """
+        n_ch = len(self._scanning_device.get_scanner_axes())
+        # stop scanning if instructed
+        if self.stopRequested:
+            with self.threadlock:
+                self.stopRequested = False
+                self.finish_refocus()
+                self.sigImageUpdated.emit()
+                self.sigRefocusFinished.emit(
+                    self._caller_tag,
+                    [self.optim_pos_x, self.optim_pos_y, self.optim_pos_z, 0][0:n_ch])
+                return
+
+        positions = self._adaptive_lines.pop(0)
+        status = self._move_to_start_pos([positions[0, 0], positions[1, 0], self.optim_pos_z])
+        if status < 0:
+            self.log.error('Error during move to starting point.')
+            self.stop_refocus()
+            self._sigScanNextAdaptiveLine.emit()
+            return
+
+        lsx = positions[0]
+        lsy = positions[1]
+        lsz = self.optim_pos_z * np.ones(lsx.shape)
+        if n_ch <= 3:
+            line = np.vstack((lsx, lsy, lsz)[0:n_ch])
+        else:
+            line = np.vstack((lsx, lsy, lsz, np.zeros(lsx.shape)))
+
+        line_counts = self._scanning_device.scan_line(line)
+        if np.any(line_counts == -1):
+            self.log.error('The scan went wrong, killing the scanner.')
+            self.stop_refocus()
+            self._sigScanNextAdaptiveLine.emit()
+            return
+
+        # Approximation: every line is counted with a full return of return_slowness pixels,
+        # although the move from the end of one pattern line to the start of the next is usually
+        # shorter than the return of a raster line.
+        self._adaptive_pixels += self.return_slowness + positions.shape[1]
+        self._adaptive_positions.append(positions)
+        self._adaptive_counts.append(line_counts)
+        self._add_samples_to_xy_refocus_image(positions, line_counts)
+        self.sigImageUpdated.emit()
+
+        if self._fit_adaptive_xy() <= self.adaptive_precision:
+            self._set_optimized_xy_from_adaptive_fit()
+            return
+
+        if len(self._adaptive_lines) == 0:
+            self._adaptive_round += 1
+            if self._adaptive_round >= self.adaptive_max_rounds:
+                self.log.warning('Adaptive refocus did not reach the requested precision of '
+                                 '{0:.3e} m.'.format(self.adaptive_precision))
+                self._set_optimized_xy_from_adaptive_fit()
+                return
+            # sample the next pattern around the latest estimate
+            self._adaptive_lines = self._make_adaptive_pattern(*self._adaptive_center)
+        self._sigScanNextAdaptiveLine.emit()
+
+    def _add_samples_to_xy_refocus_image(self, positions, counts):
+        """ Writes sampled counts into the closest pixels of the xy refocus image.
+
+        @param numpy.ndarray positions: x and y positions of the samples with shape (2, n)
+        @param numpy.ndarray counts: counts of the samples with shape (n, channels)
+        """
+        if len(self._X_values) < 2 or len(self._Y_values) < 2:
+            return
+        step_x = self._X_values[1] - self._X_values[0]
+        step_y = self._Y_values[1] - self._Y_values[0]
+        if step_x <= 0 or step_y <= 0:
+            return
+        ix = np.rint((positions[0] - self._X_values[0]) / step_x).astype(int)
+        iy = np.rint((positions[1] - self._Y_values[0]) / step_y).astype(int)
+        valid = (ix >= 0) & (ix < len(self._X_values)) & (iy >= 0) & (iy < len(self._Y_values))
+        s_ch = len(self.get_scanner_count_channels())
+        self.xy_refocus_image[iy[valid], ix[valid], 3:3 + s_ch] = counts[valid]
+
+    def _fit_adaptive_xy(self):
+        """ Fits a 2D gaussian to all points sampled by the adaptive xy refocus so far.
+
+        The count rates are weighted with their poissonian uncertainty, i.e. the fit is the
+        gaussian approximation of a maximum likelihood fit of the photon counts.
+
+        @return float: standard error of the fitted position in m, inf if the fit failed
+        """
+        x_axis, y_axis = np.hstack(self._adaptive_positions)
+        data = np.vstack(self._adaptive_counts)[:, self.opt_channel]
+        signal = data - data.min()
+        # the position is undetermined as long as not both directions are sampled
+        if np.ptp(x_axis) <= 0 or np.ptp(y_axis) <= 0 or np.sum(signal) <= 0:
+            return np.inf
+
+        model, params = self._fit_logic.make_twoDgaussian_model()
+        min_sigma = self.refocus_XY_size / max(self.optimizer_XY_res, 2) / 2
+        params['amplitude'].set(value=float(np.ptp(data)), min=0)
+        # maximum likelihood estimate of the center (see estimate_twoDgaussian_MLE)
+        params['center_x'].set(value=np.sum(x_axis * signal) / np.sum(signal),
+                               min=x_axis.min(), max=x_axis.max())
+        params['center_y'].set(value=np.sum(y_axis * signal) / np.sum(signal),
+                               min=y_axis.min(), max=y_axis.max())
+        params['sigma_x'].set(value=self.refocus_XY_size / 4, min=min_sigma,
+                              max=self.refocus_XY_size)
+        params['sigma_y'].set(value=self.refocus_XY_size / 4, min=min_sigma,
+                              max=self.refocus_XY_size)
+        # a sparse pattern can not resolve the orientation of an elliptic spot
+        params['theta'].set(value=0., vary=False)
+        params['offset'].set(value=float(data.min()), min=0)
+
+        weights = 1 / np.sqrt(np.maximum(data, self._clock_frequency) * self._clock_frequency)
+        try:
+            result = model.fit(data, x=(x_axis, y_axis), params=params, weights=weights)
+        except:
+            self.log.debug('Adaptive 2D gaussian fit failed.')
+            return np.inf
+        if result.success is False:
+            return np.inf
+
+        self._adaptive_fit = result.best_values
+        self._adaptive_center = (result.best_values['center_x'], result.best_values['center_y'])
+        errors = [result.params['center_x'].stderr, result.params['center_y'].stderr]
+        if any(error is None or not np.isfinite(error) for error in errors):
+            return np.inf
+        return max(errors)
+
+    def _set_optimized_xy_from_adaptive_fit(self):
+        """Set the optimized xy position from the last adaptive fit."""
+        fit = self._adaptive_fit
+        if fit is not None \
+                and abs(self._initial_pos_x - fit['center_x']) < self._max_offset \
+                and abs(self._initial_pos_y - fit['center_y']) < self._max_offset \
+                and self.x_range[0] <= fit['center_x'] <= self.x_range[1] \
+                and self.y_range[0] <= fit['center_y'] <= self.y_range[1]:
+            self.optim_pos_x = fit['center_x']
+            self.optim_pos_y = fit['center_y']
+            self.optim_sigma_x = fit['sigma_x']
+            self.optim_sigma_y = fit['sigma_y']
+        else:
+            self.log.error('Error: Adaptive 2D Gaussian Fit was not successfull!.')
+            self.optim_pos_x = self._initial_pos_x
+            self.optim_pos_y = self._initial_pos_y
+            self.optim_sigma_x = 0.
+            self.optim_sigma_y = 0.
+
+        # pixels of the raster scan: each line and its return line plus the move to the start
+        raster_pixels = 2 * self.optimizer_XY_res ** 2 + self.return_slowness
+        self.refocus_time_saved += (raster_pixels - self._adaptive_pixels) / self._clock_frequency
+
+        # emit image updated signal so crosshair can be updated from this fit
+        self.sigImageUpdated.emit()
+        self._sigDoNextOptimizationStep.emit()
+
     def do_z_optimization(self):
         """ Do the z axis optimization."""
         # z scaning
@@ -504,6 +725,14 @@ class OptimizerLogic(GenericLogic):
                     self.optim_pos_x,
                     self.optim_pos_y,
                     self.optim_pos_z))
+        if self.refocus_mode != 'raster':
+            if self.refocus_time_saved >= 0:
+                self.log.info('Adaptive refocus saved {0:.2f} s of scan time compared to a raster '
+                              'scan.'.format(self.refocus_time_saved))
+            else:
+                # many refinement rounds can take longer than a single raster scan
+                self.log.info('Adaptive refocus took {0:.2f} s more scan time than a raster scan.'
+                              ''.format(-self.refocus_time_saved))
 
         # Signal that the optimization has finished, and "return" the optimal position along with
         # caller_tag
@@ -632,7 +861,11 @@ class OptimizerLogic(GenericLogic):
         # Launch the next step
         if this_step == 'XY':
             self._initialize_xy_refocus_image()
-            self._sigScanNextXyLine.emit()
+            if self.refocus_mode == 'raster':
+                self._sigScanNextXyLine.emit()
+            else:
+                self._initialize_adaptive_refocus()
+                self._sigScanNextAdaptiveLine.emit()
         elif this_step == 'Z':
             self._initialize_z_refocus_image()
             self._sigScanZLine.emit()
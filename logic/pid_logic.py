@@ -20,10 +20,9 @@ Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
 top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
 """
 
-import numpy as np
-
 from core.module import Connector, ConfigOption, StatusVar
 from core.util.mutex import Mutex
+from core.util.ring_buffer import RingBuffer
 from logic.generic_logic import GenericLogic
 from qtpy import QtCore
 
@@ -60,7 +59,7 @@ class PIDLogic(GenericLogic):
         self._controller = self.controller()
         self._save_logic = self.savelogic()
 
-        self.history = np.zeros([3, self.bufferLength])
+        self._history = RingBuffer(self.bufferLength, channels=3)
         self.savingState = False
         self.enabled = False
         self.timer = QtCore.QTimer()
@@ -72,6 +71,14 @@ class PIDLogic(GenericLogic):
         """ Perform required deactivation. """
         pass
 
+    @property
+    def history(self):
+        """ Copy of the process value, control value and setpoint history with shape
+        (3, bufferLength), oldest values first. The underlying ring buffer is changed in-place by
+        the control loop.
+        """
+        return self._history.data.copy()
+
     def getBufferLength(self):
         """ Get the current data buffer length.
         """
@@ -91,10 +98,9 @@ class PIDLogic(GenericLogic):
     def loop(self):
         """ Execute step in the data recording loop: save one of each control and process values
         """
-        self.history = np.roll(self.history, -1, axis=1)
-        self.history[0, -1] = self._controller.get_process_value()
-        self.history[1, -1] = self._controller.get_control_value()
-        self.history[2, -1] = self._controller.get_setpoint()
+        self._history.append((self._controller.get_process_value(),
+                              self._controller.get_control_value(),
+                              self._controller.get_setpoint()))
         self.sigUpdateDisplay.emit()
         if self.enabled:
             self.timer.start(self.timestep)
@@ -126,7 +132,7 @@ class PIDLogic(GenericLogic):
             @param int newBufferLength: new buffer length
         """
         self.bufferLength = newBufferLength
-        self.history = np.zeros([3, self.bufferLength])
+        self._history = RingBuffer(self.bufferLength, channels=3)
 
     def get_kp(self):
         """ Return the proportional constant.
@@ -77,6 +77,11 @@ class PulseAnalyzer(PulseAnalyzerBase):
     7) Make sure that no two analysis methods in any module share a keyword argument of different
        default data type.
     8) The keyword "method" must not be used in the analysis method parameters
+    9) Analysis methods should process the whole 2D "laser_data" array at once (e.g. by numpy
+       reductions along the time bin axis) instead of looping over single laser pulses. Cases that
+       would cause a division by zero must be masked and yield 0.0 for signal and error.
+    10) Analysis methods must not alter "laser_data" since the same array can be analysed several
+        times with different parameters (see "analyse_laser_pulses_batch").
 
     See BasicPulseAnalyzer class for an example usage.
     """
@@ -208,6 +213,56 @@ class PulseAnalyzer(PulseAnalyzerBase):
         kwargs = self._get_analysis_method_kwargs(analysis_method)
         return analysis_method(laser_data=laser_data, **kwargs)
 
+    def analyse_laser_pulses_batch(self, laser_data, settings_list):
+        """
+        Analyse the same laser_data with several different analysis settings, e.g. to preview
+        alternative signal/normalization windows without extracting the laser pulses again.
+        The current analysis settings are not changed.
+
+        Each settings dict can contain the analysis method name (key "method") and parameters to
+        use instead of the current analysis settings. Missing items are taken from the current
+        analysis settings. Unknown methods or parameters are ignored with a warning.
+
+        @param numpy.ndarray laser_data: 2D numpy array (dtype='int64') containing the timetraces
+                                         for all extracted laser pulses.
+        @param list settings_list: list of dicts containing the analysis settings to use
+        @return list: list of tuples (signal data, measurement error) in the order of
+                      settings_list. See analyse_laser_pulses.
+        """
+        results = list()
+        for settings in settings_list:
+            method_name = settings.get('method', self._current_analysis_method)
+            if method_name not in self._analysis_methods:
+                self.log.warning('Analysis method "{0}" could not be found in PulseAnalyzer.\n'
+                                 'Current analysis method "{1}" will be used instead.'
+                                 ''.format(method_name, self._current_analysis_method))
+                method_name = self._current_analysis_method
+            analysis_method = self._analysis_methods[method_name]
+
+            kwargs = self._get_analysis_method_kwargs(analysis_method)
+            rejected = list()
+            for parameter, value in settings.items():
+                if parameter == 'method':
+                    continue
+                if parameter not in kwargs:
+                    rejected.append(parameter)
+                    continue
+                # Accept integer values (e.g. from JSON or scripts) for float parameters
+                if isinstance(kwargs[parameter], float) and isinstance(value, (int, float)) \
+                        and not isinstance(value, bool):
+                    value = float(value)
+                if type(value) == type(kwargs[parameter]):
+                    kwargs[parameter] = value
+                else:
+                    rejected.append('{0} ({1} instead of {2})'.format(
+                        parameter, type(value).__name__, type(kwargs[parameter]).__name__))
+            if rejected:
+                self.log.warning('Analysis parameters not applicable for analysis method "{0}".\n'
+                                 'Parameters will be ignored: {1}'
+                                 ''.format(method_name, ', '.join(rejected)))
+            results.append(analysis_method(laser_data=laser_data, **kwargs))
+        return results
+
     def _get_analysis_method_kwargs(self, method):
         """
         Get the proper values for keyword arguments other than "laser_data" for <method>.
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the storage backend for the pulse objects (PulseBlock, PulseBlockEnsemble and
+PulseSequence) created by the SequenceGeneratorLogic.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class PulseAssetStore:
+    """
+    Single-file SQLite database holding serialized PulseBlock, PulseBlockEnsemble and
+    PulseSequence instances.
+
+    Each pulse object is stored as pickle together with its type (file extension used by the old
+    file based storage: 'block', 'ensemble' or 'sequence') and its name as primary key.
+    The sampling_information dict of ensembles and sequences is stored in a separate table, so it
+    can be updated without serializing the entire pulse object again.
+    Entries that turn out to be corrupted are moved to a quarantine table instead of being deleted.
+    """
+    asset_types = ('block', 'ensemble', 'sequence')
+
+    def __init__(self, path):
+        """
+        @param str path: The path of the database file. Will be created if not present.
+        """
+        self.path = path
+        # The connection is shared by all threads of the SequenceGeneratorLogic (e.g. the sampling
+        # worker pool). Access is serialized by a lock.
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute('CREATE TABLE IF NOT EXISTS assets ('
+                                     'type TEXT NOT NULL, '
+                                     'name TEXT NOT NULL, '
+                                     'data BLOB NOT NULL, '
+                                     'PRIMARY KEY (type, name))')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS sampling_information ('
+                                     'type TEXT NOT NULL, '
+                                     'name TEXT NOT NULL, '
+                                     'data BLOB NOT NULL, '
+                                     'PRIMARY KEY (type, name))')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS quarantined_assets ('
+                                     'type TEXT NOT NULL, '
+                                     'name TEXT NOT NULL, '
+                                     'data BLOB NOT NULL, '
+                                     'sampling_information BLOB, '
+                                     'PRIMARY KEY (type, name))')
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def names(self, asset_type):
+        """ Returns the names of all stored objects of a certain type.
+
+        @param str asset_type: The asset type ('block', 'ensemble' or 'sequence')
+
+        @return list: The names of all stored objects of this type
+        """
+        with self._lock:
+            cursor = self._connection.execute('SELECT name FROM assets WHERE type=?',
+                                              (asset_type,))
+            return [row[0] for row in cursor]
+
+    def load(self, asset_type, name):
+        """ De-serializes a single pulse object from the database.
+        If a separately stored sampling_information dict is present, it replaces the one of the
+        de-serialized object.
+
+        @param str asset_type: The asset type ('block', 'ensemble' or 'sequence')
+        @param str name: The name of the object to load
+
+        @return object: The de-serialized pulse object. None if not found.
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT data FROM assets WHERE type=? AND name=?',
+                                           (asset_type, name)).fetchone()
+            if row is None:
+                return None
+            asset = pickle.loads(row[0])
+            row = self._connection.execute(
+                'SELECT data FROM sampling_information WHERE type=? AND name=?',
+                (asset_type, name)).fetchone()
+        if row is not None:
+            asset.sampling_information = pickle.loads(row[0])
+        return asset
+
+    def save(self, asset_type, asset):
+        """ Serializes a single pulse object (incl. its sampling_information) into the database.
+
+        @param str asset_type: The asset type ('block', 'ensemble' or 'sequence')
+        @param object asset: The pulse object to save
+        """
+        self.save_raw(asset_type, asset.name, pickle.dumps(asset),
+                      getattr(asset, 'sampling_information', None))
+
+    def save_raw(self, asset_type, name, data, sampling_information=None):
+        """ Stores an already serialized pulse object in the database.
+
+        @param str asset_type: The asset type ('block', 'ensemble' or 'sequence')
+        @param str name: The name of the pulse object
+        @param bytes data: The pickled pulse object
+        @param dict sampling_information: optional, sampling_information of the pulse object
+        """
+        with self._lock, self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO assets VALUES (?, ?, ?)',
+                                     (asset_type, name, data))
+            if sampling_information is not None:
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO sampling_information VALUES (?, ?, ?)',
+                    (asset_type, name, pickle.dumps(sampling_information)))
+
+    def save_sampling_information(self, asset_type, name, sampling_information):
+        """ Updates the sampling_information dict of a stored pulse object only.
+
+        @param str asset_type: The asset type ('ensemble' or 'sequence')
+        @param str name: The name of the pulse object
+        @param dict sampling_information: The sampling_information dict to store
+        """
+        with self._lock, self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO sampling_information VALUES (?, ?, ?)',
+                                     (asset_type, name, pickle.dumps(sampling_information)))
+
+    def load_sampling_information(self, asset_type):
+        """ Returns the separately stored sampling_information dicts of all objects of a type
+        without de-serializing the pulse objects themselves.
+
+        @param str asset_type: The asset type ('ensemble' or 'sequence')
+
+        @return dict: sampling_information dicts with the object names as keys
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                'SELECT name, data FROM sampling_information WHERE type=?', (asset_type,))
+            return {name: pickle.loads(data) for name, data in cursor}
+
+    def delete(self, asset_type, name):
+        """ Removes a pulse object from the database.
+
+        @param str asset_type: The asset type ('block', 'ensemble' or 'sequence')
+        @param str name: The name of the pulse object to remove
+        """
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM assets WHERE type=? AND name=?',
+                                     (asset_type, name))
+            self._connection.execute('DELETE FROM sampling_information WHERE type=? AND name=?',
+                                     (asset_type, name))
+
+    def quarantine(self, asset_type, name):
+        """ Moves a (corrupted) pulse object from the assets into the quarantined_assets table.
+        It is no longer listed or loaded but the data can still be recovered manually.
+
+        @param str asset_type: The asset type ('block', 'ensemble' or 'sequence')
+        @param str name: The name of the pulse object to quarantine
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO quarantined_assets '
+                'SELECT type, name, data, (SELECT data FROM sampling_information '
+                'WHERE type=assets.type AND name=assets.name) '
+                'FROM assets WHERE type=? AND name=?', (asset_type, name))
+            self._connection.execute('DELETE FROM assets WHERE type=? AND name=?',
+                                     (asset_type, name))
+            self._connection.execute('DELETE FROM sampling_information WHERE type=? AND name=?',
+                                     (asset_type, name))
+
+    def migrate_pickle_files(self, directory, backup_directory):
+        """ One-time import of pulse objects stored as separate pickle files (<name>.block,
+        <name>.ensemble and <name>.sequence) by older versions of qudi.
+        Successfully imported files are moved into the backup directory.
+
+        @param str directory: The directory containing the pickle files
+        @param str backup_directory: The directory to move the imported files to
+
+        @return tuple: (list of imported file names, list of files that failed to import)
+        """
+        imported = list()
+        failed = list()
+        with os.scandir(directory) as scan:
+            files = [f.name for f in scan if f.is_file() and
+                     os.path.splitext(f.name)[1][1:] in self.asset_types]
+        for filename in files:
+            name, extension = os.path.splitext(filename)
+            filepath = os.path.join(directory, filename)
+            try:
+                with open(filepath, 'rb') as file:
+                    data = file.read()
+                sampling_information = getattr(pickle.loads(data), 'sampling_information', None)
+            except Exception:
+                failed.append(filename)
+                continue
+            self.save_raw(extension[1:], name, data, sampling_information)
+            imported.append(filename)
+
+        if imported and not os.path.exists(backup_directory):
+            os.makedirs(backup_directory)
+        for filename in imported:
+            os.replace(os.path.join(directory, filename), os.path.join(backup_directory, filename))
+        return imported, failed
+
+
+class LazyAssetDict(OrderedDict):
+    """
+    OrderedDict of pulse objects by name that de-serializes each object only when it is accessed
+    for the first time.
+
+    All names are known from the start, so iterating over keys and membership tests never load
+    any objects.
+    """
+    # Placeholder for pulse objects not yet loaded
+    _not_loaded = object()
+
+    def __init__(self, loader, names=None):
+        """
+        @param callable loader: Function taking the name of a pulse object and returning the
+                                de-serialized instance (or None if it can not be loaded).
+        @param iterable names: optional, names of the pulse objects available from the loader
+        """
+        super().__init__()
+        self._loader = loader
+        # Lock to prevent loading the same object concurrently in different threads
+        self._load_lock = threading.RLock()
+        if names is not None:
+            for name in names:
+                super().__setitem__(name, self._not_loaded)
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if value is self._not_loaded:
+            with self._load_lock:
+                value = super().__getitem__(key)
+                if value is self._not_loaded:
+                    value = self._loader(key)
+                    if value is None:
+                        super().__delitem__(key)
+                        raise KeyError(key)
+                    super().__setitem__(key, value)
+        return value
+
+    def __repr__(self):
+        return '{0}({1})'.format(type(self).__name__, list(self.keys()))
+
+    def __reduce__(self):
+        return OrderedDict, (list(self.items()),)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key, *args):
+        try:
+            value = self[key]
+        except KeyError:
+            if args:
+                return args[0]
+            raise
+        super().__delitem__(key)
+        return value
+
+    def values(self):
+        return [value for key, value in self.items()]
+
+    def items(self):
+        items = list()
+        for key in list(self.keys()):
+            value = self.get(key)
+            if value is not None:
+                items.append((key, value))
+        return items
+
+    def copy(self):
+        return OrderedDict(self.items())
+
+    def is_loaded(self, key):
+        """ Check if the pulse object of the given name has already been de-serialized.
+
+        @param str key: The name of the pulse object
+        @return bool: Flag indicating if the object is loaded
+        """
+        return super().get(key, self._not_loaded) is not self._not_loaded
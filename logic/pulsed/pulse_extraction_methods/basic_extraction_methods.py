@@ -20,6 +20,7 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 """
 
 import numpy as np
+from numpy.lib.stride_tricks import as_strided
 from scipy import ndimage
 
 from logic.pulsed.pulse_extractor import PulseExtractorBase
@@ -29,8 +30,16 @@ class BasicPulseExtractor(PulseExtractorBase):
     """
 
     """
+    # Minimum number of counts above background and minimum significance (in standard deviations
+    # of the background) of the cross-correlation peak to accept a laser delay calibration
+    _calibration_min_counts = 50
+    _calibration_min_significance = 5
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # Laser windows of ungated_sequence_informed as tuple (<key>, <window dict>)
+        self._laser_window_cache = None
+        # Laser edges of ungated_conv_deriv as tuple (<key>, <rising edges>, <falling edges>)
+        self._edge_cache = None
 
     def gated_conv_deriv(self, count_data, conv_std_dev=20.0):
         """
@@ -82,12 +91,15 @@ class BasicPulseExtractor(PulseExtractorBase):
 
         return return_dict
 
-    def ungated_conv_deriv(self, count_data, conv_std_dev=20.0):
+    def ungated_conv_deriv(self, count_data, conv_std_dev=20.0, edge_tolerance=2):
         """ Detects the laser pulses in the ungated timetrace data and extracts
             them.
 
         @param numpy.ndarray count_data: The raw timetrace data (1D) from an ungated fast counter
         @param float conv_std_dev: The standard deviation of the gaussian used for smoothing
+        @param int edge_tolerance: The maximum deviation (in bins) of the laser edges from the
+                                   edges detected in a previous timetrace to keep using the
+                                   previous edges without a new detection
 
         @return 2D numpy.ndarray:   2D array, the extracted laser pulses of the timetrace.
                                     dimensions: 0: laser number, 1: time bin
@@ -108,11 +120,10 @@ class BasicPulseExtractor(PulseExtractorBase):
             trace.
 
             The maxima and minima are not found sequentially, pulse by pulse,
-            but are rather globally obtained. I.e. the convolved and derived
-            array is searched iteratively for a maximum and a minimum, and after
-            finding those the array entries within the 4 times
-            self.conv_std_dev (2*self.conv_std_dev to the left and
-            2*self.conv_std_dev) are set to zero.
+            but are rather globally obtained. I.e. all local maxima (minima) of
+            the convolved and derived array within 2*self.conv_std_dev to the
+            left and right are determined in a single pass and the highest
+            (lowest) of them are taken as laser edges.
 
             The crucial part is the knowledge of the number of laser pulses and
             the choice of the appropriate std_dev for the gauss filter.
@@ -121,6 +132,15 @@ class BasicPulseExtractor(PulseExtractorBase):
             ensure a steep rising and falling edge of the laser pulse! Be also
             careful in choosing a large conv_std_dev value and using a small
             laser pulse (rule of thumb: conv_std_dev < laser_length/10).
+
+            Edge cache:
+            -----------
+
+            The timetrace accumulates over the measurement, so the laser edges
+            usually stay in place. Edges detected in a previous timetrace are
+            checked in a small window around each edge and are reused if they
+            deviate by no more than edge_tolerance bins. Otherwise the edges are
+            detected again on the full timetrace.
         """
         # Create return dictionary
         return_dict = {'laser_counts_arr': np.empty(0, dtype='int64'),
@@ -131,123 +151,59 @@ class BasicPulseExtractor(PulseExtractorBase):
         if not isinstance(number_of_lasers, int):
             return return_dict
 
-        # apply gaussian filter to remove noise and compute the gradient of the timetrace sum
-        try:
-            conv = ndimage.filters.gaussian_filter1d(count_data.astype(float), conv_std_dev)
-        except:
-            conv = np.zeros(count_data.size)
-        try:
-            conv_deriv = np.gradient(conv)
-        except:
-            conv_deriv = np.zeros(conv.size)
-
-        # if gaussian smoothing or derivative failed, the returned array only contains zeros.
-        # Check for that and return also only zeros to indicate a failed pulse extraction.
-        if len(conv_deriv.nonzero()[0]) == 0:
-            return_dict['laser_counts_arr'] = np.zeros((number_of_lasers, 10), dtype='int64')
-            return return_dict
-
-        # use a reference for array, because the exact position of the peaks or dips
-        # (i.e. maxima or minima, which are the inflection points in the pulse) are distorted by
-        # a large conv_std_dev value.
-        try:
-            conv = ndimage.filters.gaussian_filter1d(count_data.astype(float), 10)
-        except:
-            conv = np.zeros(count_data.size)
-        try:
-            conv_deriv_ref = np.gradient(conv)
-        except:
-            conv_deriv_ref = np.zeros(conv.size)
-
-        # initialize arrays to contain indices for all rising and falling
-        # flanks, respectively
-        rising_ind = np.empty(number_of_lasers, dtype='int64')
-        falling_ind = np.empty(number_of_lasers, dtype='int64')
-
-        # Find as many rising and falling flanks as there are laser pulses in
-        # the trace:
-        for i in range(number_of_lasers):
-            # save the index of the absolute maximum of the derived time trace
-            # as rising edge position
-            rising_ind[i] = np.argmax(conv_deriv)
-
-            # refine the rising edge detection, by using a small and fixed
-            # conv_std_dev parameter to find the inflection point more precise
-            start_ind = int(rising_ind[i] - conv_std_dev)
-            if start_ind < 0:
-                start_ind = 0
-
-            stop_ind = int(rising_ind[i] + conv_std_dev)
-            if stop_ind > len(conv_deriv):
-                stop_ind = len(conv_deriv)
-
-            if start_ind == stop_ind:
-                stop_ind = start_ind + 1
-
-            rising_ind[i] = start_ind + np.argmax(conv_deriv_ref[start_ind:stop_ind])
-
-            # set this position and the surrounding of the saved edge to 0 to
-            # avoid a second detection
-            if rising_ind[i] < 2 * conv_std_dev:
-                del_ind_start = 0
-            else:
-                del_ind_start = rising_ind[i] - int(2 * conv_std_dev)
-            if (conv_deriv.size - rising_ind[i]) < 2 * conv_std_dev:
-                del_ind_stop = conv_deriv.size - 1
-            else:
-                del_ind_stop = rising_ind[i] + int(2 * conv_std_dev)
-                conv_deriv[del_ind_start:del_ind_stop] = 0
-
-            # save the index of the absolute minimum of the derived time trace
-            # as falling edge position
-            falling_ind[i] = np.argmin(conv_deriv)
-
-            # refine the falling edge detection, by using a small and fixed
-            # conv_std_dev parameter to find the inflection point more precise
-            start_ind = int(falling_ind[i] - conv_std_dev)
-            if start_ind < 0:
-                start_ind = 0
-
-            stop_ind = int(falling_ind[i] + conv_std_dev)
-            if stop_ind > len(conv_deriv):
-                stop_ind = len(conv_deriv)
-
-            if start_ind == stop_ind:
-                stop_ind = start_ind + 1
-
-            falling_ind[i] = start_ind + np.argmin(conv_deriv_ref[start_ind:stop_ind])
-
-            # set this position and the sourrounding of the saved flank to 0 to
-            #  avoid a second detection
-            if falling_ind[i] < 2 * conv_std_dev:
-                del_ind_start = 0
-            else:
-                del_ind_start = falling_ind[i] - int(2 * conv_std_dev)
-            if (conv_deriv.size - falling_ind[i]) < 2 * conv_std_dev:
-                del_ind_stop = conv_deriv.size - 1
-            else:
-                del_ind_stop = falling_ind[i] + int(2 * conv_std_dev)
-            conv_deriv[del_ind_start:del_ind_stop] = 0
-
-        # sort all indices of rising and falling flanks
-        rising_ind.sort()
-        falling_ind.sort()
+        # Reuse the edges of the previous timetrace if they still match
+        cache_key = (count_data.size, number_of_lasers, conv_std_dev)
+        if self._edge_cache is not None and self._edge_cache[0] == cache_key and \
+                self._edges_match(count_data, self._edge_cache[1], self._edge_cache[2],
+                                  conv_std_dev, edge_tolerance):
+            rising_ind, falling_ind = self._edge_cache[1:]
+        else:
+            self._edge_cache = None
+
+            # apply gaussian filter to remove noise and compute the gradient of the timetrace sum
+            try:
+                conv = ndimage.filters.gaussian_filter1d(count_data.astype(float), conv_std_dev)
+            except:
+                conv = np.zeros(count_data.size)
+            try:
+                conv_deriv = np.gradient(conv)
+            except:
+                conv_deriv = np.zeros(conv.size)
+
+            # if gaussian smoothing or derivative failed, the returned array only contains zeros.
+            # Check for that and return also only zeros to indicate a failed pulse extraction.
+            if len(conv_deriv.nonzero()[0]) == 0:
+                return_dict['laser_counts_arr'] = np.zeros((number_of_lasers, 10), dtype='int64')
+                return return_dict
+
+            # use a reference for array, because the exact position of the peaks or dips
+            # (i.e. maxima or minima, which are the inflection points in the pulse) are distorted
+            # by a large conv_std_dev value.
+            try:
+                conv = ndimage.filters.gaussian_filter1d(count_data.astype(float), 10)
+            except:
+                conv = np.zeros(count_data.size)
+            try:
+                conv_deriv_ref = np.gradient(conv)
+            except:
+                conv_deriv_ref = np.zeros(conv.size)
+
+            # Find as many rising and falling flanks as there are laser pulses in the trace and
+            # sort them
+            rising_ind = np.sort(self._find_edges(conv_deriv, conv_deriv_ref, number_of_lasers,
+                                                  conv_std_dev, rising=True))
+            falling_ind = np.sort(self._find_edges(conv_deriv, conv_deriv_ref, number_of_lasers,
+                                                   conv_std_dev, rising=False))
+            self._edge_cache = (cache_key, rising_ind, falling_ind)
 
         # find the maximum laser length to use as size for the laser array
-        laser_length = np.max(falling_ind - rising_ind)
-
-        # initialize the empty output array
-        laser_arr = np.zeros((number_of_lasers, laser_length), dtype='int64')
-        # slice the detected laser pulses of the timetrace and save them in the
-        # output array according to the found rising edge
-        for i in range(number_of_lasers):
-            if rising_ind[i] + laser_length > count_data.size:
-                lenarr = count_data[rising_ind[i]:].size
-                laser_arr[i, 0:lenarr] = count_data[rising_ind[i]:]
-            else:
-                laser_arr[i] = count_data[rising_ind[i]:rising_ind[i] + laser_length]
+        laser_length = max(int(np.max(falling_ind - rising_ind, initial=0)), 0)
 
-        return_dict['laser_counts_arr'] = laser_arr.astype('int64')
+        # slice the detected laser pulses of the timetrace according to the found rising edges.
+        # Laser pulses exceeding the timetrace are padded with zeros.
+        laser_arr = self._extract_windows(count_data, rising_ind, laser_length)
+
+        return_dict['laser_counts_arr'] = laser_arr
         return_dict['laser_indices_rising'] = rising_ind
         return_dict['laser_indices_falling'] = falling_ind
         return return_dict
@@ -347,13 +303,132 @@ class BasicPulseExtractor(PulseExtractorBase):
         @return 2D numpy.ndarray: 2D array, the extracted laser pulses of the timetrace.
                                   dimensions: 0: laser number, 1: time bin
         """
+        # get the fastcounter binwidth
+        fc_binwidth = self.fast_counter_settings['bin_width']
+        # get laser rising and falling bins converted to bins of fastcounter
+        laser_rising_bins, laser_falling_bins = self._get_fast_counter_laser_bins()
+        # convert to fastcounter bins
+        safety_bins = round(safety / fc_binwidth)
+        delay_bins = round(delay / fc_binwidth)
+        # dimensions of laser pulse array
+        num_rows = len(laser_rising_bins)
+        max_laser_length = max(laser_falling_bins - laser_rising_bins)
+        num_col = max_laser_length + 2 * safety_bins
+        # compute from laser_start_indices and laser length the respective position of the laser
+        # pulses
+        laser_pulses = np.empty((num_rows, num_col))
+        for ii in range(num_rows):
+            laser_pulses[ii][:] = count_data[
+                np.arange(laser_rising_bins[ii] + delay_bins - safety_bins,
+                          laser_rising_bins[ii] + delay_bins + safety_bins + max_laser_length)]
+        # use the gated extraction method
+        return_dict = self.gated_conv_deriv(laser_pulses, conv_std_dev)
+        return return_dict
+
+    def ungated_sequence_informed(self, count_data, delay=5e-7, safety=2e-7,
+                                  calibrate_delay=False):
+        """
+        Extracts the laser pulses in the ungated timetrace data at the laser pulse positions known
+        from the sampled PulseBlockEnsemble or PulseSequence (laser_rising_bins and
+        laser_falling_bins in sampling_information).
+        Procedure:
+            No edge detection is performed, so this also works for timetraces with very few counts.
+            The laser pulse positions are converted to fast counter bins only once and reused as
+            long as the loaded asset, the fast counter bin width and the parameters do not change.
+            All laser pulses are then extracted from the timetrace by a single indexing operation.
+
+        @param numpy.ndarray count_data: 1D array the raw timetrace data from an ungated fast
+                                         counter
+        @param float delay: The delay between the laser trigger of the pulse generator and the
+                            laser pulse arriving at the fast counter (in s)
+        @param float safety: Additional time before the rising edge and after the falling edge of
+                             the longest laser pulse to include in the extracted laser pulses
+                             (in s)
+        @param bool calibrate_delay: If True, the delay is determined once by cross-correlating
+                                     the timetrace with the expected laser pulse pattern instead of
+                                     using the parameter "delay". As long as the timetrace has too
+                                     few counts for a clear correlation peak, "delay" is used and
+                                     the calibration is repeated with the next timetrace.
+
+        @return dict: The extracted laser pulses of the timetrace (2D numpy.ndarray, dimensions:
+                      0: laser number, 1: time bin) as well as the indices for rising and falling
+                      flanks.
+        """
+        try:
+            key = self._get_laser_bins_key() + (count_data.size, delay, safety, calibrate_delay)
+        except (KeyError, TypeError):
+            number_of_lasers = self.measurement_settings.get('number_of_lasers')
+            if not isinstance(number_of_lasers, int):
+                number_of_lasers = 1
+            return {'laser_counts_arr': np.zeros((number_of_lasers, 10), dtype='int64'),
+                    'laser_indices_rising': np.empty(0, dtype='int64'),
+                    'laser_indices_falling': np.empty(0, dtype='int64')}
+
+        if self._laser_window_cache is not None and self._laser_window_cache[0] == key:
+            window = self._laser_window_cache[1]
+        else:
+            fc_binwidth = self.fast_counter_settings['bin_width']
+            laser_rising_bins, laser_falling_bins = self._get_fast_counter_laser_bins()
+
+            # Determine the delay or convert it to fast counter bins.
+            if calibrate_delay:
+                delay_bins = None
+                if count_data.any():
+                    delay_bins = self._calibrate_laser_delay(count_data,
+                                                             laser_rising_bins,
+                                                             laser_falling_bins)
+                if delay_bins is None:
+                    # Not enough counts to calibrate with yet. Use the given delay for now and try
+                    # again with the next timetrace.
+                    delay_bins = round(delay / fc_binwidth)
+                    key = None
+            else:
+                delay_bins = round(delay / fc_binwidth)
+            safety_bins = round(safety / fc_binwidth)
+
+            # First bin and width of all laser pulse windows in the timetrace
+            laser_length = int(np.max(laser_falling_bins - laser_rising_bins, initial=0))
+            window = {'starts': laser_rising_bins + (delay_bins - safety_bins),
+                      'width': laser_length + 2 * safety_bins,
+                      'rising': laser_rising_bins + delay_bins,
+                      'falling': laser_falling_bins + delay_bins}
+            if key is not None:
+                self._laser_window_cache = (key, window)
+
+        laser_arr = self._extract_windows(count_data, window['starts'], window['width'])
+
+        return_dict = dict()
+        return_dict['laser_counts_arr'] = laser_arr
+        return_dict['laser_indices_rising'] = window['rising']
+        return_dict['laser_indices_falling'] = window['falling']
+        return return_dict
+
+    def _get_laser_bins_key(self):
+        """
+        Helper method to identify the laser pulse positions in sampling_information together with
+        the sample rate and fast counter bin width they are converted with.
+
+        @return tuple: hashable key
+        """
+        return (np.asarray(self.sampling_information['laser_rising_bins']).tobytes(),
+                np.asarray(self.sampling_information['laser_falling_bins']).tobytes(),
+                self.sampling_information['pulse_generator_settings']['sample_rate'],
+                self.fast_counter_settings['bin_width'])
+
+    def _get_fast_counter_laser_bins(self):
+        """
+        Helper method to get the rising and falling bins of all complete laser pulses from
+        sampling_information converted to fast counter bins.
+
+        @return (numpy.ndarray, numpy.ndarray): laser rising and falling bins of the fast counter
+        """
         # get the generation sampling rate
         sample_rate = self.sampling_information['pulse_generator_settings']['sample_rate']
         # get the fastcounter binwidth
         fc_binwidth = self.fast_counter_settings['bin_width']
         # get laser rising and falling bins
-        laser_rising_bins = self.sampling_information['laser_rising_bins']
-        laser_falling_bins = self.sampling_information['laser_falling_bins']
+        laser_rising_bins = np.asarray(self.sampling_information['laser_rising_bins'])
+        laser_falling_bins = np.asarray(self.sampling_information['laser_falling_bins'])
 
         # Sort out trailing or leading incomplete laser pulse
         while len(laser_rising_bins) != len(laser_falling_bins):
@@ -371,20 +446,158 @@ class BasicPulseExtractor(PulseExtractorBase):
         # convert to bins of fastcounter
         laser_rising_bins = np.rint(laser_rising_bins / sample_rate / fc_binwidth).astype('int64')
         laser_falling_bins = np.rint(laser_falling_bins / sample_rate / fc_binwidth).astype('int64')
-        # convert to fastcounter bins
-        safety_bins = round(safety / fc_binwidth)
-        delay_bins = round(delay / fc_binwidth)
-        # dimensions of laser pulse array
-        num_rows = len(laser_rising_bins)
-        max_laser_length = max(laser_falling_bins - laser_rising_bins)
-        num_col = max_laser_length + 2 * safety_bins
-        # compute from laser_start_indices and laser length the respective position of the laser
-        # pulses
-        laser_pulses = np.empty((num_rows, num_col))
-        for ii in range(num_rows):
-            laser_pulses[ii][:] = count_data[
-                np.arange(laser_rising_bins[ii] + delay_bins - safety_bins,
-                          laser_rising_bins[ii] + delay_bins + safety_bins + max_laser_length)]
-        # use the gated extraction method
-        return_dict = self.gated_conv_deriv(laser_pulses, conv_std_dev)
-        return return_dict
+        return laser_rising_bins, laser_falling_bins
+
+    @classmethod
+    def _calibrate_laser_delay(cls, count_data, laser_rising_bins, laser_falling_bins):
+        """
+        Helper method to determine the delay of the laser pulses in an ungated timetrace with
+        respect to the expected laser pulse positions. The timetrace is cross-correlated with the
+        expected laser pulse pattern (zero padded, so shifts by a multiple of the laser pulse
+        period are not ambiguous).
+        The result is only accepted if the correlation peak exceeds the background (median of the
+        correlation) by at least _calibration_min_counts counts and
+        _calibration_min_significance standard deviations of the background shot noise.
+
+        @param numpy.ndarray count_data: 1D array the raw timetrace data from an ungated fast
+                                         counter
+        @param numpy.ndarray laser_rising_bins: expected laser rising bins of the fast counter
+        @param numpy.ndarray laser_falling_bins: expected laser falling bins of the fast counter
+
+        @return int: The delay in fast counter bins. None if the correlation peak is not clear
+                     enough (e.g. too few counts).
+        """
+        # Expected laser pulse pattern (1 while the laser is on, 0 otherwise)
+        edges = np.zeros(count_data.size + 1)
+        np.add.at(edges, np.clip(laser_rising_bins, 0, count_data.size), 1)
+        np.add.at(edges, np.clip(laser_falling_bins, 0, count_data.size), -1)
+        pattern = np.cumsum(edges[:-1])
+
+        fft_length = 2 * count_data.size
+        correlation = np.fft.irfft(np.fft.rfft(count_data.astype(float), fft_length) *
+                                   np.conj(np.fft.rfft(pattern, fft_length)), n=fft_length)
+        delay_bins = int(np.argmax(correlation))
+        background = max(float(np.median(correlation)), 0)
+        excess = correlation[delay_bins] - background
+        if excess < cls._calibration_min_counts or \
+                excess < cls._calibration_min_significance * np.sqrt(max(background, 1)):
+            return None
+        # The second half of the correlation holds the negative delays
+        if delay_bins >= count_data.size:
+            delay_bins -= fft_length
+        return delay_bins
+
+    @staticmethod
+    def _extract_windows(count_data, starts, width):
+        """
+        Helper method to extract windows of equal width from an ungated timetrace.
+        Bins outside of the timetrace are set to zero counts.
+
+        @param numpy.ndarray count_data: 1D array the raw timetrace data
+        @param numpy.ndarray starts: The first bin of each window
+        @param int width: The number of bins of each window
+
+        @return numpy.ndarray: 2D int64 array, dimensions: 0: window number, 1: time bin
+        """
+        if starts.size == 0 or (starts.min() >= 0 and starts.max() + width <= count_data.size):
+            # Gather the windows as rows of a strided (read-only) view of the timetrace
+            count_data = np.ascontiguousarray(count_data)
+            windows = as_strided(count_data,
+                                 shape=(max(count_data.size - width + 1, 0), width),
+                                 strides=(count_data.strides[0], count_data.strides[0]),
+                                 writeable=False)
+            return windows[starts].astype('int64', copy=False)
+
+        indices = starts[:, np.newaxis] + np.arange(width)
+        outside = (indices < 0) | (indices >= count_data.size)
+        laser_arr = count_data[np.clip(indices, 0, max(count_data.size - 1, 0))].astype(
+            'int64', copy=False)
+        laser_arr[outside] = 0
+        return laser_arr
+
+    @staticmethod
+    def _find_edges(conv_deriv, conv_deriv_ref, number_of_edges, conv_std_dev, rising=True):
+        """
+        Helper method to find the laser edges in the derivative of a smoothed ungated timetrace.
+        All maxima (minima) within +-2*conv_std_dev are found in a single pass and the highest
+        (lowest) are taken. Each edge is then refined to the maximum (minimum) of the less
+        smoothed reference derivative within +-conv_std_dev.
+
+        @param numpy.ndarray conv_deriv: derivative of the timetrace smoothed with conv_std_dev
+        @param numpy.ndarray conv_deriv_ref: derivative of the timetrace smoothed with a fixed
+                                             small standard deviation
+        @param int number_of_edges: The number of edges to find
+        @param float conv_std_dev: The standard deviation of the gaussian used for smoothing
+        @param bool rising: Find rising edges (maxima) if True, falling edges (minima) otherwise
+
+        @return numpy.ndarray: The edge indices ordered by descending edge steepness
+        """
+        values = conv_deriv if rising else -conv_deriv
+        reference = conv_deriv_ref if rising else -conv_deriv_ref
+        radius = max(int(2 * conv_std_dev), 1)
+
+        # Local maxima are the maximum within +-radius and its first occurrence in case of a
+        # plateau (i.e. greater than all preceding values within radius).
+        window_max = ndimage.maximum_filter1d(values, size=2 * radius + 1, mode='constant',
+                                              cval=-np.inf)
+        preceding = np.empty_like(values)
+        preceding[0] = -np.inf
+        preceding[1:] = values[:-1]
+        preceding_max = ndimage.maximum_filter1d(preceding, size=radius, origin=(radius - 1) // 2,
+                                                 mode='constant', cval=-np.inf)
+        edges = np.flatnonzero((values == window_max) & (values > preceding_max) & (values > 0))
+
+        # Take the highest maxima. If there are not enough maxima, take the highest other values.
+        if edges.size > number_of_edges:
+            edges = edges[np.argsort(-values[edges], kind='stable')[:number_of_edges]]
+        elif edges.size < number_of_edges:
+            missing = min(number_of_edges - edges.size, values.size - edges.size)
+            remaining = values.copy()
+            remaining[edges] = -np.inf
+            others = np.argpartition(-remaining, missing - 1)[:missing] if missing > 0 else []
+            edges = np.append(edges, others).astype('int64')
+
+        # refine the edge detection by using a small and fixed conv_std_dev parameter to find the
+        # inflection point more precise
+        start_ind = np.maximum(np.trunc(edges - conv_std_dev), 0).astype('int64')
+        stop_ind = np.minimum(np.trunc(edges + conv_std_dev), reference.size).astype('int64')
+        stop_ind[start_ind == stop_ind] += 1
+        indices = start_ind[:, np.newaxis] + np.arange(np.max(stop_ind - start_ind, initial=1))
+        windows = np.where(indices < stop_ind[:, np.newaxis],
+                           reference[np.minimum(indices, reference.size - 1)],
+                           -np.inf)
+        return start_ind + np.argmax(windows, axis=1)
+
+    @staticmethod
+    def _edges_match(count_data, rising_ind, falling_ind, conv_std_dev, edge_tolerance):
+        """
+        Helper method to check if previously detected laser edges still match a timetrace.
+        Only windows around each edge are smoothed (std. dev. of 10 bins like the reference
+        derivative of ungated_conv_deriv) and the edges are refined within +-conv_std_dev.
+
+        @param numpy.ndarray count_data: 1D array the raw timetrace data
+        @param numpy.ndarray rising_ind: The previously detected rising edges
+        @param numpy.ndarray falling_ind: The previously detected falling edges
+        @param float conv_std_dev: The standard deviation of the gaussian used for smoothing
+        @param int edge_tolerance: The maximum deviation of the edges in bins
+
+        @return bool: True if all edges deviate by no more than edge_tolerance, False otherwise
+        """
+        if rising_ind.size == 0 or rising_ind.size != falling_ind.size:
+            return False
+        search_radius = max(int(conv_std_dev), 1)
+        # Gaussian filter radius (truncated at 4 std. dev.) plus one bin for the gradient
+        filter_radius = int(4.0 * 10 + 0.5) + 1
+        offset = search_radius + filter_radius
+        edges = np.concatenate((rising_ind, falling_ind))
+        if edges.min() < offset or edges.max() + offset >= count_data.size:
+            return False
+
+        windows = BasicPulseExtractor._extract_windows(count_data, edges - offset, 2 * offset + 1)
+        deriv = np.gradient(ndimage.gaussian_filter1d(windows.astype(float), 10, axis=1), axis=1)
+        deriv = deriv[:, filter_radius:filter_radius + 2 * search_radius + 1]
+        deriv[rising_ind.size:] *= -1
+        deviation = np.argmax(deriv, axis=1)
+        if np.any(deriv[np.arange(edges.size), deviation] <= 0):
+            return False
+        return bool(np.all(np.abs(deviation - search_radius) <= edge_tolerance))
@@ -772,7 +772,7 @@ class PulseSequence(object):
                      '<sequence parameters>\n\t'.format(self.name,
                                                         self.rotating_frame,
                                                         self.is_finite,
-                                                        bool(self.sampling_information))
+                                                        'waveforms' in self.sampling_information)
         return_str += '\n\t'.join(('{0}\t{1}'.format(name, param) for name, param in self))
         return return_str
 
@@ -56,35 +56,26 @@ class BasicPulseAnalyzer(PulseAnalyzerBase):
         norm_start_bin = round(norm_start / bin_width)
         norm_end_bin = round(norm_end / bin_width)
 
-        # initialize data arrays for signal and measurement error
-        signal_data = np.empty(num_of_lasers, dtype=float)
-        error_data = np.empty(num_of_lasers, dtype=float)
-
-        # loop over all laser pulses and analyze them
-        for ii, laser_arr in enumerate(laser_data):
-            # calculate the sum and mean of the data in the normalization window
-            tmp_data = laser_arr[norm_start_bin:norm_end_bin]
-            reference_sum = np.sum(tmp_data)
-            reference_mean = (reference_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
-
-            # calculate the sum and mean of the data in the signal window
-            tmp_data = laser_arr[signal_start_bin:signal_end_bin]
-            signal_sum = np.sum(tmp_data)
-            signal_mean = (signal_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
-
-            # Calculate normalized signal while avoiding division by zero
-            if reference_mean > 0 and signal_mean >= 0:
-                signal_data[ii] = signal_mean / reference_mean
-            else:
-                signal_data[ii] = 0.0
-
-            # Calculate measurement error while avoiding division by zero
-            if reference_sum > 0 and signal_sum > 0:
-                # calculate with respect to gaussian error 'evolution'
-                error_data[ii] = signal_data[ii] * np.sqrt(1 / signal_sum + 1 / reference_sum)
-            else:
-                error_data[ii] = 0.0
-
+        # calculate the sum and mean of the data in the normalization window for all laser pulses
+        reference_sum, reference_width = self._window_sum(laser_data, norm_start_bin, norm_end_bin)
+        reference_mean = reference_sum / reference_width if reference_width != 0 else np.zeros(
+            num_of_lasers)
+
+        # calculate the sum and mean of the data in the signal window for all laser pulses
+        signal_sum, signal_width = self._window_sum(laser_data, signal_start_bin, signal_end_bin)
+        signal_mean = signal_sum / signal_width if signal_width != 0 else np.zeros(num_of_lasers)
+
+        # Calculate normalized signal while avoiding division by zero
+        signal_data = np.zeros(num_of_lasers, dtype=float)
+        np.divide(signal_mean, reference_mean, out=signal_data,
+                  where=(reference_mean > 0) & (signal_mean >= 0))
+
+        # Calculate measurement error while avoiding division by zero
+        # (with respect to gaussian error 'evolution')
+        error_data = np.zeros(num_of_lasers, dtype=float)
+        mask = (reference_sum > 0) & (signal_sum > 0)
+        error_data[mask] = signal_data[mask] * np.sqrt(1 / signal_sum[mask] +
+                                                       1 / reference_sum[mask])
         return signal_data, error_data
 
     def analyse_sum(self, laser_data, signal_start=0.0, signal_end=200e-9):
@@ -106,24 +97,15 @@ class BasicPulseAnalyzer(PulseAnalyzerBase):
         signal_start_bin = round(signal_start / bin_width)
         signal_end_bin = round(signal_end / bin_width)
 
-        # initialize data arrays for signal and measurement error
-        signal_data = np.empty(num_of_lasers, dtype=float)
-        error_data = np.empty(num_of_lasers, dtype=float)
-
-        # loop over all laser pulses and analyze them
-        for ii, laser_arr in enumerate(laser_data):
-            # calculate the sum of the data in the signal window
-            signal = laser_arr[signal_start_bin:signal_end_bin].sum()
-            signal_error = np.sqrt(signal)
-
-            # Avoid numpy C type variables overflow and NaN values
-            if signal < 0 or signal != signal:
-                signal_data[ii] = 0.0
-                error_data[ii] = 0.0
-            else:
-                signal_data[ii] = signal
-                error_data[ii] = signal_error
+        # calculate the sum of the data in the signal window for all laser pulses
+        signal_sum, _ = self._window_sum(laser_data, signal_start_bin, signal_end_bin)
 
+        # Avoid numpy C type variables overflow and NaN values
+        signal_data = np.zeros(num_of_lasers, dtype=float)
+        error_data = np.zeros(num_of_lasers, dtype=float)
+        mask = signal_sum >= 0
+        signal_data[mask] = signal_sum[mask]
+        error_data[mask] = np.sqrt(signal_data[mask])
         return signal_data, error_data
 
     def analyse_mean(self, laser_data, signal_start=0.0, signal_end=200e-9):
@@ -146,23 +128,33 @@ class BasicPulseAnalyzer(PulseAnalyzerBase):
         signal_start_bin = round(signal_start / bin_width)
         signal_end_bin = round(signal_end / bin_width)
 
-        # initialize data arrays for signal and measurement error
-        signal_data = np.empty(num_of_lasers, dtype=float)
-        error_data = np.empty(num_of_lasers, dtype=float)
-
-        # loop over all laser pulses and analyze them
-        for ii, laser_arr in enumerate(laser_data):
-            # calculate the mean of the data in the signal window
-            signal = laser_arr[signal_start_bin:signal_end_bin].mean()
-            signal_sum = laser_arr[signal_start_bin:signal_end_bin].sum()
-            signal_error = np.sqrt(signal_sum) / (signal_end_bin - signal_start_bin)
-
-            # Avoid numpy C type variables overflow and NaN values
-            if signal < 0 or signal != signal:
-                signal_data[ii] = 0.0
-                error_data[ii] = 0.0
-            else:
-                signal_data[ii] = signal
-                error_data[ii] = signal_error
-
+        # calculate the sum of the data in the signal window for all laser pulses
+        signal_sum, signal_width = self._window_sum(laser_data, signal_start_bin, signal_end_bin)
+
+        # Avoid division by zero (empty signal window), numpy C type variables overflow and NaN
+        # values
+        signal_data = np.zeros(num_of_lasers, dtype=float)
+        error_data = np.zeros(num_of_lasers, dtype=float)
+        if signal_width == 0:
+            return signal_data, error_data
+        mask = signal_sum >= 0
+        signal_data[mask] = signal_sum[mask] / signal_width
+        error_data[mask] = np.sqrt(signal_sum[mask]) / (signal_end_bin - signal_start_bin)
         return signal_data, error_data
+
+    @staticmethod
+    def _window_sum(laser_data, start_bin, end_bin):
+        """
+        Helper method to sum up the counts of all laser pulses within a window of time bins.
+        The window is sliced like a python sequence, i.e. it is clipped to the laser pulse length
+        and can be empty.
+
+        @param numpy.ndarray laser_data: 2D array, dimensions: 0: laser number, 1: time bin
+        @param int start_bin: The first bin of the window
+        @param int end_bin: The bin after the last bin of the window
+
+        @return (numpy.ndarray, int): The sum of each laser pulse within the window (float) and
+                                      the number of bins of the window
+        """
+        window = laser_data[:, start_bin:end_bin]
+        return window.sum(axis=1, dtype=float), window.shape[1]
@@ -70,7 +70,7 @@ class PulsedMasterLogic(GenericLogic):
 
     # signals for master module (i.e. GUI) coming from PulsedMeasurementLogic
     sigMeasurementDataUpdated = QtCore.Signal()
-    sigTimerUpdated = QtCore.Signal(float, int, float)
+    sigTimerUpdated = QtCore.Signal(float, int, float, dict)
     sigFitUpdated = QtCore.Signal(str, np.ndarray, object, bool)
     sigMeasurementStatusUpdated = QtCore.Signal(bool, bool)
     sigPulserRunningUpdated = QtCore.Signal(bool)
@@ -105,6 +105,7 @@ class PulsedMasterLogic(GenericLogic):
     sigAvailableSequencesUpdated = QtCore.Signal(list)
     sigSampleEnsembleComplete = QtCore.Signal(object)
     sigSampleSequenceComplete = QtCore.Signal(object)
+    sigSampleSequenceProgress = QtCore.Signal(str, int, int, float)
     sigLoadedAssetUpdated = QtCore.Signal(str, str)
     sigGeneratorSettingsUpdated = QtCore.Signal(dict)
     sigSamplingSettingsUpdated = QtCore.Signal(dict)
@@ -239,6 +240,8 @@ class PulsedMasterLogic(GenericLogic):
             self.sample_ensemble_finished, QtCore.Qt.QueuedConnection)
         self.sequencegeneratorlogic().sigSampleSequenceComplete.connect(
             self.sample_sequence_finished, QtCore.Qt.QueuedConnection)
+        self.sequencegeneratorlogic().sigSampleSequenceProgress.connect(
+            self.sigSampleSequenceProgress, QtCore.Qt.QueuedConnection)
         self.sequencegeneratorlogic().sigLoadedAssetUpdated.connect(
             self.loaded_asset_updated, QtCore.Qt.QueuedConnection)
         return
@@ -302,6 +305,7 @@ class PulsedMasterLogic(GenericLogic):
         self.sequencegeneratorlogic().sigPredefinedSequenceGenerated.disconnect()
         self.sequencegeneratorlogic().sigSampleEnsembleComplete.disconnect()
         self.sequencegeneratorlogic().sigSampleSequenceComplete.disconnect()
+        self.sequencegeneratorlogic().sigSampleSequenceProgress.disconnect()
         self.sequencegeneratorlogic().sigLoadedAssetUpdated.disconnect()
         return
 
@@ -380,6 +384,10 @@ class PulsedMasterLogic(GenericLogic):
     def alternative_data_type(self):
         return self.pulsedmeasurementlogic().alternative_data_type
 
+    @property
+    def stashed_raw_data_tags(self):
+        return self.pulsedmeasurementlogic().stashed_raw_data_tags
+
     @property
     def fit_container(self):
         return self.pulsedmeasurementlogic().fc
@@ -481,6 +489,16 @@ class PulsedMasterLogic(GenericLogic):
         self.sigManuallyPullData.emit()
         return
 
+    def analyse_laser_data_batch(self, settings_list):
+        """
+        Analyse the current laser data with several analysis settings (e.g. alternative
+        signal/normalization windows) without changing the current analysis settings.
+
+        @param list settings_list: list of analysis settings dicts
+        @return list: list of tuples (signal data, measurement error) in the order of settings_list
+        """
+        return self.pulsedmeasurementlogic().analyse_laser_data_batch(settings_list=settings_list)
+
     @QtCore.Slot(bool)
     def toggle_ext_microwave(self, switch_on):
         """
@@ -22,8 +22,11 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 from qtpy import QtCore
 from collections import OrderedDict
 import numpy as np
+import os
 import copy
 import time
+import queue
+import threading
 import datetime
 import matplotlib.pyplot as plt
 
@@ -35,6 +38,7 @@ from core.util.helpers import natural_sort
 from logic.generic_logic import GenericLogic
 from logic.pulsed.pulse_extractor import PulseExtractor
 from logic.pulsed.pulse_analyzer import PulseAnalyzer
+from logic.pulsed.raw_data_stash import MemoryRawDataStash, DiskRawDataStash
 
 
 class PulsedMeasurementLogic(GenericLogic):
@@ -55,8 +59,17 @@ class PulsedMeasurementLogic(GenericLogic):
     # Optional additional paths to import from
     extraction_import_path = ConfigOption(name='additional_extraction_path', default=None)
     analysis_import_path = ConfigOption(name='additional_analysis_path', default=None)
-    # Optional file type descriptor for saving raw data to file
+    # Optional file type descriptor for saving raw data and laser pulses to file ('text', 'npz' or
+    # 'npy'; see SaveLogic.save_data)
     _raw_data_save_type = ConfigOption(name='raw_data_save_type', default='text')
+    # Run acquisition, extraction/analysis and publishing of the measurement data in separate
+    # threads instead of serially in the timer event of the logic thread. Stale frames are dropped
+    # if the analysis falls behind the acquisition.
+    _pipelined_analysis = ConfigOption(name='pipelined_analysis', default=False, missing='nothing')
+    # Storage of raw data stashed to continue a measurement later on. 'memory' (default) keeps the
+    # raw data in memory, 'disk' stores it as memory mapped .npy files in the application status
+    # directory, so it survives a restart.
+    _raw_data_stash_type = ConfigOption(name='raw_data_stash', default='memory', missing='nothing')
 
     # status variables
     # ext. microwave settings
@@ -99,7 +112,7 @@ class PulsedMeasurementLogic(GenericLogic):
 
     # notification signals for master module (i.e. GUI)
     sigMeasurementDataUpdated = QtCore.Signal()
-    sigTimerUpdated = QtCore.Signal(float, int, float)
+    sigTimerUpdated = QtCore.Signal(float, int, float, dict)
     sigFitUpdated = QtCore.Signal(str, np.ndarray, object, bool)
     sigMeasurementStatusUpdated = QtCore.Signal(bool, bool)
     sigPulserRunningUpdated = QtCore.Signal(bool)
@@ -129,6 +142,19 @@ class PulsedMeasurementLogic(GenericLogic):
 
         # threading
         self._threadlock = Mutex()
+        # serializes all calls to the fast counter that control or read out the measurement
+        self._fast_counter_lock = Mutex()
+        # serializes the use of extractor and analyzer by the analysis loop and pipeline workers
+        self._analysis_lock = Mutex()
+        # worker threads of the pipelined analysis loop
+        self._pipeline_threads = list()
+        self._pipeline_stop_event = None
+        # set by manually_pull_data to request an immediate frame from the acquisition worker
+        self._pipeline_pull_event = None
+        # frames dropped by each pipeline worker, every entry is only written by its own worker
+        self._dropped_frames = {'acquisition': 0, 'analysis': 0}
+        # latencies of the analysis loop stages in seconds of the last published frame
+        self._stage_latencies = dict()
 
         # measurement data
         self.signal_data = np.empty((2, 0), dtype=float)
@@ -137,8 +163,11 @@ class PulsedMeasurementLogic(GenericLogic):
         self.laser_data = np.zeros((10, 20), dtype='int64')
         self.raw_data = np.zeros((10, 20), dtype='int64')
 
-        self._saved_raw_data = OrderedDict()  # temporary saved raw data
-        self._recalled_raw_data_tag = None  # the currently recalled raw data dict key
+        self._raw_data_stash = None  # storage backend of stashed raw data
+        self._recalled_raw_data_tag = None  # the currently recalled raw data tag
+        self._recalled_raw_data = None  # the currently recalled (raw data, info dict)
+        # preallocated arrays the recalled raw data is added to, used in rotation
+        self._raw_data_accumulators = list()
 
         # Paused measurement flag
         self.__is_paused = False
@@ -156,6 +185,16 @@ class PulsedMeasurementLogic(GenericLogic):
     def on_activate(self):
         """ Initialisation performed during activation of the module.
         """
+        # Create the raw data stash backend
+        if self._raw_data_stash_type == 'disk':
+            self._raw_data_stash = DiskRawDataStash(os.path.join(
+                self._manager.getStatusDir(), 'raw_data_stash_{0}'.format(self._name)))
+        else:
+            if self._raw_data_stash_type != 'memory':
+                self.log.error('Unknown raw data stash type "{0}". Stashed raw data will be kept '
+                               'in memory.'.format(self._raw_data_stash_type))
+            self._raw_data_stash = MemoryRawDataStash()
+
         # Create an instance of PulseExtractor
         self._pulseextractor = PulseExtractor(pulsedmeasurementlogic=self)
         self._pulseanalyzer = PulseAnalyzer(pulsedmeasurementlogic=self)
@@ -204,8 +243,9 @@ class PulsedMeasurementLogic(GenericLogic):
         # initialize arrays for the measurement data
         self._initialize_data_arrays()
 
-        # recalled saved raw data dict key
+        # recalled saved raw data tag
         self._recalled_raw_data_tag = None
+        self._recalled_raw_data = None
 
         # Connect internal signals
         self.sigStartTimer.connect(self.__analysis_timer.start, QtCore.Qt.QueuedConnection)
@@ -228,6 +268,8 @@ class PulsedMeasurementLogic(GenericLogic):
         self.__analysis_timer.timeout.disconnect()
         self.sigStartTimer.disconnect()
         self.sigStopTimer.disconnect()
+
+        self._raw_data_stash.close()
         return
 
     ############################################################################
@@ -265,7 +307,8 @@ class PulsedMeasurementLogic(GenericLogic):
         @return:
         """
         # Check if fast counter is running and do nothing if that is the case
-        counter_status = self.fastcounter().get_status()
+        with self._fast_counter_lock:
+            counter_status = self.fastcounter().get_status()
         if not counter_status >= 2 and not counter_status < 0:
             # Determine complete settings dictionary
             if not isinstance(settings_dict, dict):
@@ -285,11 +328,13 @@ class PulsedMeasurementLogic(GenericLogic):
                     self.__fast_counter_gates = 0
 
             # Apply the settings to hardware
-            self.__fast_counter_binwidth, \
-            self.__fast_counter_record_length, \
-            self.__fast_counter_gates = self.fastcounter().configure(self.__fast_counter_binwidth,
-                                                                     self.__fast_counter_record_length,
-                                                                     self.__fast_counter_gates)
+            with self._fast_counter_lock:
+                self.__fast_counter_binwidth, \
+                self.__fast_counter_record_length, \
+                self.__fast_counter_gates = self.fastcounter().configure(
+                    self.__fast_counter_binwidth,
+                    self.__fast_counter_record_length,
+                    self.__fast_counter_gates)
         else:
             self.log.warning('Fast counter is not idle (status: {0}).\n'
                              'Unable to apply new settings.'.format(counter_status))
@@ -303,14 +348,16 @@ class PulsedMeasurementLogic(GenericLogic):
 
         @return int: error code (0:OK, -1:error)
         """
-        return self.fastcounter().start_measure()
+        with self._fast_counter_lock:
+            return self.fastcounter().start_measure()
 
     def fast_counter_off(self):
         """Switching off the fast counter
 
         @return int: error code (0:OK, -1:error)
         """
-        return self.fastcounter().stop_measure()
+        with self._fast_counter_lock:
+            return self.fastcounter().stop_measure()
 
     @QtCore.Slot(bool)
     def toggle_fast_counter(self, switch_on):
@@ -330,14 +377,16 @@ class PulsedMeasurementLogic(GenericLogic):
 
         @return int: error code (0:OK, -1:error)
         """
-        return self.fastcounter().pause_measure()
+        with self._fast_counter_lock:
+            return self.fastcounter().pause_measure()
 
     def fast_counter_continue(self):
         """Switching off the fast counter
 
         @return int: error code (0:OK, -1:error)
         """
-        return self.fastcounter().continue_measure()
+        with self._fast_counter_lock:
+            return self.fastcounter().continue_measure()
 
     @QtCore.Slot(bool)
     def fast_counter_pause_continue(self, continue_counter):
@@ -594,6 +643,10 @@ class PulsedMeasurementLogic(GenericLogic):
             self.set_alternative_data_type(alt_data_type)
         return
 
+    @property
+    def stashed_raw_data_tags(self):
+        return self._raw_data_stash.tags()
+
     @property
     def analysis_methods(self):
         return self._pulseanalyzer.analysis_methods
@@ -646,8 +699,9 @@ class PulsedMeasurementLogic(GenericLogic):
                 num_bins_fast = round(settings_dict[key]/self.fast_counter_settings['bin_width'])
                 settings_dict[key] = num_bins_fast * self.fast_counter_settings['bin_width']
 
-        # Use threadlock to update settings during a running measurement
-        with self._threadlock:
+        # Use threadlock to update settings during a running measurement and the analysis lock
+        # to not change them while a pipeline worker is using them
+        with self._threadlock, self._analysis_lock:
             self._pulseanalyzer.analysis_settings = settings_dict
             self.sigAnalysisSettingsUpdated.emit(self.analysis_settings)
         return
@@ -671,8 +725,9 @@ class PulsedMeasurementLogic(GenericLogic):
         else:
             settings_dict.update(kwargs)
 
-        # Use threadlock to update settings during a running measurement
-        with self._threadlock:
+        # Use threadlock to update settings during a running measurement and the analysis lock
+        # to not change them while a pipeline worker is using them
+        with self._threadlock, self._analysis_lock:
             self._pulseextractor.extraction_settings = settings_dict
             self.sigExtractionSettingsUpdated.emit(self.extraction_settings)
         return
@@ -779,12 +834,14 @@ class PulsedMeasurementLogic(GenericLogic):
                 self._initialize_data_arrays()
 
                 # recall stashed raw data
-                if stashed_raw_data_tag in self._saved_raw_data:
+                if stashed_raw_data_tag in self._raw_data_stash:
                     self._recalled_raw_data_tag = stashed_raw_data_tag
+                    self._recalled_raw_data = self._raw_data_stash.load(stashed_raw_data_tag)
                     self.log.info('Starting pulsed measurement with stashed raw data "{0}".'
                                   ''.format(stashed_raw_data_tag))
                 else:
                     self._recalled_raw_data_tag = None
+                    self._recalled_raw_data = None
 
                 # start microwave source
                 if self.__use_ext_microwave:
@@ -797,13 +854,18 @@ class PulsedMeasurementLogic(GenericLogic):
                 # initialize analysis_timer
                 self.__elapsed_time = 0.0
                 self._elapsed_pause = 0
+                self._stage_latencies = dict()
                 self.sigTimerUpdated.emit(self.__elapsed_time,
                                           self.__elapsed_sweeps,
-                                          self.__timer_interval)
+                                          self.__timer_interval,
+                                          self._stage_latencies)
 
-                # Set starting time and start timer (if present)
+                # Set starting time and start timer (if present) or analysis pipeline
                 self.__start_time = time.time()
-                self.sigStartTimer.emit()
+                if self._pipelined_analysis:
+                    self._start_analysis_pipeline()
+                else:
+                    self.sigStartTimer.emit()
 
                 # Set measurement paused flag
                 self.__is_paused = False
@@ -816,6 +878,8 @@ class PulsedMeasurementLogic(GenericLogic):
         """
         Stop the measurement
         """
+        # Stop the analysis pipeline workers (if running) before the final analysis.
+        self._stop_analysis_pipeline()
         # Get raw data and analyze it a last time just before stopping the measurement.
         try:
             self._pulsed_analysis_loop()
@@ -834,15 +898,20 @@ class PulsedMeasurementLogic(GenericLogic):
                 if self.__use_ext_microwave:
                     self.microwave_off()
 
-                # stash raw data if requested
-                if stash_raw_data_tag:
-                    self._saved_raw_data[stash_raw_data_tag] = (self.raw_data.copy(),
-                                                                {'elapsed_sweeps': self.__elapsed_sweeps,
-                                                                 'elapsed_time': self.__elapsed_time})
+                # stash raw data if requested (release the recalled raw data before, since it can
+                # be a memory map of the file to stash into)
                 self._recalled_raw_data_tag = None
+                self._recalled_raw_data = None
+                if stash_raw_data_tag:
+                    self._raw_data_stash.save(stash_raw_data_tag,
+                                              self.raw_data,
+                                              {'elapsed_sweeps': self.__elapsed_sweeps,
+                                               'elapsed_time': self.__elapsed_time})
 
                 # Set measurement paused flag
                 self.__is_paused = False
+                # release the raw data accumulators except for the published raw data
+                self._raw_data_accumulators = list()
 
                 self.module_state.unlock()
                 self.sigMeasurementStatusUpdated.emit(False, False)
@@ -900,8 +969,8 @@ class PulsedMeasurementLogic(GenericLogic):
                 self.fast_counter_continue()
                 self.pulse_generator_on()
 
-                # un-pausing the timer
-                if not self.__analysis_timer.isActive():
+                # un-pausing the timer (the analysis pipeline pauses by itself)
+                if not self._pipeline_threads and not self.__analysis_timer.isActive():
                     self.sigStartTimer.emit()
 
                 # Set measurement paused flag
@@ -926,13 +995,14 @@ class PulsedMeasurementLogic(GenericLogic):
             self.__timer_interval = interval
             if self.__timer_interval > 0:
                 self.__analysis_timer.setInterval(int(1000. * self.__timer_interval))
-                if self.module_state() == 'locked' and not self.__is_paused:
+                if self.module_state() == 'locked' and not self.__is_paused and \
+                        not self._pipeline_threads:
                     self.sigStartTimer.emit()
             else:
                 self.sigStopTimer.emit()
 
             self.sigTimerUpdated.emit(self.__elapsed_time, self.__elapsed_sweeps,
-                                      self.__timer_interval)
+                                      self.__timer_interval, self._stage_latencies)
         return
 
     @QtCore.Slot(str)
@@ -965,9 +1035,33 @@ class PulsedMeasurementLogic(GenericLogic):
         """ Analyse and display the data
         """
         if self.module_state() == 'locked':
-            self._pulsed_analysis_loop()
+            pull_event = self._pipeline_pull_event
+            if pull_event is not None:
+                # Only the acquisition worker reads the fast counter while the pipeline is running,
+                # so frames are published in order.
+                pull_event.set()
+            else:
+                self._pulsed_analysis_loop()
         return
 
+    def analyse_laser_data_batch(self, settings_list):
+        """ Analyse the current laser data with several analysis settings at once without changing
+        the current analysis settings and without extracting the laser pulses again.
+        Can be used to preview alternative signal/normalization windows.
+
+        @param list settings_list: list of analysis settings dicts (see PulseAnalyzer)
+
+        @return list: list of tuples (signal data, measurement error) in the order of
+                      settings_list. Each array contains one data point per laser pulse.
+        """
+        with self._threadlock:
+            laser_data = self.laser_data
+            if not laser_data.any():
+                return [(np.zeros(laser_data.shape[0]), np.zeros(laser_data.shape[0]))
+                        for _ in settings_list]
+            with self._analysis_lock:
+                return self._pulseanalyzer.analyse_laser_pulses_batch(laser_data, settings_list)
+
     @QtCore.Slot(str)
     @QtCore.Slot(str, bool)
     def do_fit(self, fit_method, use_alternative_data=False, data=None):
@@ -1099,72 +1193,240 @@ class PulsedMeasurementLogic(GenericLogic):
         """
         with self._threadlock:
             if self.module_state() == 'locked':
-                # Update elapsed time
+                frame = self._acquire_frame()
+                self._analyse_frame(frame)
+                if not self._publish_frame(frame):
+                    return
+
+            # emit signals
+            self.sigTimerUpdated.emit(self.__elapsed_time, self.__elapsed_sweeps,
+                                      self.__timer_interval, self._stage_latencies)
+            self.sigMeasurementDataUpdated.emit()
+            return
 
-                self._extract_laser_pulses()
+    def _acquire_frame(self):
+        """
+        Acquisition stage of the analysis loop. Gets the raw data from the fast counter.
 
-                tmp_signal, tmp_error = self._analyze_laser_pulses()
+        @return dict: The frame holding the raw data, elapsed sweeps/time and stage latencies
+        """
+        start_time = time.time()
+        # Get counter raw data (including recalled raw data from previous measurement)
+        fc_data, info_dict = self._get_raw_data()
+        stop_time = time.time()
+        return {'raw_data': fc_data,
+                'elapsed_sweeps': info_dict['elapsed_sweeps'],
+                'elapsed_time': info_dict['elapsed_time'],
+                'start_time': start_time,
+                'acquired_time': stop_time,
+                'latencies': {'acquisition': stop_time - start_time}}
+
+    def _analyse_frame(self, frame):
+        """
+        Extraction/analysis stage of the analysis loop. Extracts and analyses the laser pulses of
+        the frame raw data and computes the signal, error and alternative data arrays.
+        Does not alter the measurement data arrays of this module.
 
-                # exclude laser pulses to ignore
-                if len(self._laser_ignore_list) > 0:
-                    # Convert relative negative indices into absolute positive indices
-                    while self._laser_ignore_list[0] < 0:
-                        neg_index = self._laser_ignore_list[0]
-                        self._laser_ignore_list[0] = len(tmp_signal) + neg_index
-                        self._laser_ignore_list.sort()
+        @param dict frame: The frame returned by _acquire_frame. Is updated in-place.
+        """
+        start_time = time.time()
+        frame['latencies']['queued'] = start_time - frame['acquired_time']
 
-                    tmp_signal = np.delete(tmp_signal, self._laser_ignore_list)
-                    tmp_error = np.delete(tmp_error, self._laser_ignore_list)
+        # extract laser pulses from raw data
+        with self._analysis_lock:
+            return_dict = self._pulseextractor.extract_laser_pulses(frame['raw_data'])
+            laser_data = return_dict['laser_counts_arr']
+
+            # analyze pulses and get data points for signal array. Also check if extraction
+            # worked (non-zero array returned).
+            if laser_data.any():
+                tmp_signal, tmp_error = self._pulseanalyzer.analyse_laser_pulses(laser_data)
+            else:
+                tmp_signal = np.zeros(laser_data.shape[0])
+                tmp_error = np.zeros(laser_data.shape[0])
+        frame['laser_data'] = laser_data
+        frame['signal_data'] = None
+
+        # exclude laser pulses to ignore
+        if len(self._laser_ignore_list) > 0:
+            # Convert relative negative indices into absolute positive indices
+            while self._laser_ignore_list[0] < 0:
+                neg_index = self._laser_ignore_list[0]
+                self._laser_ignore_list[0] = len(tmp_signal) + neg_index
+                self._laser_ignore_list.sort()
+
+            tmp_signal = np.delete(tmp_signal, self._laser_ignore_list)
+            tmp_error = np.delete(tmp_error, self._laser_ignore_list)
+
+        # order data according to alternating flag
+        signal_data = self.signal_data.copy()
+        measurement_error = self.measurement_error.copy()
+        if self._alternating:
+            if len(signal_data[0]) != len(tmp_signal[::2]):
+                self.log.error('Length of controlled variable ({0}) does not match length of number of readout '
+                               'pulses ({1}).'.format(len(signal_data[0]), len(tmp_signal[::2])))
+                return
+            signal_data[1] = tmp_signal[::2]
+            signal_data[2] = tmp_signal[1::2]
+            measurement_error[1] = tmp_error[::2]
+            measurement_error[2] = tmp_error[1::2]
+        else:
+            if len(signal_data[0]) != len(tmp_signal):
+                self.log.error('Length of controlled variable ({0}) does not match length of number of readout '
+                               'pulses ({1}).'.format(len(signal_data[0]), len(tmp_signal)))
+                return
+            signal_data[1] = tmp_signal
+            measurement_error[1] = tmp_error
+
+        frame['signal_data'] = signal_data
+        frame['measurement_error'] = measurement_error
+        # Compute alternative data array from signal
+        frame['signal_alt_data'] = self._get_alt_data(signal_data)
+        frame['latencies']['analysis'] = time.time() - start_time
+        return
 
-                # order data according to alternating flag
-                if self._alternating:
-                    if len(self.signal_data[0]) != len(tmp_signal[::2]):
-                        self.log.error('Length of controlled variable ({0}) does not match length of number of readout '
-                                       'pulses ({1}).'.format(len(self.signal_data[0]), len(tmp_signal[::2])))
-                        return
-                    self.signal_data[1] = tmp_signal[::2]
-                    self.signal_data[2] = tmp_signal[1::2]
-                    self.measurement_error[1] = tmp_error[::2]
-                    self.measurement_error[2] = tmp_error[1::2]
+    def _publish_frame(self, frame):
+        """
+        Publish stage of the analysis loop. Replaces the measurement data arrays of this module with
+        the analysed frame. Must be called with the threadlock acquired.
+
+        @param dict frame: The frame analysed by _analyse_frame
+
+        @return bool: True if the signal data has been updated, False if the analysis failed
+        """
+        self.raw_data = frame['raw_data']
+        self.laser_data = frame['laser_data']
+        self.__elapsed_sweeps = frame['elapsed_sweeps']
+        self.__elapsed_time = frame['elapsed_time']
+        if frame['signal_data'] is None:
+            return False
+
+        self.signal_data = frame['signal_data']
+        self.measurement_error = frame['measurement_error']
+        self.signal_alt_data = frame['signal_alt_data']
+
+        stop_time = time.time()
+        frame['latencies']['publish'] = stop_time - frame['acquired_time'] - frame['latencies'].get(
+            'queued', 0) - frame['latencies'].get('analysis', 0)
+        frame['latencies']['total'] = stop_time - frame['start_time']
+        frame['latencies']['dropped_frames'] = sum(self._dropped_frames.values())
+        self._stage_latencies = frame['latencies']
+        return True
+
+    def _start_analysis_pipeline(self):
+        """
+        Start the worker threads of the pipelined analysis loop (ConfigOption
+        "pipelined_analysis"). The acquisition, extraction/analysis and publish stages run in
+        separate threads connected by queues holding a single frame. If a stage falls behind, the
+        stale frame waiting in its input queue is dropped in favour of the newer one.
+        """
+        self._dropped_frames = {'acquisition': 0, 'analysis': 0}
+        self._pipeline_stop_event = threading.Event()
+        self._pipeline_pull_event = threading.Event()
+        raw_queue = queue.Queue(maxsize=1)
+        analysed_queue = queue.Queue(maxsize=1)
+        stop_event = self._pipeline_stop_event
+        pull_event = self._pipeline_pull_event
+
+        def acquisition_loop():
+            next_time = time.time() + self.__timer_interval
+            while not stop_event.is_set():
+                timer_running = self.__timer_interval > 0 and not self.__is_paused
+                if timer_running:
+                    timeout = next_time - time.time()
+                else:
+                    next_time = time.time() + max(self.__timer_interval, 0)
+                    timeout = 0.1
+                # Wait in short steps to react to stop requests and manually requested frames
+                if pull_event.wait(max(min(timeout, 0.1), 0)):
+                    pull_event.clear()
+                elif not timer_running or timeout > 0.1:
+                    continue
                 else:
-                    if len(self.signal_data[0]) != len(tmp_signal):
-                        self.log.error('Length of controlled variable ({0}) does not match length of number of readout '
-                                       'pulses ({1}).'.format(len(self.signal_data[0]), len(tmp_signal)))
-                        return
-                    self.signal_data[1] = tmp_signal
-                    self.measurement_error[1] = tmp_error
+                    next_time = max(next_time + self.__timer_interval, time.time())
+                if stop_event.is_set():
+                    break
+                try:
+                    frame = self._acquire_frame()
+                except:
+                    self.log.exception('Acquisition of pulsed measurement raw data failed:')
+                    continue
+                self._dropped_frames['acquisition'] += self._put_latest(raw_queue, frame)
+            return
 
-                # Compute alternative data array from signal
-                self._compute_alt_data()
+        def analysis_loop():
+            while not stop_event.is_set():
+                try:
+                    frame = raw_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                try:
+                    self._analyse_frame(frame)
+                except:
+                    self.log.exception('Analysis of pulsed measurement raw data failed:')
+                    continue
+                self._dropped_frames['analysis'] += self._put_latest(analysed_queue, frame)
+            return
 
-            # emit signals
-            self.sigTimerUpdated.emit(self.__elapsed_time, self.__elapsed_sweeps,
-                                      self.__timer_interval)
-            self.sigMeasurementDataUpdated.emit()
+        def publish_loop():
+            while not stop_event.is_set():
+                try:
+                    frame = analysed_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                with self._threadlock:
+                    if stop_event.is_set() or self.module_state() != 'locked':
+                        continue
+                    if not self._publish_frame(frame):
+                        continue
+                    self.sigTimerUpdated.emit(self.__elapsed_time, self.__elapsed_sweeps,
+                                              self.__timer_interval, self._stage_latencies)
+                    self.sigMeasurementDataUpdated.emit()
             return
 
-    def _extract_laser_pulses(self):
-        # Get counter raw data (including recalled raw data from previous measurement)
-        fc_data, info_dict = self._get_raw_data()
-        self.raw_data = fc_data
-        self.__elapsed_sweeps = info_dict['elapsed_sweeps']
-        self.__elapsed_time = info_dict['elapsed_time']
+        self._pipeline_threads = [
+            threading.Thread(target=acquisition_loop, name='PulsedAcquisition', daemon=True),
+            threading.Thread(target=analysis_loop, name='PulsedAnalysis', daemon=True),
+            threading.Thread(target=publish_loop, name='PulsedPublish', daemon=True)]
+        for thread in self._pipeline_threads:
+            thread.start()
+        return
 
-        # extract laser pulses from raw data
-        return_dict = self._pulseextractor.extract_laser_pulses(self.raw_data)
-        self.laser_data = return_dict['laser_counts_arr']
+    def _stop_analysis_pipeline(self):
+        """
+        Stop the worker threads of the pipelined analysis loop and wait for them to finish.
+        Must not be called with the threadlock acquired.
+        """
+        if self._pipeline_stop_event is not None:
+            self._pipeline_stop_event.set()
+        for thread in self._pipeline_threads:
+            thread.join()
+        self._pipeline_threads = list()
+        self._pipeline_stop_event = None
+        self._pipeline_pull_event = None
         return
 
-    def _analyze_laser_pulses(self):
-        # analyze pulses and get data points for signal array. Also check if extraction
-        # worked (non-zero array returned).
-        if self.laser_data.any():
-            tmp_signal, tmp_error = self._pulseanalyzer.analyse_laser_pulses(
-                self.laser_data)
-        else:
-            tmp_signal = np.zeros(self.laser_data.shape[0])
-            tmp_error = np.zeros(self.laser_data.shape[0])
-        return tmp_signal, tmp_error
+    @staticmethod
+    def _put_latest(frame_queue, frame):
+        """
+        Put a frame into a bounded queue. If the queue is full the oldest frames are dropped.
+
+        @param queue.Queue frame_queue: The queue to put the frame into
+        @param dict frame: The frame to put into the queue
+
+        @return int: The number of dropped frames
+        """
+        dropped = 0
+        while True:
+            try:
+                frame_queue.put_nowait(frame)
+                return dropped
+            except queue.Full:
+                try:
+                    frame_queue.get_nowait()
+                    dropped += 1
+                except queue.Empty:
+                    pass
 
     def _get_raw_data(self):
         """
@@ -1174,7 +1436,8 @@ class PulsedMeasurementLogic(GenericLogic):
                                                  info_dict with keys 'elapsed_sweeps' and 'elapsed_time'
         """
         # get raw data from fast counter
-        fc_data = self.fastcounter().get_data_trace()
+        with self._fast_counter_lock:
+            fc_data = self.fastcounter().get_data_trace()
         if type(fc_data) == tuple and len(fc_data) == 2:  # if the hardware implement the new version of the interface
             fc_data, info_dict = fc_data
         else:
@@ -1192,18 +1455,26 @@ class PulsedMeasurementLogic(GenericLogic):
             elapsed_time = time.time() - self.__start_time
 
         # add old raw data from previous measurements if necessary
-        if self._saved_raw_data.get(self._recalled_raw_data_tag) is not None:
+        recalled_raw_data = self._recalled_raw_data
+        if recalled_raw_data is not None:
             # self.log.info('Found old saved raw data with tag "{0}".'
             #               ''.format(self._recalled_raw_data_tag))
-            elapsed_sweeps += self._saved_raw_data[self._recalled_raw_data_tag][1]['elapsed_sweeps']
-            elapsed_time += self._saved_raw_data[self._recalled_raw_data_tag][1]['elapsed_time']
+            recalled_data, recalled_info = recalled_raw_data
+            elapsed_sweeps += recalled_info['elapsed_sweeps']
+            elapsed_time += recalled_info['elapsed_time']
             if not fc_data.any():
                 self.log.warning('Only zeros received from fast counter!\n'
                                  'Using recalled raw data only.')
-                fc_data = self._saved_raw_data[self._recalled_raw_data_tag][0]
-            elif self._saved_raw_data[self._recalled_raw_data_tag][0].shape == fc_data.shape:
+                # The recalled data is a read-only view of the stash, hand out a private copy
+                fc_data = self._get_raw_data_accumulator(recalled_data.shape)
+                np.copyto(fc_data, recalled_data)
+            elif recalled_data.shape == fc_data.shape:
                 self.log.debug('Recalled raw data has the same shape as current data.')
-                fc_data = self._saved_raw_data[self._recalled_raw_data_tag][0] + fc_data
+                # The fast counter may return its internal buffer, so the sum can not be
+                # accumulated into fc_data. The recalled data is read from the stash directly.
+                fc_data = np.add(recalled_data, fc_data,
+                                 out=self._get_raw_data_accumulator(fc_data.shape),
+                                 dtype='int64')
             else:
                 self.log.warning('Recalled raw data has not the same shape as current data.'
                                  '\nDid NOT add recalled raw data to current time trace.')
@@ -1213,6 +1484,28 @@ class PulsedMeasurementLogic(GenericLogic):
 
         return fc_data, {'elapsed_sweeps': elapsed_sweeps, 'elapsed_time': elapsed_time}
 
+    def _get_raw_data_accumulator(self, shape):
+        """
+        Get a preallocated int64 array to add the recalled raw data to. The arrays are used in
+        rotation, so the raw data of the published frame is not altered while the next frame is
+        acquired. While the analysis pipeline is running, more arrays are needed to also keep the
+        frames waiting in or passing through the pipeline stages intact.
+
+        @param tuple shape: The shape of the raw data array
+
+        @return numpy.ndarray: The array to write the raw data to
+        """
+        # published frame and acquired frame plus up to four frames in the pipeline
+        count = 6 if self._pipeline_threads else 2
+        accumulators = [acc for acc in self._raw_data_accumulators if acc.shape == tuple(shape)]
+        if len(accumulators) >= count:
+            accumulator = accumulators.pop(0)
+        else:
+            accumulator = np.empty(shape, dtype='int64')
+        accumulators.append(accumulator)
+        self._raw_data_accumulators = accumulators[-count:]
+        return accumulator
+
     def _initialize_data_arrays(self):
         """
         Initializing the signal, error, laser and raw data arrays.
@@ -1282,14 +1575,14 @@ class PulsedMeasurementLogic(GenericLogic):
             parameters['gated counting'] = self.fast_counter_settings['is_gated']
             parameters['extraction parameters'] = self.extraction_settings
 
-            self.savelogic().save_data(data,
-                                       timestamp=timestamp,
-                                       parameters=parameters,
-                                       filepath=filepath,
-                                       filelabel=filelabel,
-                                       filetype='text',
-                                       fmt='%d',
-                                       delimiter='\t')
+            self.savelogic().save_data_async(data,
+                                             timestamp=timestamp,
+                                             parameters=parameters,
+                                             filepath=filepath,
+                                             filelabel=filelabel,
+                                             filetype=self._raw_data_save_type,
+                                             fmt='%d',
+                                             delimiter='\t')
 
         #####################################################################
         ####                Save measurement data                        ####
@@ -1554,10 +1847,10 @@ class PulsedMeasurementLogic(GenericLogic):
             else:
                 fig = None
 
-            self.savelogic().save_data(data, timestamp=timestamp,
-                                       parameters=parameters, fmt='%.15e',
-                                       filepath=filepath, filelabel=filelabel, filetype='text',
-                                       delimiter='\t', plotfig=fig)
+            self.savelogic().save_data_async(data, timestamp=timestamp,
+                                             parameters=parameters, fmt='%.15e',
+                                             filepath=filepath, filelabel=filelabel, filetype='text',
+                                             delimiter='\t', plotfig=fig)
 
         #####################################################################
         ####                Save raw data timetrace                      ####
@@ -1577,42 +1870,50 @@ class PulsedMeasurementLogic(GenericLogic):
         parameters['alternating'] = self._alternating
         parameters['Controlled variable'] = list(self.signal_data[0])
 
-        self.savelogic().save_data(data, timestamp=timestamp,
-                                   parameters=parameters, fmt='%d',
-                                   filepath=filepath, filelabel=filelabel,
-                                   filetype=self._raw_data_save_type,
-                                   delimiter='\t')
+        self.savelogic().save_data_async(data, timestamp=timestamp,
+                                         parameters=parameters, fmt='%d',
+                                         filepath=filepath, filelabel=filelabel,
+                                         filetype=self._raw_data_save_type,
+                                         delimiter='\t')
         return filepath
 
     def _compute_alt_data(self):
         """
         Performing transformations on the measurement data (e.g. fourier transform).
         """
-        if self._alternative_data_type == 'Delta' and len(self.signal_data) == 3:
-            self.signal_alt_data = np.empty((2, self.signal_data.shape[1]), dtype=float)
-            self.signal_alt_data[0] = self.signal_data[0]
-            self.signal_alt_data[1] = self.signal_data[1] - self.signal_data[2]
-        elif self._alternative_data_type == 'FFT' and self.signal_data.shape[1] >= 2:
-            fft_x, fft_y = units.compute_ft(x_val=self.signal_data[0],
-                                            y_val=self.signal_data[1],
+        self.signal_alt_data = self._get_alt_data(self.signal_data)
+        return
+
+    def _get_alt_data(self, signal_data):
+        """
+        Helper method to compute the alternative data array from a signal data array.
+
+        @param numpy.ndarray signal_data: The signal data array (see signal_data)
+
+        @return numpy.ndarray: The alternative signal data array
+        """
+        if self._alternative_data_type == 'Delta' and len(signal_data) == 3:
+            signal_alt_data = np.empty((2, signal_data.shape[1]), dtype=float)
+            signal_alt_data[0] = signal_data[0]
+            signal_alt_data[1] = signal_data[1] - signal_data[2]
+        elif self._alternative_data_type == 'FFT' and signal_data.shape[1] >= 2:
+            fft_x, fft_y = units.compute_ft(x_val=signal_data[0],
+                                            y_val=signal_data[1],
                                             zeropad_num=self.zeropad,
                                             window=self.window,
                                             base_corr=self.base_corr,
                                             psd=self.psd)
-            self.signal_alt_data = np.empty((len(self.signal_data), len(fft_x)), dtype=float)
-            self.signal_alt_data[0] = fft_x
-            self.signal_alt_data[1] = fft_y
-            for dim in range(2, len(self.signal_data)):
-                dummy, self.signal_alt_data[dim] = units.compute_ft(x_val=self.signal_data[0],
-                                                                    y_val=self.signal_data[dim],
-                                                                    zeropad_num=self.zeropad,
-                                                                    window=self.window,
-                                                                    base_corr=self.base_corr,
-                                                                    psd=self.psd)
+            signal_alt_data = np.empty((len(signal_data), len(fft_x)), dtype=float)
+            signal_alt_data[0] = fft_x
+            signal_alt_data[1] = fft_y
+            for dim in range(2, len(signal_data)):
+                dummy, signal_alt_data[dim] = units.compute_ft(x_val=signal_data[0],
+                                                               y_val=signal_data[dim],
+                                                               zeropad_num=self.zeropad,
+                                                               window=self.window,
+                                                               base_corr=self.base_corr,
+                                                               psd=self.psd)
         else:
-            self.signal_alt_data = np.zeros(self.signal_data.shape, dtype=float)
-            self.signal_alt_data[0] = self.signal_data[0]
-        return
-
-
-
+            signal_alt_data = np.zeros(signal_data.shape, dtype=float)
+            signal_alt_data[0] = signal_data[0]
+        return signal_alt_data
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the storage backends for raw data stashed by the PulsedMeasurementLogic in
+order to continue a measurement later on.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+
+
+class MemoryRawDataStash:
+    """
+    Raw data stash holding copies of the raw data arrays in memory. The stashed data is lost when
+    the PulsedMeasurementLogic is deactivated.
+    """
+
+    def __init__(self):
+        self._stash = OrderedDict()
+
+    def close(self):
+        self._stash.clear()
+
+    def __contains__(self, tag):
+        return tag in self._stash
+
+    def tags(self):
+        """ Returns the tags of all stashed raw data arrays.
+
+        @return list: The tags of all stashed raw data arrays
+        """
+        return list(self._stash)
+
+    def load(self, tag):
+        """ Returns the stashed raw data and the corresponding info dict.
+
+        @param str tag: The tag of the stashed raw data
+
+        @return tuple: (numpy.ndarray, dict) the raw data and the info dict with keys
+                       'elapsed_sweeps' and 'elapsed_time'. None if not found.
+        """
+        return self._stash.get(tag)
+
+    def save(self, tag, raw_data, info_dict):
+        """ Stashes raw data under a tag. Already stashed data with the same tag is replaced.
+
+        @param str tag: The tag to stash the raw data under
+        @param numpy.ndarray raw_data: The raw data to stash
+        @param dict info_dict: dict with keys 'elapsed_sweeps' and 'elapsed_time'
+        """
+        self._stash[tag] = (np.array(raw_data, dtype='int64'), dict(info_dict))
+
+    def delete(self, tag):
+        """ Removes stashed raw data.
+
+        @param str tag: The tag of the stashed raw data to remove
+        """
+        self._stash.pop(tag, None)
+
+
+class DiskRawDataStash:
+    """
+    Raw data stash holding the raw data arrays as .npy files in a directory (e.g. in the
+    application status directory), so stashed data survives a restart of qudi.
+
+    Each tag is stored as pair of files named by the SHA-1 hash of the tag: "<hash>.npy" holding
+    the raw data and "<hash>.json" holding the tag and the info dict. Stashed raw data is loaded
+    as read-only memory map, i.e. it is read from disk on demand instead of being held in memory.
+    Stashing raw data of the same shape under an existing tag overwrites the file contents in place.
+    """
+
+    def __init__(self, directory):
+        """
+        @param str directory: The directory to store the stashed raw data in. Will be created if
+                              not present.
+        """
+        self.directory = directory
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        # The stashed tags with their file base names as values
+        self._files = OrderedDict()
+        for filename in sorted(os.listdir(directory)):
+            base, ext = os.path.splitext(filename)
+            if ext != '.json' or not os.path.isfile(os.path.join(directory, base + '.npy')):
+                continue
+            try:
+                with open(os.path.join(directory, filename), 'r') as file:
+                    self._files[json.load(file)['tag']] = base
+            except (OSError, ValueError, KeyError):
+                continue
+
+    def close(self):
+        with self._lock:
+            self._files.clear()
+
+    def __contains__(self, tag):
+        return tag in self._files
+
+    def tags(self):
+        """ Returns the tags of all stashed raw data arrays.
+
+        @return list: The tags of all stashed raw data arrays
+        """
+        return list(self._files)
+
+    def load(self, tag):
+        """ Returns the stashed raw data (read-only memory map) and the corresponding info dict.
+
+        @param str tag: The tag of the stashed raw data
+
+        @return tuple: (numpy.memmap, dict) the raw data and the info dict with keys
+                       'elapsed_sweeps' and 'elapsed_time'. None if not found.
+        """
+        with self._lock:
+            base = self._files.get(tag)
+            if base is None:
+                return None
+            path = os.path.join(self.directory, base)
+            with open(path + '.json', 'r') as file:
+                info_dict = json.load(file)['info']
+            return np.load(path + '.npy', mmap_mode='r'), info_dict
+
+    def save(self, tag, raw_data, info_dict):
+        """ Stashes raw data under a tag. Already stashed data with the same tag is replaced.
+        If the shape of the already stashed data matches, the file contents are overwritten in
+        place.
+
+        @param str tag: The tag to stash the raw data under
+        @param numpy.ndarray raw_data: The raw data to stash
+        @param dict info_dict: dict with keys 'elapsed_sweeps' and 'elapsed_time'
+        """
+        with self._lock:
+            base = hashlib.sha1(tag.encode('utf-8')).hexdigest()
+            path = os.path.join(self.directory, base)
+            stash = None
+            if os.path.isfile(path + '.npy'):
+                try:
+                    stash = np.load(path + '.npy', mmap_mode='r+')
+                except (OSError, ValueError):
+                    stash = None
+                if stash is not None and (stash.shape != raw_data.shape or
+                                          stash.dtype != np.dtype('int64')):
+                    del stash
+                    stash = None
+            if stash is None:
+                stash = np.lib.format.open_memmap(path + '.npy', mode='w+', dtype='int64',
+                                                  shape=raw_data.shape)
+            stash[...] = raw_data
+            stash.flush()
+            del stash
+            with open(path + '.json', 'w') as file:
+                json.dump({'tag': tag,
+                           'info': {'elapsed_sweeps': int(info_dict['elapsed_sweeps']),
+                                    'elapsed_time': float(info_dict['elapsed_time'])}},
+                          file)
+            self._files[tag] = base
+
+    def delete(self, tag):
+        """ Removes stashed raw data including its files.
+
+        @param str tag: The tag of the stashed raw data to remove
+        """
+        with self._lock:
+            base = self._files.pop(tag, None)
+            if base is None:
+                return
+            for ext in ('.npy', '.json'):
+                path = os.path.join(self.directory, base + ext)
+                if os.path.isfile(path):
+                    os.remove(path)
@@ -29,19 +29,26 @@ class Idle(SamplingBase):
     """
     Object representing an idle element (zero voltage)
     """
+    pointwise = True
+    time_invariant = True
+
     def __init__(self):
         pass
 
     @staticmethod
-    def get_samples(time_array):
-        samples_arr = np.zeros(len(time_array))
-        return samples_arr
+    def get_samples(time_array, out=None):
+        if out is None:
+            return np.zeros(len(time_array))
+        out.fill(0)
+        return out
 
 
 class DC(SamplingBase):
     """
     Object representing an DC element (constant voltage)
     """
+    pointwise = True
+    time_invariant = True
     params = OrderedDict()
     params['voltage'] = {'unit': 'V', 'init': 0.0, 'min': -np.inf, 'max': +np.inf, 'type': float}
 
@@ -53,12 +60,17 @@ class DC(SamplingBase):
         return
 
     @staticmethod
-    def _get_dc(time_array, voltage):
-        samples_arr = np.zeros(len(time_array)) + voltage
+    def _get_dc(time_array, voltage, out=None):
+        if out is None:
+            samples_arr = np.zeros(len(time_array))
+        else:
+            samples_arr = out
+            samples_arr.fill(0)
+        samples_arr += voltage
         return samples_arr
 
-    def get_samples(self, time_array):
-        samples_arr = self._get_dc(time_array, self.voltage)
+    def get_samples(self, time_array, out=None):
+        samples_arr = self._get_dc(time_array, self.voltage, out)
         return samples_arr
 
 
@@ -66,6 +78,7 @@ class Sin(SamplingBase):
     """
     Object representing a sine wave element
     """
+    pointwise = True
     params = OrderedDict()
     params['amplitude'] = {'unit': 'V', 'init': 0.0, 'min': 0.0, 'max': np.inf, 'type': float}
     params['frequency'] = {'unit': 'Hz', 'init': 2.87e9, 'min': 0.0, 'max': np.inf, 'type': float}
@@ -87,15 +100,18 @@ class Sin(SamplingBase):
         return
 
     @staticmethod
-    def _get_sine(time_array, amplitude, frequency, phase):
-        samples_arr = amplitude * np.sin(2 * np.pi * frequency * time_array + phase)
+    def _get_sine(time_array, amplitude, frequency, phase, out=None):
+        samples_arr = np.multiply(2 * np.pi * frequency, time_array, out=out)
+        samples_arr += phase
+        np.sin(samples_arr, out=samples_arr)
+        samples_arr *= amplitude
         return samples_arr
 
-    def get_samples(self, time_array):
+    def get_samples(self, time_array, out=None):
         phase_rad = np.pi * self.phase / 180
         # conversion for AWG to actually output the specified voltage
         amp_conv = 2 * self.amplitude
-        samples_arr = self._get_sine(time_array, amp_conv, self.frequency, phase_rad)
+        samples_arr = self._get_sine(time_array, amp_conv, self.frequency, phase_rad, out)
         return samples_arr
 
 
@@ -103,6 +119,7 @@ class DoubleSinSum(SamplingBase):
     """
     Object representing a double sine wave element (Superposition of two sine waves; NOT normalized)
     """
+    pointwise = True
     params = OrderedDict()
     params['amplitude_1'] = {'unit': 'V', 'init': 0.0, 'min': 0.0, 'max': np.inf, 'type': float}
     params['frequency_1'] = {'unit': 'Hz', 'init': 2.87e9, 'min': 0.0, 'max': np.inf, 'type': float}
@@ -142,16 +159,19 @@ class DoubleSinSum(SamplingBase):
         return
 
     @staticmethod
-    def _get_sine(time_array, amplitude, frequency, phase):
-        samples_arr = amplitude * np.sin(2 * np.pi * frequency * time_array + phase)
+    def _get_sine(time_array, amplitude, frequency, phase, out=None):
+        samples_arr = np.multiply(2 * np.pi * frequency, time_array, out=out)
+        samples_arr += phase
+        np.sin(samples_arr, out=samples_arr)
+        samples_arr *= amplitude
         return samples_arr
 
-    def get_samples(self, time_array):
+    def get_samples(self, time_array, out=None):
         # First sine wave
         phase_rad = np.pi * self.phase_1 / 180
         # conversion for AWG to actually output the specified voltage
         amp_conv = 2 * self.amplitude_1
-        samples_arr = self._get_sine(time_array, amp_conv, self.frequency_1, phase_rad)
+        samples_arr = self._get_sine(time_array, amp_conv, self.frequency_1, phase_rad, out)
 
         # Second sine wave (add on first sine)
         phase_rad = np.pi * self.phase_2 / 180
@@ -165,6 +185,7 @@ class DoubleSinProduct(SamplingBase):
     """
     Object representing a double sine wave element (Product of two sine waves; NOT normalized)
     """
+    pointwise = True
     params = OrderedDict()
     params['amplitude_1'] = {'unit': 'V', 'init': 0.0, 'min': 0.0, 'max': np.inf, 'type': float}
     params['frequency_1'] = {'unit': 'Hz', 'init': 2.87e9, 'min': 0.0, 'max': np.inf, 'type': float}
@@ -204,16 +225,19 @@ class DoubleSinProduct(SamplingBase):
         return
 
     @staticmethod
-    def _get_sine(time_array, amplitude, frequency, phase):
-        samples_arr = amplitude * np.sin(2 * np.pi * frequency * time_array + phase)
+    def _get_sine(time_array, amplitude, frequency, phase, out=None):
+        samples_arr = np.multiply(2 * np.pi * frequency, time_array, out=out)
+        samples_arr += phase
+        np.sin(samples_arr, out=samples_arr)
+        samples_arr *= amplitude
         return samples_arr
 
-    def get_samples(self, time_array):
+    def get_samples(self, time_array, out=None):
         # First sine wave
         phase_rad = np.pi * self.phase_1 / 180
         # conversion for AWG to actually output the specified voltage
         amp_conv = 2 * self.amplitude_1
-        samples_arr = self._get_sine(time_array, amp_conv, self.frequency_1, phase_rad)
+        samples_arr = self._get_sine(time_array, amp_conv, self.frequency_1, phase_rad, out)
 
         # Second sine wave (add on first sine)
         phase_rad = np.pi * self.phase_2 / 180
@@ -228,6 +252,7 @@ class TripleSinSum(SamplingBase):
     Object representing a linear combination of three sines
     (Superposition of three sine waves; NOT normalized)
     """
+    pointwise = True
     params = OrderedDict()
     params['amplitude_1'] = {'unit': 'V', 'init': 0.0, 'min': 0.0, 'max': np.inf, 'type': float}
     params['frequency_1'] = {'unit': 'Hz', 'init': 2.87e9, 'min': 0.0, 'max': np.inf, 'type': float}
@@ -284,16 +309,19 @@ class TripleSinSum(SamplingBase):
         return
 
     @staticmethod
-    def _get_sine(time_array, amplitude, frequency, phase):
-        samples_arr = amplitude * np.sin(2 * np.pi * frequency * time_array + phase)
+    def _get_sine(time_array, amplitude, frequency, phase, out=None):
+        samples_arr = np.multiply(2 * np.pi * frequency, time_array, out=out)
+        samples_arr += phase
+        np.sin(samples_arr, out=samples_arr)
+        samples_arr *= amplitude
         return samples_arr
 
-    def get_samples(self, time_array):
+    def get_samples(self, time_array, out=None):
         # First sine wave
         phase_rad = np.pi * self.phase_1 / 180
         # conversion for AWG to actually output the specified voltage
         amp_conv = 2 * self.amplitude_1
-        samples_arr = self._get_sine(time_array, amp_conv, self.frequency_1, phase_rad)
+        samples_arr = self._get_sine(time_array, amp_conv, self.frequency_1, phase_rad, out)
 
         # Second sine wave (add on first sine)
         phase_rad = np.pi * self.phase_2 / 180
@@ -314,6 +342,7 @@ class TripleSinProduct(SamplingBase):
     Object representing a wave element composed of the product of three sines
     (Product of three sine waves; NOT normalized)
     """
+    pointwise = True
     params = OrderedDict()
     params['amplitude_1'] = {'unit': 'V', 'init': 0.0, 'min': 0.0, 'max': np.inf, 'type': float}
     params['frequency_1'] = {'unit': 'Hz', 'init': 2.87e9, 'min': 0.0, 'max': np.inf, 'type': float}
@@ -370,16 +399,19 @@ class TripleSinProduct(SamplingBase):
         return
 
     @staticmethod
-    def _get_sine(time_array, amplitude, frequency, phase):
-        samples_arr = amplitude * np.sin(2 * np.pi * frequency * time_array + phase)
+    def _get_sine(time_array, amplitude, frequency, phase, out=None):
+        samples_arr = np.multiply(2 * np.pi * frequency, time_array, out=out)
+        samples_arr += phase
+        np.sin(samples_arr, out=samples_arr)
+        samples_arr *= amplitude
         return samples_arr
 
-    def get_samples(self, time_array):
+    def get_samples(self, time_array, out=None):
         # First sine wave
         phase_rad = np.pi * self.phase_1 / 180
         # conversion for AWG to actually output the specified voltage
         amp_conv = 2 * self.amplitude_1
-        samples_arr = self._get_sine(time_array, amp_conv, self.frequency_1, phase_rad)
+        samples_arr = self._get_sine(time_array, amp_conv, self.frequency_1, phase_rad, out)
 
         # Second sine wave (add on first sine)
         phase_rad = np.pi * self.phase_2 / 180
@@ -426,15 +458,23 @@ class Chirp(SamplingBase):
             self.stop_freq = stop_freq
         return
 
-    def get_samples(self, time_array):
+    def get_samples(self, time_array, out=None):
         phase_rad = np.deg2rad(self.phase)
         freq_diff = self.stop_freq - self.start_freq
         time_diff = time_array[-1] - time_array[0]
         # conversion for AWG to actually output the specified voltage
         amp_conv = 2 * self.amplitude
-        samples_arr = amp_conv * np.sin(2 * np.pi * time_array * (
-                    self.start_freq + freq_diff * (
-                        time_array - time_array[0]) / time_diff / 2) + phase_rad)
+        # instantaneous frequency
+        samples_arr = np.subtract(time_array, time_array[0], out=out)
+        samples_arr *= freq_diff
+        samples_arr /= time_diff
+        samples_arr /= 2
+        samples_arr += self.start_freq
+        # phase
+        samples_arr *= 2 * np.pi * time_array
+        samples_arr += phase_rad
+        np.sin(samples_arr, out=samples_arr)
+        samples_arr *= amp_conv
         return samples_arr
 
 
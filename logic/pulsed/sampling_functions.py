@@ -26,6 +26,8 @@ import sys
 import inspect
 import copy
 import logging
+import threading
+import numpy as np
 from collections import OrderedDict
 
 
@@ -35,6 +37,14 @@ class SamplingBase:
     """
     params = OrderedDict()
     log = logging.getLogger(__name__)
+    # Flag indicating that get_samples evaluates each time bin independently of all other time bins
+    # in time_array. Samples of several PulseBlockElements using equal sampling functions can then
+    # be calculated in a single call by passing the concatenated time arrays.
+    pointwise = False
+    # Flag indicating that get_samples returns the same samples regardless of the absolute time
+    # (e.g. a constant voltage). Repetitions of PulseBlocks only using such sampling functions can
+    # be played by looping a single waveform even if the rotating frame is preserved.
+    time_invariant = False
 
     def __repr__(self):
         kwargs = []
@@ -57,15 +67,13 @@ class SamplingBase:
     def __eq__(self, other):
         if not isinstance(other, SamplingBase):
             return False
+        return hash(self) == hash(other)
+
+    def __hash__(self):
         hash_list = [type(self).__name__]
         for param in self.params:
             hash_list.append(getattr(self, param))
-        hash_self = hash(tuple(hash_list))
-        hash_list = [type(other).__name__]
-        for param in other.params:
-            hash_list.append(getattr(other, param))
-        hash_other = hash(tuple(hash_list))
-        return hash_self == hash_other
+        return hash(tuple(hash_list))
 
     def get_dict_representation(self):
         dict_repr = dict()
@@ -76,11 +84,89 @@ class SamplingBase:
         return dict_repr
 
 
+class SampleCache:
+    """
+    Thread-safe LRU cache for samples of sampling functions with a limited memory budget.
+
+    Cached sample arrays are read-only. Arrays larger than the budget are not cached at all.
+    """
+
+    def __init__(self, max_bytes=0):
+        """
+        @param int max_bytes: optional, memory budget of the cache in bytes (0 disables the cache)
+        """
+        self._lock = threading.Lock()
+        self._samples = OrderedDict()
+        self._max_bytes = int(max_bytes)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value):
+        with self._lock:
+            self._max_bytes = max(int(value), 0)
+            self._shrink()
+
+    def get(self, key):
+        """ Returns the cached sample array for key and marks it as most recently used.
+
+        @param tuple key: The cache key
+        @return numpy.ndarray: The read-only cached samples or None if not cached
+        """
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._samples.move_to_end(key)
+            return samples
+
+    def put(self, key, samples):
+        """ Stores a copy of the samples and discards the least recently used samples exceeding
+        the memory budget.
+
+        @param tuple key: The cache key
+        @param numpy.ndarray samples: The samples to cache
+        """
+        if samples.nbytes > self._max_bytes:
+            return
+        samples = np.array(samples, copy=True)
+        samples.flags.writeable = False
+        with self._lock:
+            old_samples = self._samples.pop(key, None)
+            if old_samples is not None:
+                self.nbytes -= old_samples.nbytes
+            self._samples[key] = samples
+            self.nbytes += samples.nbytes
+            self._shrink()
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def _shrink(self):
+        while self.nbytes > self._max_bytes:
+            self.nbytes -= self._samples.popitem(last=False)[1].nbytes
+
+
 class SamplingFunctions:
     """
 
     """
     parameters = dict()
+    # Memoized samples of sampling functions. Disabled until a memory budget is set.
+    sample_cache = SampleCache()
+    # Flags indicating if get_samples of a sampling function class accepts an output buffer "out"
+    _out_support = dict()
 
     @classmethod
     def import_sampling_functions(cls, path_list):
@@ -117,8 +203,75 @@ class SamplingFunctions:
                 delattr(cls, func)
 
         cls.parameters = param_dict
+        # Sampling function classes might have changed
+        cls.sample_cache.clear()
+        cls._out_support.clear()
         return
 
+    @classmethod
+    def evaluate(cls, function, time_array, out=None):
+        """ Calls get_samples of a sampling function instance. If the sampling function supports
+        it, the samples are written into the output buffer "out". Otherwise the samples are
+        returned in a new array.
+
+        @param SamplingBase function: The sampling function instance
+        @param numpy.ndarray time_array: The float64 time array to sample
+        @param numpy.ndarray out: optional, float64 output buffer with the length of time_array.
+                                  Must not share memory with time_array.
+
+        @return numpy.ndarray: The samples (either out or a new array)
+        """
+        if out is None:
+            return function.get_samples(time_array)
+        func_class = type(function)
+        if func_class not in cls._out_support:
+            try:
+                parameters = inspect.signature(function.get_samples).parameters
+            except (TypeError, ValueError):
+                parameters = dict()
+            cls._out_support[func_class] = 'out' in parameters
+        if cls._out_support[func_class]:
+            return function.get_samples(time_array, out=out)
+        return function.get_samples(time_array)
+
+    @classmethod
+    def get_samples(cls, function, start_bin, number_of_samples, sample_rate, out=None,
+                    cache=True):
+        """ Returns the samples of a sampling function for a contiguous range of time bins, i.e.
+        for the time array (start_bin + numpy.arange(number_of_samples)) / sample_rate.
+
+        Samples are memoized in sample_cache, keyed by the sampling function type and parameters,
+        the sample rate, the number of samples and the start bin. For time invariant sampling
+        functions the start bin is ignored.
+
+        @param SamplingBase function: The sampling function instance
+        @param int start_bin: The time bin of the first sample
+        @param int number_of_samples: The number of samples
+        @param float sample_rate: The sample rate in Hz
+        @param numpy.ndarray out: optional, float64 output buffer of length number_of_samples
+        @param bool cache: optional, look up and store the samples in the cache (default True)
+
+        @return numpy.ndarray: The samples. Either out, a new array or a read-only array from the
+                               cache. The returned array must not be modified.
+        """
+        cache = cache and cls.sample_cache.max_bytes > 0
+        if cache:
+            key = (type(function),
+                   tuple(getattr(function, param) for param in function.params),
+                   float(sample_rate),
+                   int(number_of_samples),
+                   None if function.time_invariant else int(start_bin))
+            samples = cls.sample_cache.get(key)
+            if samples is not None:
+                return samples
+
+        time_array = np.arange(start_bin, start_bin + number_of_samples, dtype='float64')
+        time_array /= sample_rate
+        samples = cls.evaluate(function, time_array, out)
+        if cache:
+            cls.sample_cache.put(key, samples)
+        return samples
+
     @staticmethod
     def __get_sf_method(sf_ref):
         return lambda *args, **kwargs: sf_ref(*args, **kwargs)
@@ -25,6 +25,13 @@ import os
 import pickle
 import time
 import copy
+import hashlib
+import json
+import shutil
+import queue
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
 
 from qtpy import QtCore
 from collections import OrderedDict
@@ -35,6 +42,7 @@ from core.util.network import netobtain
 from logic.generic_logic import GenericLogic
 from logic.pulsed.pulse_objects import PulseBlock, PulseBlockEnsemble, PulseSequence
 from logic.pulsed.pulse_objects import PulseObjectGenerator, PulseBlockElement
+from logic.pulsed.pulse_asset_store import PulseAssetStore, LazyAssetDict
 from logic.pulsed.sampling_functions import SamplingFunctions
 
 
@@ -64,6 +72,29 @@ class SequenceGeneratorLogic(GenericLogic):
                                        default=os.path.join(get_home_dir(), 'saved_pulsed_assets'),
                                        missing='warn')
     _overhead_bytes = ConfigOption(name='overhead_bytes', default=0, missing='nothing')
+    # Sampling engine to use. 'vectorized' (default) samples PulseBlockElements with equal sampling
+    # functions in bulk, 'elementwise' samples each PulseBlockElement separately.
+    _sampling_engine = ConfigOption(name='sampling_engine', default='vectorized', missing='nothing')
+    # Number of worker threads used to sample analog channels and the PulseBlockEnsembles of
+    # non-rotating frame PulseSequences in parallel. 0 (default) disables parallel sampling.
+    _sampling_workers = ConfigOption(name='sampling_workers', default=0, missing='nothing')
+    # Sample the next chunk in a separate thread while the current chunk is written to the device.
+    # Only applies if the waveform is written in chunks (see overhead_bytes). Up to three chunks are
+    # held in memory at the same time.
+    _pipelined_writing = ConfigOption(name='pipelined_writing', default=False, missing='nothing')
+    # Play repeated PulseBlocks inside the PulseBlockEnsembles of a PulseSequence as looped sequence
+    # steps of a single waveform instead of sampling every repetition.
+    _compile_sequence_loops = ConfigOption(name='compile_sequence_loops',
+                                           default=True,
+                                           missing='nothing')
+    # Maximum disk space in bytes used to cache sampled waveforms in the assets storage directory.
+    # The least recently used waveforms are discarded first. Set to 0 to disable the disk cache.
+    _waveform_cache_bytes = ConfigOption(name='waveform_cache_bytes',
+                                         default=2**31,
+                                         missing='nothing')
+    # Maximum memory in bytes used to memoize the samples of identical PulseBlockElements (outside
+    # the rotating frame). The least recently used samples are discarded first. Set to 0 to disable.
+    _sample_cache_bytes = ConfigOption(name='sample_cache_bytes', default=2**28, missing='nothing')
     # Optional additional paths to import from
     additional_methods_dir = ConfigOption(name='additional_predefined_methods_path',
                                           default=None,
@@ -87,6 +118,10 @@ class SequenceGeneratorLogic(GenericLogic):
                                                             ('wait_time', 1e-6),
                                                             ('analog_trigger_voltage', 0.0)]))
 
+    # Content hashes of the waveforms currently held by the pulse generator device.
+    # Keys are the waveform name tags, values are lists of [<hash>, <list of waveform names>]
+    _device_waveform_hashes = StatusVar(default=dict())
+
     # The created pulse objects (PulseBlock, PulseBlockEnsemble, PulseSequence) are saved in
     # these dictionaries. The keys are the names.
     # _saved_pulse_blocks = StatusVar(default=OrderedDict())
@@ -99,6 +134,8 @@ class SequenceGeneratorLogic(GenericLogic):
     sigSequenceDictUpdated = QtCore.Signal(dict)
     sigSampleEnsembleComplete = QtCore.Signal(object)
     sigSampleSequenceComplete = QtCore.Signal(object)
+    # sequence name, number of completed steps, total number of steps, duration of last step in s
+    sigSampleSequenceProgress = QtCore.Signal(str, int, int, float)
     sigLoadedAssetUpdated = QtCore.Signal(str, str)
     sigGeneratorSettingsUpdated = QtCore.Signal(dict)
     sigSamplingSettingsUpdated = QtCore.Signal(dict)
@@ -122,6 +159,12 @@ class SequenceGeneratorLogic(GenericLogic):
                                'does not exist.'.format(config['additional_methods_dir']))
                 self.additional_methods_dir = None
 
+        if self._sampling_engine not in ('vectorized', 'elementwise'):
+            self.log.error('Unknown sampling_engine "{0}" in config. Valid engines are "vectorized" '
+                           'and "elementwise". Using "vectorized" instead.'
+                           ''.format(self._sampling_engine))
+            self._sampling_engine = 'vectorized'
+
         # current pulse generator settings that are frequently used by this logic.
         # Save them here since reading them from device every time they are used may take some time.
         self.__activation_config = ('', set())  # Activation config name and set of active channels
@@ -137,6 +180,12 @@ class SequenceGeneratorLogic(GenericLogic):
         # A flag indicating if sampling of a sequence is in progress
         self.__sequence_generation_in_progress = False
 
+        # Worker pool for parallel sampling and the samples of PulseBlockEnsembles sampled ahead in
+        # this pool. Keys are the waveform content hashes, values are tuples of
+        # (<future>, <bytes>)
+        self._sampling_pool = None
+        self._prefetched_samples = dict()
+
         # Get instance of PulseObjectGenerator which takes care of collecting all predefined methods
         self._pog = None
 
@@ -145,6 +194,17 @@ class SequenceGeneratorLogic(GenericLogic):
         self._saved_pulse_blocks = OrderedDict()
         self._saved_pulse_block_ensembles = OrderedDict()
         self._saved_pulse_sequences = OrderedDict()
+        # Database holding all serialized pulse objects
+        self._asset_store = None
+
+        # Memorized results of analyze_block_ensemble (keys are tuples of
+        # (<block_list>, <sample_rate>, <laser_channel>)) and element arrays of the analyzed
+        # PulseBlocks (keys are the block names).
+        self._ensemble_analysis_cache = OrderedDict()
+        self._ensemble_analysis_cache_size = 64
+        self._block_analysis_cache = dict()
+        # Minimum time in seconds between saving the sampling progress of a PulseSequence
+        self._progress_save_interval = 5
         return
 
     def on_activate(self):
@@ -152,6 +212,8 @@ class SequenceGeneratorLogic(GenericLogic):
         """
         if not os.path.exists(self._assets_storage_dir):
             os.makedirs(self._assets_storage_dir)
+        if not os.path.exists(self._waveform_cache_dir):
+            os.makedirs(self._waveform_cache_dir)
 
         # Initialize SamplingFunctions class by handing over a list of paths to import
         # sampling functions from.
@@ -159,10 +221,26 @@ class SequenceGeneratorLogic(GenericLogic):
         if isinstance(self._sampling_functions_import_path, str):
             sf_path_list.append(self._sampling_functions_import_path)
         SamplingFunctions.import_sampling_functions(sf_path_list)
+        SamplingFunctions.sample_cache.max_bytes = self._sample_cache_bytes
 
         # Read back settings from device and update instance variables accordingly
         self._read_settings_from_device()
 
+        # Open the pulse object database and import pulse objects from pickle files created by
+        # older versions of qudi (one-time migration)
+        self._asset_store = PulseAssetStore(
+            os.path.join(self._assets_storage_dir, 'pulse_assets.db'))
+        imported, failed = self._asset_store.migrate_pickle_files(
+            self._assets_storage_dir, os.path.join(self._assets_storage_dir, 'migrated_pickle_files'))
+        if imported:
+            self.log.info('Imported {0:d} pulse objects from pickle files into "{1}". The old files '
+                          'have been moved to "{2}".'.format(
+                              len(imported), self._asset_store.path,
+                              os.path.join(self._assets_storage_dir, 'migrated_pickle_files')))
+        if failed:
+            self.log.error('Failed to import the following pulse object files into "{0}":\n{1}'
+                           ''.format(self._asset_store.path, failed))
+
         # Update saved blocks/ensembles/sequences from serialized files
         self._saved_pulse_blocks = OrderedDict()
         self._saved_pulse_block_ensembles = OrderedDict()
@@ -175,11 +253,24 @@ class SequenceGeneratorLogic(GenericLogic):
         self._pog = PulseObjectGenerator(sequencegeneratorlogic=self)
 
         self.__sequence_generation_in_progress = False
+
+        # Create worker pool for parallel sampling
+        if self._sampling_workers > 0:
+            self._sampling_pool = ThreadPoolExecutor(max_workers=int(self._sampling_workers))
+        self._prefetched_samples = dict()
         return
 
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
         """
+        if self._sampling_pool is not None:
+            self._cancel_prefetched_samples()
+            self._sampling_pool.shutdown()
+            self._sampling_pool = None
+        if self._asset_store is not None:
+            self._asset_store.close()
+            self._asset_store = None
+        SamplingFunctions.sample_cache.clear()
         return
 
     # @_saved_pulse_blocks.constructor
@@ -259,6 +350,10 @@ class SequenceGeneratorLogic(GenericLogic):
             self.set_pulse_generator_settings(settings_dict)
         return
 
+    @property
+    def _waveform_cache_dir(self):
+        return os.path.join(self._assets_storage_dir, 'waveform_cache')
+
     @property
     def pulse_generator_constraints(self):
         return self.pulsegenerator().get_constraints()
@@ -418,15 +513,17 @@ class SequenceGeneratorLogic(GenericLogic):
             self.log.error('Can´t clear the pulser as it is running. Switch off the pulser and try again.')
             return -1
         self.pulsegenerator().clear_all()
-        # Delete all sampling information from all PulseBlockEnsembles and PulseSequences
+        self._device_waveform_hashes = dict()
+        # Delete all sampling information from all PulseBlockEnsembles and PulseSequences.
+        # Objects not loaded yet from the database do not need to be loaded for this.
         for seq_name in self.saved_pulse_sequences:
-            seq = self.saved_pulse_sequences[seq_name]
-            seq.sampling_information = dict()
-            self.save_sequence(seq)
+            if self._saved_pulse_sequences.is_loaded(seq_name):
+                self._saved_pulse_sequences[seq_name].sampling_information = dict()
+            self._asset_store.save_sampling_information('sequence', seq_name, dict())
         for ens_name in self.saved_pulse_block_ensembles:
-            ens = self.saved_pulse_block_ensembles[ens_name]
-            ens.sampling_information = dict()
-            self.save_ensemble(ens)
+            if self._saved_pulse_block_ensembles.is_loaded(ens_name):
+                self._saved_pulse_block_ensembles[ens_name].sampling_information = dict()
+            self._asset_store.save_sampling_information('ensemble', ens_name, dict())
         self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
         self.sigAvailableSequencesUpdated.emit(self.sampled_sequences)
         self.sigLoadedAssetUpdated.emit('', '')
@@ -494,7 +591,8 @@ class SequenceGeneratorLogic(GenericLogic):
             return
 
         # Check if the PulseSequence has been sampled already.
-        if sequence.sampling_information and sequence.name in self.sampled_sequences:
+        if 'waveforms' in sequence.sampling_information and \
+                sequence.name in self.sampled_sequences:
             # Check if the corresponding waveforms are present in the pulse generator memory
             ready_waveforms = self.sampled_waveforms
             for waveform in sequence.sampling_information['waveforms']:
@@ -680,6 +778,7 @@ class SequenceGeneratorLogic(GenericLogic):
         @param PulseBlock block: PulseBlock instance to save
         """
         self._saved_pulse_blocks[block.name] = block
+        self._invalidate_analysis_cache(block.name)
         self._save_block_to_file(block)
         self.sigBlockDictUpdated.emit(self._saved_pulse_blocks)
         return
@@ -703,62 +802,54 @@ class SequenceGeneratorLogic(GenericLogic):
         # Delete from dict
         if name in self.saved_pulse_blocks:
             del (self._saved_pulse_blocks[name])
+        self._invalidate_analysis_cache(name)
 
         # Delete from disk
-        filepath = os.path.join(self._assets_storage_dir, '{0}.block'.format(name))
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        self._asset_store.delete('block', name)
 
         self.sigBlockDictUpdated.emit(self.saved_pulse_blocks)
         return
 
     def _load_block_from_file(self, block_name):
         """
-        De-serializes a PulseBlock instance from file.
+        De-serializes a PulseBlock instance from the asset database.
 
         @param str block_name: The name of the PulseBlock instance to de-serialize
         @return PulseBlock: The de-serialized PulseBlock instance
         """
         block = None
-        filepath = os.path.join(self._assets_storage_dir, '{0}.block'.format(block_name))
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, 'rb') as file:
-                    block = pickle.load(file)
-            except pickle.UnpicklingError:
-                self.log.error('Failed to de-serialize PulseBlock "{0}" from file.'
-                               ''.format(block_name))
-                os.remove(filepath)
+        try:
+            block = self._asset_store.load('block', block_name)
+        except (pickle.UnpicklingError, EOFError):
+            self.log.error('Failed to de-serialize PulseBlock "{0}" from file. '
+                           'Moving broken entry to quarantine.'.format(block_name))
+            self._asset_store.quarantine('block', block_name)
+        except (AttributeError, ImportError):
+            # Classes of the pickled object can not be found (e.g. module not available). The
+            # stored data itself is fine, so keep it.
+            self.log.exception('Failed to de-serialize PulseBlock "{0}" from file. Stored data '
+                               'is kept.'.format(block_name))
         return block
 
     def _update_blocks_from_file(self):
         """
-        Update the saved_pulse_blocks dict by de-serializing stored file.
+        Update the saved_pulse_blocks dict from the asset database.
+        The PulseBlock instances are only de-serialized once they are accessed.
         """
-        # Get all files in asset directory ending on ".block" and extract a sorted list of
-        # PulseBlock names
-        with os.scandir(self._assets_storage_dir) as scan:
-            names = natural_sort(f.name[:-6] for f in scan if f.is_file and f.name.endswith('.block'))
-
-        # Load all blocks from file
-        for block_name in names:
-            block = self._load_block_from_file(block_name)
-            if block is not None:
-                self._saved_pulse_blocks[block_name] = block
-
+        names = natural_sort(self._asset_store.names('block'))
+        self._saved_pulse_blocks = LazyAssetDict(loader=self._load_block_from_file, names=names)
+        self._invalidate_analysis_cache()
         self.sigBlockDictUpdated.emit(self._saved_pulse_blocks)
         return
 
     def _save_block_to_file(self, block):
         """
-        Saves a single PulseBlock instance to file by serialization using pickle.
+        Saves a single PulseBlock instance to the asset database by serialization using pickle.
 
         @param PulseBlock block: The PulseBlock instance to be saved
         """
-        filename = '{0}.block'.format(block.name)
         try:
-            with open(os.path.join(self._assets_storage_dir, filename), 'wb') as file:
-                pickle.dump(block, file)
+            self._asset_store.save('block', block)
         except:
             self.log.error('Failed to serialize PulseBlock "{0}" to file.'.format(block.name))
         return
@@ -808,68 +899,60 @@ class SequenceGeneratorLogic(GenericLogic):
             del self._saved_pulse_block_ensembles[name]
 
         # Delete from disk
-        filepath = os.path.join(self._assets_storage_dir, '{0}.ensemble'.format(name))
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        self._asset_store.delete('ensemble', name)
 
         self.sigEnsembleDictUpdated.emit(self.saved_pulse_block_ensembles)
         return
 
     def _load_ensemble_from_file(self, ensemble_name):
         """
-        De-serializes a PulseBlockEnsemble instance from file.
+        De-serializes a PulseBlockEnsemble instance from the asset database.
 
         @param str ensemble_name: The name of the PulseBlockEnsemble instance to de-serialize
         @return PulseBlockEnsemble: The de-serialized PulseBlockEnsemble instance
         """
         ensemble = None
-        filepath = os.path.join(self._assets_storage_dir, '{0}.ensemble'.format(ensemble_name))
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, 'rb') as file:
-                    ensemble = pickle.load(file)
-            except pickle.UnpicklingError:
-                self.log.error('Failed to de-serialize PulseBlockEnsemble "{0}" from file. '
-                               'Deleting broken file.'.format(ensemble_name))
-                os.remove(filepath)
+        try:
+            ensemble = self._asset_store.load('ensemble', ensemble_name)
+        except (pickle.UnpicklingError, EOFError):
+            self.log.error('Failed to de-serialize PulseBlockEnsemble "{0}" from file. '
+                           'Moving broken entry to quarantine.'.format(ensemble_name))
+            self._asset_store.quarantine('ensemble', ensemble_name)
+        except (AttributeError, ImportError):
+            # Classes of the pickled object can not be found (e.g. module not available). The
+            # stored data itself is fine, so keep it.
+            self.log.exception('Failed to de-serialize PulseBlockEnsemble "{0}" from file. '
+                               'Stored data is kept.'.format(ensemble_name))
         return ensemble
 
     def _update_ensembles_from_file(self):
         """
-        Update the saved_pulse_block_ensembles dict from temporary file.
+        Update the saved_pulse_block_ensembles dict from the asset database.
+        The PulseBlockEnsemble instances are only de-serialized once they are accessed.
         """
-        # Get all files in asset directory ending on ".ensemble" and extract a sorted list of
-        # PulseBlockEnsemble names
-        with os.scandir(self._assets_storage_dir) as scan:
-            names = natural_sort(f.name[:-9] for f in scan if f.is_file and f.name.endswith('.ensemble'))
+        names = natural_sort(self._asset_store.names('ensemble'))
 
         # Get all waveforms currently stored on pulser hardware in order to delete outdated
         # sampling_information dicts
         sampled_waveforms = set(self.sampled_waveforms)
+        for ensemble_name, info in self._asset_store.load_sampling_information('ensemble').items():
+            if info.get('waveforms') and not sampled_waveforms.issuperset(info['waveforms']):
+                self._asset_store.save_sampling_information('ensemble', ensemble_name, dict())
 
-        # Load all ensembles from file
-        for ensemble_name in names:
-            ensemble = self._load_ensemble_from_file(ensemble_name)
-            if ensemble is not None:
-                if ensemble.sampling_information.get('waveforms'):
-                    waveform_set = set(ensemble.sampling_information['waveforms'])
-                    if not sampled_waveforms.issuperset(waveform_set):
-                        ensemble.sampling_information = dict()
-                self._saved_pulse_block_ensembles[ensemble_name] = ensemble
-
+        self._saved_pulse_block_ensembles = LazyAssetDict(loader=self._load_ensemble_from_file,
+                                                          names=names)
         self.sigEnsembleDictUpdated.emit(self.saved_pulse_block_ensembles)
         return
 
     def _save_ensemble_to_file(self, ensemble):
         """
-        Saves a single PulseBlockEnsemble instance to file by serialization using pickle.
+        Saves a single PulseBlockEnsemble instance to the asset database by serialization using
+        pickle.
 
         @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to be saved
         """
-        filename = '{0}.ensemble'.format(ensemble.name)
         try:
-            with open(os.path.join(self._assets_storage_dir, filename), 'wb') as file:
-                pickle.dump(ensemble, file)
+            self._asset_store.save('ensemble', ensemble)
         except:
             self.log.error('Failed to serialize PulseBlockEnsemble "{0}" to file.'
                            ''.format(ensemble.name))
@@ -915,44 +998,52 @@ class SequenceGeneratorLogic(GenericLogic):
         if name in self.saved_pulse_sequences:
             # check if sequence has already been sampled and delete associated sequence from pulser.
             # Also delete associated waveforms if sequence has been sampled within rotating frame.
-            if self.saved_pulse_sequences[name].sampling_information:
+            # Waveforms of an interrupted sampling run are listed in the sampling progress.
+            sampling_information = self.saved_pulse_sequences[name].sampling_information
+            if sampling_information:
                 self._delete_sequence(name)
                 if self.saved_pulse_sequences[name].rotating_frame:
-                    self._delete_waveform(
-                        self.saved_pulse_sequences[name].sampling_information['waveforms'])
+                    if 'waveforms' in sampling_information:
+                        waveforms = sampling_information['waveforms']
+                    else:
+                        waveforms = sampling_information['sampling_progress']['written_waveforms']
+                    self._delete_waveform(list(waveforms))
                     self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
             # delete PulseSequence
             del self._saved_pulse_sequences[name]
 
         # Delete from disk
-        filepath = os.path.join(self._assets_storage_dir, '{0}.sequence'.format(name))
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        self._asset_store.delete('sequence', name)
 
         self.sigSequenceDictUpdated.emit(self.saved_pulse_sequences)
         return
 
     def _load_sequence_from_file(self, sequence_name):
         """
-        De-serializes a PulseSequence instance from file.
+        De-serializes a PulseSequence instance from the asset database.
 
         @param str sequence_name: The name of the PulseSequence instance to de-serialize
         @return PulseSequence: The de-serialized PulseSequence instance
         """
-        filepath = os.path.join(self._assets_storage_dir, '{0}.sequence'.format(sequence_name))
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, 'rb') as file:
-                    sequence = pickle.load(file)
-                # FIXME: Due to the pickling the dict namespace merging gets lost on the way.
-                # Restored it here but a better way needs to be found.
-                for step in range(len(sequence)):
-                    sequence[step].__dict__ = sequence[step]
-            except pickle.UnpicklingError:
-                self.log.error('Failed to de-serialize PulseSequence "{0}" from file.'
-                               ''.format(sequence_name))
-                os.remove(filepath)
+        try:
+            sequence = self._asset_store.load('sequence', sequence_name)
+            if sequence is None:
                 return None
+            # FIXME: Due to the pickling the dict namespace merging gets lost on the way.
+            # Restored it here but a better way needs to be found.
+            for step in range(len(sequence)):
+                sequence[step].__dict__ = sequence[step]
+        except (pickle.UnpicklingError, EOFError):
+            self.log.error('Failed to de-serialize PulseSequence "{0}" from file. '
+                           'Moving broken entry to quarantine.'.format(sequence_name))
+            self._asset_store.quarantine('sequence', sequence_name)
+            return None
+        except (AttributeError, ImportError):
+            # Classes of the pickled object can not be found (e.g. module not available). The
+            # stored data itself is fine, so keep it.
+            self.log.exception('Failed to de-serialize PulseSequence "{0}" from file. Stored data '
+                               'is kept.'.format(sequence_name))
+            return None
 
         # Conversion for backwards compatibility
         if len(sequence) > 0 and not isinstance(sequence[0].flag_high, list):
@@ -975,7 +1066,7 @@ class SequenceGeneratorLogic(GenericLogic):
                     self.log.error('Failed to de-serialize PulseSequence "{0}" from file.'
                                    '"flag_high" step parameter is of unknown type'
                                    ''.format(sequence_name))
-                    os.remove(filepath)
+                    self._asset_store.delete('sequence', sequence_name)
                     return None
 
                 # Try to convert "flag_trigger" step parameter
@@ -991,50 +1082,41 @@ class SequenceGeneratorLogic(GenericLogic):
                     self.log.error('Failed to de-serialize PulseSequence "{0}" from file.'
                                    '"flag_trigger" step parameter is of unknown type'
                                    ''.format(sequence_name))
-                    os.remove(filepath)
+                    self._asset_store.delete('sequence', sequence_name)
                     return None
             self._save_sequence_to_file(sequence)
         return sequence
 
     def _update_sequences_from_file(self):
         """
-        Update the saved_pulse_sequences dict from files.
+        Update the saved_pulse_sequences dict from the asset database.
+        The PulseSequence instances are only de-serialized once they are accessed.
         """
-        # Get all files in asset directory ending on ".sequence" and extract a sorted list of
-        # PulseSequence names
-        with os.scandir(self._assets_storage_dir) as scan:
-            names = natural_sort(f.name[:-9] for f in scan if f.is_file and f.name.endswith('.sequence'))
+        names = natural_sort(self._asset_store.names('sequence'))
 
         # Get all waveforms and sequences currently stored on pulser hardware in order to delete
-        # outdated sampling_information dicts
+        # outdated sampling_information dicts. The progress of interrupted sampling runs is kept
+        # and validated once the sampling is resumed.
         sampled_waveforms = set(self.sampled_waveforms)
         sampled_sequences = set(self.sampled_sequences)
+        for sequence_name, info in self._asset_store.load_sampling_information('sequence').items():
+            if 'waveforms' in info and (sequence_name not in sampled_sequences or
+                                        not sampled_waveforms.issuperset(info['waveforms'])):
+                self._asset_store.save_sampling_information('sequence', sequence_name, dict())
 
-        # Load all sequences from file
-        for sequence_name in names:
-            sequence = self._load_sequence_from_file(sequence_name)
-            if sequence is not None:
-                if sequence.name not in sampled_sequences:
-                    sequence.sampling_information = dict()
-                elif sequence.sampling_information:
-                    waveform_set = set(sequence.sampling_information['waveforms'])
-                    if not sampled_waveforms.issuperset(waveform_set):
-                        sequence.sampling_information = dict()
-                self._saved_pulse_sequences[sequence_name] = sequence
-
+        self._saved_pulse_sequences = LazyAssetDict(loader=self._load_sequence_from_file,
+                                                    names=names)
         self.sigSequenceDictUpdated.emit(self.saved_pulse_sequences)
         return
 
     def _save_sequence_to_file(self, sequence):
         """
-        Saves a single PulseSequence instance to file by serialization using pickle.
+        Saves a single PulseSequence instance to the asset database by serialization using pickle.
 
         @param PulseSequence sequence: The PulseSequence instance to be saved
         """
-        filename = '{0}.sequence'.format(sequence.name)
         try:
-            with open(os.path.join(self._assets_storage_dir, filename), 'wb') as file:
-                pickle.dump(sequence, file)
+            self._asset_store.save('sequence', sequence)
         except:
             self.log.error('Failed to serialize PulseSequence "{0}" to file.'.format(sequence.name))
         return
@@ -1047,6 +1129,34 @@ class SequenceGeneratorLogic(GenericLogic):
             self._save_sequence_to_file(sequence)
         return
 
+    def _save_sampling_information(self, asset):
+        """ Saves the sampling_information of a PulseBlockEnsemble or PulseSequence instance.
+        If the instance is the one contained in the saved ensembles/sequences, only the
+        sampling_information is written to the asset database instead of the entire object.
+        Otherwise the instance is saved as a whole.
+
+        @param PulseBlockEnsemble|PulseSequence asset: The instance to save
+        """
+        if isinstance(asset, PulseBlockEnsemble):
+            saved_assets = self._saved_pulse_block_ensembles
+            asset_type = 'ensemble'
+        else:
+            saved_assets = self._saved_pulse_sequences
+            asset_type = 'sequence'
+
+        if saved_assets.is_loaded(asset.name) and saved_assets[asset.name] is asset:
+            try:
+                self._asset_store.save_sampling_information(asset_type, asset.name,
+                                                             asset.sampling_information)
+            except:
+                self.log.error('Failed to save sampling information of "{0}" to file.'
+                               ''.format(asset.name))
+        elif asset_type == 'ensemble':
+            self.save_ensemble(asset)
+        else:
+            self.save_sequence(asset)
+        return
+
     def generate_predefined_sequence(self, predefined_sequence_name, kwargs_dict):
         """
 
@@ -1184,94 +1294,79 @@ class SequenceGeneratorLogic(GenericLogic):
         laser_channel = self.generation_parameters['gate_channel'] if self.generation_parameters[
             'gate_channel'] else self.generation_parameters['laser_channel']
 
-        # memorize the digital channel state of the previous element
-        tmp_digital_high = dict()
-        # memorize the laser_on flag of the previous element (in case of non-digital laser channel)
-        tmp_laser_on = False
+        # Return a copy of the memorized analysis if this ensemble has been analyzed before with
+        # the same sample rate and laser channel.
+        cache_key = (tuple((block_name, reps) for block_name, reps in ensemble),
+                     self.__sample_rate,
+                     laser_channel)
+        if cache_key in self._ensemble_analysis_cache:
+            self._ensemble_analysis_cache.move_to_end(cache_key)
+            return_dict = copy.deepcopy(self._ensemble_analysis_cache[cache_key])
+            return_dict['generation_parameters'] = self.generation_parameters.copy()
+            return return_dict
+
         # Set of used analog and digital channels
         digital_channels = set()
         analog_channels = set()
-        # check for active channels and initialize tmp_digital_high/tmp_laser_on with the state of
-        # the very last element in the ensemble
         if len(ensemble) > 0:
             block = self.get_block(ensemble[0][0])
             digital_channels = block.digital_channels
             analog_channels = block.analog_channels
-            block = self.get_block(ensemble[-1][0])
-            if len(block) > 0:
-                tmp_digital_high = block[-1].digital_high.copy()
-                tmp_laser_on = block[-1].laser_on
-            else:
-                tmp_digital_high = {chnl: False for chnl in digital_channels}
-                tmp_laser_on = False
+        digital_channel_list = sorted(digital_channels)
 
-        # dicts containing the bins where the digital channels are rising/falling
-        digital_rising_bins = {chnl: list() for chnl in digital_channels}
-        digital_falling_bins = {chnl: list() for chnl in digital_channels}
-        laser_rising_bins = list()
-        laser_falling_bins = list()
-
-        # Array to store the length in bins for all elements including repetitions in the order
-        # they are occuring in the waveform later on.
-        elements_length_bins = list()
-
-        # variables to keep track of the current timeframe
-        current_end_time = 0.0
-        current_start_bin = 0
-
-        # Loop through all blocks in the ensemble
+        # Collect the element lengths (in seconds) and channel states of all elements including
+        # repetitions in the order they are occuring in the waveform later on.
+        element_lengths = list()
+        element_digital_high = list()
+        element_laser_on = list()
         for block_name, reps in ensemble:
-            # Get the stored PulseBlock instance
-            block = self.get_block(block_name)
-
-            # Iterate over all repetitions of the current block
-            for rep_no in range(reps + 1):
-                # Iterate over the Block_Elements inside the current block
-                for element in block:
-                    # save bin position if a transition from low to high or vice versa has occurred
-                    # in a digital channel
-                    if tmp_digital_high != element.digital_high:
-                        for chnl, state in element.digital_high.items():
-                            if not tmp_digital_high[chnl] and state:
-                                digital_rising_bins[chnl].append(current_start_bin)
-                            elif tmp_digital_high[chnl] and not state:
-                                digital_falling_bins[chnl].append(current_start_bin)
-                        tmp_digital_high = element.digital_high.copy()
-
-                    if not laser_channel.startswith('d') and tmp_laser_on != element.laser_on:
-                        if not tmp_laser_on and element.laser_on:
-                            laser_rising_bins.append(current_start_bin)
-                        else:
-                            laser_falling_bins.append(current_start_bin)
-                        tmp_laser_on = element.laser_on
-
-                    # Calculate length of the current element with current repetition count in sec
-                    # and add this to the ideal end time for the sequence up until this point.
-                    current_end_time += element.init_length_s + rep_no * element.increment_s
-
-                    # Nearest possible match including the discretization in bins
-                    current_end_bin = int(np.rint(current_end_time * self.__sample_rate))
-
-                    # append current element length in discrete bins to temporary array
-                    elements_length_bins.append(current_end_bin - current_start_bin)
-
-                    # advance bin offset for next element
-                    current_start_bin = current_end_bin
-
-        elements_length_bins = np.array(elements_length_bins, dtype='int64')
-
-        # convert rising/falling indices to numpy.ndarrays. Remove duplicates.
-        for chnl in digital_channels:
-            digital_rising_bins[chnl] = sorted(set(digital_rising_bins[chnl]))
-            digital_falling_bins[chnl] = sorted(set(digital_falling_bins[chnl]))
-            digital_rising_bins[chnl] = np.array(digital_rising_bins[chnl], dtype='int64')
-            digital_falling_bins[chnl] = np.array(digital_falling_bins[chnl], dtype='int64')
+            block_arrays = self._get_block_analysis_arrays(block_name, digital_channel_list)
+            if block_arrays['init_length_s'].size == 0:
+                continue
+            # Length of each element for each repetition of the block
+            rep_no = np.arange(reps + 1)
+            element_lengths.append(
+                (block_arrays['init_length_s'] + rep_no[:, None] * block_arrays['increment_s']
+                 ).ravel())
+            element_digital_high.append(np.tile(block_arrays['digital_high'], (reps + 1, 1)))
+            element_laser_on.append(np.tile(block_arrays['laser_on'], reps + 1))
+
+        if element_lengths:
+            element_lengths = np.concatenate(element_lengths)
+            element_digital_high = np.concatenate(element_digital_high)
+            element_laser_on = np.concatenate(element_laser_on)
+        else:
+            element_lengths = np.empty(0, dtype='float64')
+            element_digital_high = np.empty((0, len(digital_channel_list)), dtype=bool)
+            element_laser_on = np.empty(0, dtype=bool)
+
+        # Ideal end time of each element. The cumulative sum is calculated sequentially, i.e. with
+        # exactly the same floating point rounding as adding up the element lengths one by one.
+        end_times = np.cumsum(element_lengths)
+        # Nearest possible match including the discretization in bins
+        end_bins = np.rint(end_times * self.__sample_rate).astype('int64')
+        start_bins = np.concatenate((np.zeros(1, dtype='int64'), end_bins[:-1]))
+        elements_length_bins = end_bins - start_bins
+
+        # Channel transitions occur at the start bin of an element whose state differs from the
+        # previous element. The state before the very first element is the state of the very last
+        # element in the ensemble (or low if the last block is empty).
+        last_block_empty = len(ensemble) > 0 and len(self.get_block(ensemble[-1][0])) == 0
+        digital_rising_bins = dict()
+        digital_falling_bins = dict()
+        for index, chnl in enumerate(digital_channel_list):
+            states = element_digital_high[:, index]
+            initial_state = False if last_block_empty or states.size == 0 else states[-1]
+            digital_rising_bins[chnl], digital_falling_bins[chnl] = self._get_transition_bins(
+                states, start_bins, initial_state)
         if laser_channel.startswith('d'):
-            laser_rising_bins = digital_rising_bins[laser_channel]
-            laser_falling_bins = digital_falling_bins[laser_channel]
+            laser_rising_bins = digital_rising_bins.get(laser_channel, np.empty(0, dtype='int64'))
+            laser_falling_bins = digital_falling_bins.get(laser_channel, np.empty(0, dtype='int64'))
         else:
-            laser_rising_bins = np.array(sorted(set(laser_rising_bins)), dtype='int64')
-            laser_falling_bins = np.array(sorted(set(laser_falling_bins)), dtype='int64')
+            initial_state = False if last_block_empty or element_laser_on.size == 0 else \
+                element_laser_on[-1]
+            laser_rising_bins, laser_falling_bins = self._get_transition_bins(
+                element_laser_on, start_bins, initial_state)
 
         return_dict = dict()
         return_dict['number_of_samples'] = np.sum(elements_length_bins)
@@ -1283,11 +1378,79 @@ class SequenceGeneratorLogic(GenericLogic):
         return_dict['digital_channels'] = digital_channels
         return_dict['channel_set'] = analog_channels.union(digital_channels)
         return_dict['generation_parameters'] = self.generation_parameters.copy()
-        return_dict['ideal_length'] = current_end_time
+        return_dict['ideal_length'] = float(end_times[-1]) if end_times.size > 0 else 0.0
         return_dict['laser_rising_bins'] = laser_rising_bins
         return_dict['laser_falling_bins'] = laser_falling_bins
+
+        # Memorize the analysis. Only a limited number of ensembles is kept.
+        self._ensemble_analysis_cache[cache_key] = copy.deepcopy(return_dict)
+        while len(self._ensemble_analysis_cache) > self._ensemble_analysis_cache_size:
+            self._ensemble_analysis_cache.popitem(last=False)
         return return_dict
 
+    def _get_block_analysis_arrays(self, block_name, digital_channel_list):
+        """ Helper method returning the element lengths and channel states of a single PulseBlock
+        as numpy arrays. The arrays are memorized per PulseBlock and reused until the block is
+        saved again or deleted.
+
+        @param str block_name: The name of the PulseBlock
+        @param list digital_channel_list: Ordered list of the digital channels to return the states
+                                          for (columns of the 'digital_high' array)
+
+        @return dict: Arrays 'init_length_s', 'increment_s' (1D, float64), 'digital_high'
+                      (2D, bool, one column per digital channel) and 'laser_on' (1D, bool)
+        """
+        block = self.get_block(block_name)
+        block_arrays = self._block_analysis_cache.get(block_name)
+        if block_arrays is None or block_arrays['block'] is not block or \
+                block_arrays['digital_channel_list'] != digital_channel_list:
+            block_arrays = dict()
+            block_arrays['block'] = block
+            block_arrays['digital_channel_list'] = digital_channel_list
+            block_arrays['init_length_s'] = np.array(
+                [element.init_length_s for element in block], dtype='float64')
+            block_arrays['increment_s'] = np.array(
+                [element.increment_s for element in block], dtype='float64')
+            block_arrays['digital_high'] = np.array(
+                [[element.digital_high[chnl] for chnl in digital_channel_list] for element in block],
+                dtype=bool).reshape((len(block), len(digital_channel_list)))
+            block_arrays['laser_on'] = np.array([element.laser_on for element in block], dtype=bool)
+            self._block_analysis_cache[block_name] = block_arrays
+        return block_arrays
+
+    @staticmethod
+    def _get_transition_bins(states, start_bins, initial_state):
+        """ Helper method to determine the bins of low-to-high and high-to-low transitions of a
+        single channel.
+
+        @param numpy.ndarray states: 1D bool array with the channel state of each element
+        @param numpy.ndarray start_bins: 1D int64 array with the start bin of each element
+        @param bool initial_state: The channel state before the first element
+
+        @return (numpy.ndarray, numpy.ndarray): Sorted unique rising and falling bins (int64)
+        """
+        if states.size == 0:
+            return np.empty(0, dtype='int64'), np.empty(0, dtype='int64')
+        previous_states = np.empty_like(states)
+        previous_states[0] = initial_state
+        previous_states[1:] = states[:-1]
+        rising_bins = np.unique(start_bins[states & ~previous_states])
+        falling_bins = np.unique(start_bins[~states & previous_states])
+        return rising_bins, falling_bins
+
+    def _invalidate_analysis_cache(self, block_name=None):
+        """ Discards memorized ensemble analysis results. Needs to be called whenever a PulseBlock
+        changes.
+
+        @param str block_name: optional, name of the changed PulseBlock. Discard all if None.
+        """
+        self._ensemble_analysis_cache.clear()
+        if block_name is None:
+            self._block_analysis_cache.clear()
+        else:
+            self._block_analysis_cache.pop(block_name, None)
+        return
+
     def analyze_sequence(self, sequence):
         """
         This helper method runs through each step of a PulseSequence object and extracts
@@ -1573,9 +1736,12 @@ class SequenceGeneratorLogic(GenericLogic):
 
         This method is creating the actual samples (voltages and logic states) for each time step
         of the analog and digital channels specified in the PulseBlockEnsemble.
-        Therefore it iterates through all blocks, repetitions and elements of the ensemble and
-        calculates the exact voltages (float64) according to the specified math_function. The
-        samples are later on stored inside a float32 array.
+        Therefore it calculates the exact voltages (float64) for all blocks, repetitions and
+        elements of the ensemble according to the specified math_function. The samples are later
+        on stored inside a float32 array.
+        Depending on the ConfigOption "sampling_engine" all elements using the same sampling
+        function are sampled in bulk ("vectorized", default) or each element is sampled on its own
+        ("elementwise"). Both engines produce identical samples.
         So each element is calculated with high precision (float64) and then down-converted to
         float32 to be stored.
 
@@ -1616,9 +1782,6 @@ class SequenceGeneratorLogic(GenericLogic):
         # Set the waveform name (excluding the device specific channel naming suffix, i.e. '_ch1')
         waveform_name = name_tag if name_tag else ensemble.name
 
-        # check for old waveforms associated with the ensemble and delete them from pulse generator.
-        self._delete_waveform_by_nametag(waveform_name)
-
         # Take current time
         start_time = time.time()
 
@@ -1664,6 +1827,80 @@ class SequenceGeneratorLogic(GenericLogic):
                 self.log.warn('Extending waveform {0} by {2} bins. New length {1}.'.format(
                     ensemble.name, ensemble_info['number_of_samples'], extension_samples))
 
+        # Skip sampling and writing if the pulse generator already holds the identical waveforms
+        waveform_hash = self._get_waveform_hash(ensemble, ensemble_info, offset_bin)
+        written_waveforms = self._get_device_waveforms_by_hash(waveform_name, waveform_hash)
+        if written_waveforms:
+            self.log.debug('Waveforms for "{0}" already present on device. Sampling skipped.'
+                           ''.format(waveform_name))
+        else:
+            # check for old waveforms associated with the ensemble and delete them from pulse
+            # generator.
+            self._delete_waveform_by_nametag(waveform_name)
+            written_waveforms = self._write_ensemble_samples(ensemble=ensemble,
+                                                             ensemble_info=ensemble_info,
+                                                             waveform_name=waveform_name,
+                                                             waveform_hash=waveform_hash,
+                                                             offset_bin=offset_bin)
+            if written_waveforms is None:
+                if not self.__sequence_generation_in_progress:
+                    self.module_state.unlock()
+                self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
+                self.sigSampleEnsembleComplete.emit(None)
+                return -1, list(), dict()
+            self._device_waveform_hashes[waveform_name] = [waveform_hash,
+                                                           natural_sort(written_waveforms)]
+
+        # if the rotating frame should be preserved (default) increment the offset counter for the
+        # time array of subsequent ensembles.
+        if ensemble.rotating_frame:
+            offset_bin += ensemble_info['number_of_samples']
+
+        # Save sampling related parameters to the sampling_information container within the
+        # PulseBlockEnsemble.
+        # This step is only performed if the resulting waveforms are named by the PulseBlockEnsemble
+        # and not by a sequence nametag
+        if waveform_name == ensemble.name:
+            ensemble.sampling_information = dict()
+            ensemble.sampling_information.update(ensemble_info)
+            ensemble.sampling_information['pulse_generator_settings'] = self.pulse_generator_settings
+            ensemble.sampling_information['waveforms'] = natural_sort(written_waveforms)
+            self._save_sampling_information(ensemble)
+
+        self.log.info('Time needed for sampling and writing PulseBlockEnsemble {0} to device: {1} sec'
+                      ''.format(ensemble.name, int(np.rint(time.time() - start_time))))
+        if ensemble_info['number_of_samples'] == 0:
+            self.log.warning('Empty waveform (0 samples) created from PulseBlockEnsemble "{0}".'
+                             ''.format(ensemble.name))
+        if not self.__sequence_generation_in_progress:
+            self.module_state.unlock()
+        self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
+        self.sigSampleEnsembleComplete.emit(ensemble)
+        return offset_bin, natural_sort(written_waveforms), ensemble_info
+
+    def _write_ensemble_samples(self, ensemble, ensemble_info, waveform_name, waveform_hash,
+                                offset_bin):
+        """ Samples a PulseBlockEnsemble chunk by chunk and writes the samples to the pulse
+        generator. If the waveform has already been sampled ahead in the worker pool or can be
+        found in the on-disk waveform cache, these samples are used instead of sampling again.
+        Newly sampled waveforms are added to the cache.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble to sample
+        @param dict ensemble_info: The information dict returned by analyze_block_ensemble
+        @param str waveform_name: The waveform name tag to write to the device
+        @param str waveform_hash: The content hash of the waveform (see _get_waveform_hash)
+        @param int offset_bin: The time bin offset of the first sample
+
+        @return set: The set of written waveform names on the device. None if unsuccessful.
+        """
+        number_of_samples = ensemble_info['number_of_samples']
+
+        # Purely digital waveforms are passed run-length encoded if supported by the device
+        if self._use_digital_run_lengths(ensemble_info):
+            return self._write_ensemble_run_lengths(ensemble=ensemble,
+                                                    ensemble_info=ensemble_info,
+                                                    waveform_name=waveform_name)
+
         # Calculate the byte size per sample.
         # One analog sample per channel is 4 bytes (np.float32) and one digital sample per channel
         # is 1 byte (np.bool).
@@ -1671,40 +1908,558 @@ class SequenceGeneratorLogic(GenericLogic):
             ensemble_info['digital_channels'])
 
         # Calculate the bytes estimate for the entire ensemble
-        bytes_per_ensemble = bytes_per_sample * ensemble_info['number_of_samples']
+        bytes_per_ensemble = bytes_per_sample * number_of_samples
 
         # Determine the size of the sample arrays to be written as a whole.
         if bytes_per_ensemble <= self._overhead_bytes or self._overhead_bytes == 0:
-            array_length = ensemble_info['number_of_samples']
+            array_length = number_of_samples
         else:
             array_length = self._overhead_bytes // bytes_per_sample
 
+        # Samples of the entire waveform already sampled ahead in the worker pool
+        prefetched_samples = self._pop_prefetched_samples(waveform_hash)
+
         # Allocate the sample arrays that are used for a single write command
         analog_samples = dict()
         digital_samples = dict()
         try:
-            for chnl in ensemble_info['analog_channels']:
-                analog_samples[chnl] = np.empty(array_length, dtype='float32')
-            for chnl in ensemble_info['digital_channels']:
-                digital_samples[chnl] = np.empty(array_length, dtype=bool)
+            if prefetched_samples is None:
+                for chnl in ensemble_info['analog_channels']:
+                    analog_samples[chnl] = np.empty(array_length, dtype='float32')
+                for chnl in ensemble_info['digital_channels']:
+                    digital_samples[chnl] = np.empty(array_length, dtype=bool)
         except MemoryError:
             self.log.error('Sampling of PulseBlockEnsemble "{0}" failed due to a MemoryError.\n'
                            'The sample array needed is too large to allocate in memory.\n'
                            'Try using the overhead_bytes ConfigOption to limit memory usage.'
                            ''.format(ensemble.name))
-            if not self.__sequence_generation_in_progress:
-                self.module_state.unlock()
-            self.sigSampleEnsembleComplete.emit(None)
-            return -1, list(), dict()
+            return None
+
+        # Allocate two additional sets of sample arrays if the next chunk should be sampled while
+        # the current one is written to the device.
+        spare_samples = list()
+        if self._pipelined_writing and prefetched_samples is None and \
+                array_length < number_of_samples:
+            try:
+                for i in range(2):
+                    spare_samples.append(
+                        ({chnl: np.empty(array_length, dtype='float32') for chnl in analog_samples},
+                         {chnl: np.empty(array_length, dtype=bool) for chnl in digital_samples}))
+            except MemoryError:
+                self.log.warning('Unable to allocate sample arrays for pipelined writing of '
+                                 'PulseBlockEnsemble "{0}" due to a MemoryError. Sampling and '
+                                 'writing sequentially instead.'.format(ensemble.name))
+                spare_samples = list()
+
+        # Generator filling the sample arrays chunk by chunk. Read the samples from the waveform
+        # cache if possible.
+        cache_path = os.path.join(self._waveform_cache_dir, waveform_hash)
+        cache_arrays = None
+        if prefetched_samples is not None:
+            self.log.debug('Using samples for "{0}" sampled in worker pool.'.format(waveform_name))
+            if 0 < bytes_per_ensemble <= self._waveform_cache_bytes:
+                cache_arrays = self._create_cache_arrays(cache_path + '.tmp', ensemble_info)
+            sample_chunks = self._split_sample_chunks(analog_samples=prefetched_samples[0],
+                                                      digital_samples=prefetched_samples[1],
+                                                      number_of_samples=number_of_samples,
+                                                      array_length=array_length)
+        elif number_of_samples > 0 and os.path.isdir(cache_path):
+            self.log.debug('Reading samples for "{0}" from waveform cache.'.format(waveform_name))
+            # Update the access time of the cache entry
+            os.utime(cache_path)
+            sample_chunks = self._load_chunks_from_cache(cache_path=cache_path,
+                                                         ensemble_info=ensemble_info,
+                                                         array_length=array_length,
+                                                         analog_samples=analog_samples,
+                                                         digital_samples=digital_samples,
+                                                         spare_samples=spare_samples)
+        else:
+            if 0 < bytes_per_ensemble <= self._waveform_cache_bytes:
+                cache_arrays = self._create_cache_arrays(cache_path + '.tmp', ensemble_info)
+            if self._sampling_engine == 'elementwise':
+                sample_chunks = self._sample_chunks_elementwise(ensemble=ensemble,
+                                                                ensemble_info=ensemble_info,
+                                                                array_length=array_length,
+                                                                offset_bin=offset_bin,
+                                                                analog_samples=analog_samples,
+                                                                digital_samples=digital_samples,
+                                                                spare_samples=spare_samples)
+            else:
+                sample_chunks = self._sample_chunks_vectorized(ensemble=ensemble,
+                                                               ensemble_info=ensemble_info,
+                                                               array_length=array_length,
+                                                               offset_bin=offset_bin,
+                                                               analog_samples=analog_samples,
+                                                               digital_samples=digital_samples,
+                                                               spare_samples=spare_samples,
+                                                               parallel=True)
+
+        # Sample in a separate thread while writing to the device in this thread
+        if spare_samples:
+            sample_chunks = self._pipeline_chunks(sample_chunks, buffers=len(spare_samples) + 1)
+
+        # integer to keep track of the sampls already processed
+        processed_samples = 0
+        # set of written waveform names on the device
+        written_waveforms = set()
+        # Write each sampled chunk to the device
+        for chunk_length, analog_chunk, digital_chunk in sample_chunks:
+            processed_samples += chunk_length
+            # Set first/last chunk flags
+            is_first_chunk = chunk_length == processed_samples
+            is_last_chunk = processed_samples == number_of_samples
+            written_samples, wfm_list = self.pulsegenerator().write_waveform(
+                name=waveform_name,
+                analog_samples=analog_chunk,
+                digital_samples=digital_chunk,
+                is_first_chunk=is_first_chunk,
+                is_last_chunk=is_last_chunk,
+                total_number_of_samples=number_of_samples)
+
+            # Update written waveforms set
+            written_waveforms.update(wfm_list)
+
+            # check if write process was successful
+            if written_samples != chunk_length:
+                self.log.error('Sampling of ensemble "{0}" failed. Write to device was '
+                               'unsuccessful.\nThe number of actually written samples ({1:d}) '
+                               'does not match the number of samples staged to write ({2:d}).'
+                               ''.format(ensemble.name, written_samples, chunk_length))
+                sample_chunks.close()
+                if cache_arrays is not None:
+                    del cache_arrays
+                    shutil.rmtree(cache_path + '.tmp', ignore_errors=True)
+                return None
+
+            # Store the chunk in the waveform cache
+            if cache_arrays is not None:
+                chunk_start = processed_samples - chunk_length
+                for chnl, samples in analog_chunk.items():
+                    cache_arrays[chnl][chunk_start:processed_samples] = samples
+                for chnl, samples in digital_chunk.items():
+                    cache_arrays[chnl][chunk_start:processed_samples] = samples
+
+        # Finalize the new waveform cache entry and discard old entries if the cache is full
+        if cache_arrays is not None:
+            for samples in cache_arrays.values():
+                samples.flush()
+            del cache_arrays
+            try:
+                os.rename(cache_path + '.tmp', cache_path)
+            except OSError:
+                shutil.rmtree(cache_path + '.tmp', ignore_errors=True)
+            self._trim_waveform_cache()
+        return written_waveforms
+
+    def _use_digital_run_lengths(self, ensemble_info):
+        """ Helper method to check if a waveform can be written to the pulse generator with
+        run-length encoded digital channels instead of sampling them (see
+        PulserInterface.write_waveform).
+
+        @param dict ensemble_info: The information dict returned by analyze_block_ensemble
+
+        @return bool: True if the run-length encoded digital channels should be written
+        """
+        return ensemble_info['number_of_samples'] > 0 and \
+               not ensemble_info['analog_channels'] and \
+               len(ensemble_info['digital_channels']) > 0 and \
+               getattr(self.pulse_generator_constraints, 'digital_run_lengths', False)
+
+    def _get_digital_run_lengths(self, ensemble, ensemble_info):
+        """ Creates the run-length encoded digital channel states of a PulseBlockEnsemble directly
+        from the digital_high flags and the element lengths in bins, i.e. without sampling.
+        Consecutive elements with equal states are merged into a single run and elements of zero
+        length are omitted.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance
+        @param dict ensemble_info: The information dict returned by analyze_block_ensemble
+
+        @return dict: tuples of two numpy arrays (<run_lengths>, <states>) of type int64 and bool
+                      for each digital channel
+        """
+        digital_states = self._get_element_channel_arrays(ensemble)[0]
+        elements_length_bins = ensemble_info['elements_length_bins']
+        non_empty = elements_length_bins > 0
+        lengths = elements_length_bins[non_empty]
+
+        run_lengths = dict()
+        for chnl, states in digital_states.items():
+            states = states[non_empty]
+            if states.size == 0:
+                run_lengths[chnl] = (np.empty(0, dtype='int64'), np.empty(0, dtype=bool))
+                continue
+            run_starts = np.flatnonzero(np.concatenate(([True], states[1:] != states[:-1])))
+            run_lengths[chnl] = (np.add.reduceat(lengths, run_starts).astype('int64'),
+                                 states[run_starts])
+        return run_lengths
+
+    def _write_ensemble_run_lengths(self, ensemble, ensemble_info, waveform_name):
+        """ Writes a PulseBlockEnsemble without analog channels to the pulse generator in a single
+        chunk by passing the run-length encoded digital channel states.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble to write
+        @param dict ensemble_info: The information dict returned by analyze_block_ensemble
+        @param str waveform_name: The waveform name tag to write to the device
+
+        @return set: The set of written waveform names on the device. None if unsuccessful.
+        """
+        number_of_samples = ensemble_info['number_of_samples']
+        self.log.debug('Writing run-length encoded digital channels of "{0}".'
+                       ''.format(waveform_name))
+        written_samples, wfm_list = self.pulsegenerator().write_waveform(
+            name=waveform_name,
+            analog_samples=dict(),
+            digital_samples=self._get_digital_run_lengths(ensemble, ensemble_info),
+            is_first_chunk=True,
+            is_last_chunk=True,
+            total_number_of_samples=number_of_samples)
+        if written_samples != number_of_samples:
+            self.log.error('Sampling of ensemble "{0}" failed. Write to device was '
+                           'unsuccessful.\nThe number of actually written samples ({1:d}) '
+                           'does not match the number of samples staged to write ({2:d}).'
+                           ''.format(ensemble.name, written_samples, number_of_samples))
+            return None
+        return set(wfm_list)
+
+    @staticmethod
+    def _pipeline_chunks(sample_chunks, buffers=2):
+        """ Generator running a sample chunk generator in a separate thread, so the next chunk is
+        sampled while the consumer (writing to the device) is busy with the current chunk.
+        The source generator has to cycle through <buffers> sets of sample arrays (see
+        spare_samples of _sample_chunks_elementwise). A set of sample arrays is only handed back to
+        the sampling thread once the consumer requests the chunk after the one stored in it, so no
+        chunk is overwritten before it has been consumed.
+
+        @param generator sample_chunks: The generator yielding the sample chunks
+        @param int buffers: The number of sets of sample arrays the source generator cycles through
+        """
+        chunk_queue = queue.Queue()
+        # Each permit stands for a set of sample arrays not pending or in use by the consumer
+        free_buffers = threading.Semaphore(max(int(buffers), 1))
+        stop_event = threading.Event()
+        # Sentinel marking the end of the source generator
+        finished = object()
+
+        def acquire_buffer():
+            while not stop_event.is_set():
+                if free_buffers.acquire(timeout=0.1):
+                    return True
+            return False
+
+        def sample_loop():
+            try:
+                while acquire_buffer():
+                    try:
+                        chunk = next(sample_chunks)
+                    except StopIteration:
+                        chunk_queue.put(finished)
+                        break
+                    chunk_queue.put(chunk)
+            except Exception as e:
+                chunk_queue.put(e)
+            finally:
+                sample_chunks.close()
+
+        sample_thread = threading.Thread(target=sample_loop, name='SampleChunkPipeline')
+        sample_thread.start()
+        try:
+            while True:
+                item = chunk_queue.get()
+                if item is finished:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+                # The consumer is done with this chunk, its sample arrays can be refilled
+                free_buffers.release()
+        finally:
+            stop_event.set()
+            sample_thread.join()
+        return
+
+    def _create_cache_arrays(self, path, ensemble_info):
+        """ Creates memory mapped npy files for each channel of a new waveform cache entry.
+
+        @param str path: The directory to create the npy files in
+        @param dict ensemble_info: The information dict returned by analyze_block_ensemble
+
+        @return dict: The memory mapped arrays with channel descriptors as keys. None if the files
+                      could not be created.
+        """
+        cache_arrays = dict()
+        try:
+            if os.path.exists(path):
+                shutil.rmtree(path)
+            os.makedirs(path)
+            for chnl in ensemble_info['analog_channels']:
+                cache_arrays[chnl] = np.lib.format.open_memmap(
+                    os.path.join(path, chnl + '.npy'),
+                    mode='w+',
+                    dtype='float32',
+                    shape=(int(ensemble_info['number_of_samples']),))
+            for chnl in ensemble_info['digital_channels']:
+                cache_arrays[chnl] = np.lib.format.open_memmap(
+                    os.path.join(path, chnl + '.npy'),
+                    mode='w+',
+                    dtype=bool,
+                    shape=(int(ensemble_info['number_of_samples']),))
+        except OSError:
+            self.log.warning('Unable to create waveform cache entry in "{0}". Waveform will not be '
+                             'cached.'.format(path))
+            del cache_arrays
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        return cache_arrays
+
+    def _load_chunks_from_cache(self, cache_path, ensemble_info, array_length, analog_samples,
+                                digital_samples, spare_samples=None):
+        """ Generator reading the samples of a cached waveform chunk by chunk.
+        Has the same output signature as _sample_chunks_elementwise.
+
+        @param str cache_path: The directory of the waveform cache entry
+        @param dict ensemble_info: The information dict returned by analyze_block_ensemble
+        @param int array_length: The maximum number of samples per chunk
+        @param dict analog_samples: Preallocated analog sample arrays of length array_length
+        @param dict digital_samples: Preallocated digital sample arrays of length array_length
+        @param list spare_samples: optional, see _sample_chunks_elementwise
+        """
+        sample_buffers = [(analog_samples, digital_samples)]
+        if spare_samples:
+            sample_buffers.extend(spare_samples)
+        cached_samples = {chnl: np.load(os.path.join(cache_path, chnl + '.npy'), mmap_mode='r')
+                          for chnl in list(analog_samples) + list(digital_samples)}
+        number_of_samples = ensemble_info['number_of_samples']
+        for chunk_index, chunk_start in enumerate(range(0, number_of_samples, array_length)):
+            chunk_length = min(array_length, number_of_samples - chunk_start)
+            chunk_end = chunk_start + chunk_length
+            analog_samples, digital_samples = sample_buffers[chunk_index % len(sample_buffers)]
+            for chnl, samples in analog_samples.items():
+                samples[:chunk_length] = cached_samples[chnl][chunk_start:chunk_end]
+            for chnl, samples in digital_samples.items():
+                samples[:chunk_length] = cached_samples[chnl][chunk_start:chunk_end]
+            yield (chunk_length,
+                   {chnl: samples[:chunk_length] for chnl, samples in analog_samples.items()},
+                   {chnl: samples[:chunk_length] for chnl, samples in digital_samples.items()})
+        return
+
+    @staticmethod
+    def _split_sample_chunks(analog_samples, digital_samples, number_of_samples, array_length):
+        """ Generator splitting the sample arrays of an entire waveform into chunks.
+        Has the same output signature as _sample_chunks_elementwise.
+
+        @param dict analog_samples: The analog sample arrays of the entire waveform
+        @param dict digital_samples: The digital sample arrays of the entire waveform
+        @param int number_of_samples: The number of samples of the waveform
+        @param int array_length: The maximum number of samples per chunk
+        """
+        for chunk_start in range(0, number_of_samples, array_length):
+            chunk_end = min(chunk_start + array_length, number_of_samples)
+            yield (chunk_end - chunk_start,
+                   {chnl: samples[chunk_start:chunk_end] for chnl, samples in
+                    analog_samples.items()},
+                   {chnl: samples[chunk_start:chunk_end] for chnl, samples in
+                    digital_samples.items()})
+        return
+
+    def _sample_ensemble_arrays(self, ensemble, ensemble_info):
+        """ Samples an entire PulseBlockEnsemble at once. Used to sample ensembles in the worker
+        pool.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble to sample
+        @param dict ensemble_info: The information dict returned by analyze_block_ensemble
+
+        @return (dict, dict): The analog and digital sample arrays of the entire waveform
+        """
+        number_of_samples = ensemble_info['number_of_samples']
+        analog_samples = {chnl: np.empty(number_of_samples, dtype='float32') for chnl in
+                          ensemble_info['analog_channels']}
+        digital_samples = {chnl: np.empty(number_of_samples, dtype=bool) for chnl in
+                           ensemble_info['digital_channels']}
+        if self._sampling_engine == 'elementwise':
+            sample_chunks = self._sample_chunks_elementwise(ensemble=ensemble,
+                                                            ensemble_info=ensemble_info,
+                                                            array_length=number_of_samples,
+                                                            offset_bin=0,
+                                                            analog_samples=analog_samples,
+                                                            digital_samples=digital_samples)
+        else:
+            sample_chunks = self._sample_chunks_vectorized(ensemble=ensemble,
+                                                           ensemble_info=ensemble_info,
+                                                           array_length=number_of_samples,
+                                                           offset_bin=0,
+                                                           analog_samples=analog_samples,
+                                                           digital_samples=digital_samples)
+        for chunk in sample_chunks:
+            pass
+        return analog_samples, digital_samples
+
+    def _prefetch_ensemble_samples(self, ensemble_names):
+        """ Submits upcoming PulseBlockEnsembles to the worker pool to be sampled ahead while
+        the main thread is busy writing waveforms. The total size of all sample arrays waiting to
+        be written is limited by the overhead_bytes ConfigOption (if set).
+        Ensembles that are already present on the device or in the waveform cache, that need to be
+        extended to fulfill the waveform granularity or that exceed the memory limit on their own
+        are skipped and sampled as usual.
+
+        @param list ensemble_names: The names of the PulseBlockEnsembles to sample in the order
+                                    they are needed. Submitted or skipped names are removed.
+        """
+        granularity = self.pulse_generator_constraints.waveform_length.step
+        while ensemble_names:
+            ensemble = self.get_ensemble(ensemble_names[0])
+            ensemble_info = self.analyze_block_ensemble(ensemble)
+            number_of_samples = ensemble_info['number_of_samples']
+            ensemble_bytes = number_of_samples * (len(ensemble_info['analog_channels']) * 4 + len(
+                ensemble_info['digital_channels']))
+            waveform_hash = self._get_waveform_hash(ensemble, ensemble_info, 0)
+            skip = number_of_samples == 0 or number_of_samples % granularity != 0 or \
+                   self._use_digital_run_lengths(ensemble_info) or \
+                   0 < self._overhead_bytes < ensemble_bytes or \
+                   waveform_hash in self._prefetched_samples or \
+                   self._get_device_waveforms_by_hash(ensemble.name, waveform_hash) or \
+                   os.path.isdir(os.path.join(self._waveform_cache_dir, waveform_hash))
+            if not skip:
+                pending_bytes = sum(job_bytes for job, job_bytes in
+                                    self._prefetched_samples.values())
+                if 0 < self._overhead_bytes < pending_bytes + ensemble_bytes:
+                    break
+                job = self._sampling_pool.submit(self._sample_ensemble_arrays,
+                                                 ensemble,
+                                                 ensemble_info)
+                self._prefetched_samples[waveform_hash] = (job, ensemble_bytes)
+            del ensemble_names[0]
+        return
+
+    def _pop_prefetched_samples(self, waveform_hash):
+        """ Returns the samples of a waveform sampled ahead in the worker pool and waits for the
+        worker to finish if necessary.
+
+        @param str waveform_hash: The content hash of the waveform (see _get_waveform_hash)
 
+        @return (dict, dict): The analog and digital sample arrays of the entire waveform.
+                              None if the waveform has not been sampled in the worker pool.
+        """
+        if waveform_hash not in self._prefetched_samples:
+            return None
+        job, job_bytes = self._prefetched_samples.pop(waveform_hash)
+        try:
+            return job.result()
+        except Exception:
+            self.log.exception('Sampling of waveform in worker pool failed. Sampling again.')
+            return None
+
+    def _cancel_prefetched_samples(self):
+        """ Cancels all pending jobs of the worker pool and discards samples not written yet.
+        """
+        for job, job_bytes in self._prefetched_samples.values():
+            job.cancel()
+        self._prefetched_samples = dict()
+        return
+
+    def _trim_waveform_cache(self):
+        """ Deletes the least recently used waveform cache entries until the total size of the
+        cache is below the waveform_cache_bytes ConfigOption.
+        """
+        entries = list()
+        total_bytes = 0
+        for entry in os.listdir(self._waveform_cache_dir):
+            path = os.path.join(self._waveform_cache_dir, entry)
+            if entry.endswith('.tmp') or not os.path.isdir(path):
+                continue
+            entry_bytes = sum(os.path.getsize(os.path.join(path, file))
+                              for file in os.listdir(path))
+            entries.append((os.path.getmtime(path), entry_bytes, path))
+            total_bytes += entry_bytes
+        for mtime, entry_bytes, path in sorted(entries):
+            if total_bytes <= self._waveform_cache_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total_bytes -= entry_bytes
+        return
+
+    def clear_waveform_cache(self):
+        """ Deletes all waveforms from the on-disk waveform cache.
+        """
+        for entry in os.listdir(self._waveform_cache_dir):
+            shutil.rmtree(os.path.join(self._waveform_cache_dir, entry), ignore_errors=True)
+        return
+
+    def _get_waveform_hash(self, ensemble, ensemble_info, offset_bin):
+        """ Calculates a content hash identifying the samples of a PulseBlockEnsemble.
+        The hash takes into account the ensemble and the contents of all its PulseBlocks as well as
+        the sample rate, the analog levels, the active channels and the offset_bin.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble to sample
+        @param dict ensemble_info: The information dict returned by analyze_block_ensemble
+        @param int offset_bin: The time bin offset of the first sample
+
+        @return str: The hexadecimal SHA-1 digest
+        """
+        content = dict()
+        content['rotating_frame'] = bool(ensemble.rotating_frame)
+        content['offset_bin'] = int(offset_bin)
+        content['sample_rate'] = float(self.__sample_rate)
+        content['analog_levels'] = [
+            {chnl: self.__analog_levels[0].get(chnl) for chnl in ensemble_info['analog_channels']},
+            {chnl: self.__analog_levels[1].get(chnl) for chnl in ensemble_info['analog_channels']}]
+        content['channels'] = natural_sort(ensemble_info['analog_channels']) + natural_sort(
+            ensemble_info['digital_channels'])
+        content['blocks'] = [(self._saved_pulse_blocks[block_name].get_dict_representation(), reps)
+                             for block_name, reps in ensemble.block_list]
+        content_str = json.dumps(content, sort_keys=True, default=repr)
+        return hashlib.sha1(content_str.encode()).hexdigest()
+
+    def _get_device_waveforms_by_hash(self, name_tag, waveform_hash):
+        """ Returns the waveform names on the device written for the given name tag if the
+        waveform content hash matches and all these waveforms are still present on the device.
+
+        @param str name_tag: The waveform name tag
+        @param str waveform_hash: The content hash of the waveform (see _get_waveform_hash)
+
+        @return list: The waveform names on the device. Empty list if no match is present.
+        """
+        if name_tag not in self._device_waveform_hashes:
+            return list()
+        device_hash, waveforms = self._device_waveform_hashes[name_tag]
+        if device_hash != waveform_hash or not set(waveforms).issubset(self.sampled_waveforms):
+            return list()
+        return list(waveforms)
+
+    def _sample_chunks_elementwise(self, ensemble, ensemble_info, array_length, offset_bin,
+                                   analog_samples, digital_samples, spare_samples=None):
+        """ Generator sampling a PulseBlockEnsemble element by element (incl. repetitions).
+
+        Iterates through all blocks, repetitions and elements of the ensemble and calls
+        get_samples of the sampling functions separately for each element.
+        Each time the preallocated sample arrays are filled completely a tuple
+        (number of samples, analog samples dict, digital samples dict) is yielded. The sample arrays
+        are reused for the next chunk, so the consumer needs to be done with a chunk before
+        requesting the next one, unless spare sample arrays are provided.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to sample
+        @param dict ensemble_info: The analysis of the ensemble (see analyze_block_ensemble)
+        @param int array_length: The length of the preallocated sample arrays
+        @param int offset_bin: The time bin offset to start the rotating frame with
+        @param dict analog_samples: preallocated float32 sample arrays for each analog channel
+        @param dict digital_samples: preallocated bool sample arrays for each digital channel
+        @param list spare_samples: optional, list of additional tuples (analog_samples,
+                                   digital_samples) of preallocated sample arrays. The generator
+                                   cycles through all sets of sample arrays, so the previously
+                                   yielded chunks are not overwritten by the next chunk.
+        """
+        sample_buffers = [(analog_samples, digital_samples)]
+        if spare_samples:
+            sample_buffers.extend(spare_samples)
+        # float64 buffer for the samples of a single element (or part of it) before normalization
+        if ensemble_info['analog_channels'] and ensemble_info['elements_length_bins'].size > 0:
+            element_buffer = np.empty(min(array_length,
+                                          int(ensemble_info['elements_length_bins'].max())))
         # integer to keep track of the sampls already processed
         processed_samples = 0
         # Index to keep track of the samples written into the preallocated samples array
         array_write_index = 0
         # Keep track of the number of elements already written
         element_count = 0
-        # set of written waveform names on the device
-        written_waveforms = set()
         # Iterate over all blocks within the PulseBlockEnsemble object
         for block_name, reps in ensemble.block_list:
             block = self.get_block(block_name)
@@ -1722,24 +2477,24 @@ class SequenceGeneratorLogic(GenericLogic):
                     while element_samples_written != element_length_bins:
                         samples_to_add = min(array_length - array_write_index,
                                              element_length_bins - element_samples_written)
-                        # create floating point time array for the current element inside rotating
-                        # frame if analog samples are to be calculated.
-                        if pulse_function:
-                            time_arr = (offset_bin + np.arange(
-                                samples_to_add, dtype='float64')) / self.__sample_rate
 
                         # Calculate respective part of the sample arrays
                         for chnl in digital_high:
                             digital_samples[chnl][array_write_index:array_write_index + samples_to_add] = digital_high[
                                 chnl]
-                        for chnl in pulse_function:
-                            analog_samples[chnl][array_write_index:array_write_index + samples_to_add] = pulse_function[
-                                                                                                             chnl].get_samples(
-                                time_arr) / self.__analog_levels[0][chnl]
-
-                        # Free memory
-                        if pulse_function:
-                            del time_arr
+                        # The time array of the current element starts at offset_bin. Samples of
+                        # equal elements outside the rotating frame are taken from the sample cache.
+                        for chnl, func in pulse_function.items():
+                            func_samples = SamplingFunctions.get_samples(
+                                function=func,
+                                start_bin=offset_bin,
+                                number_of_samples=samples_to_add,
+                                sample_rate=self.__sample_rate,
+                                out=element_buffer[:samples_to_add],
+                                cache=not ensemble.rotating_frame or func.time_invariant)
+                            np.divide(func_samples,
+                                      self.__analog_levels[0][chnl],
+                                      out=analog_samples[chnl][array_write_index:array_write_index + samples_to_add])
 
                         element_samples_written += samples_to_add
                         array_write_index += samples_to_add
@@ -1749,38 +2504,15 @@ class SequenceGeneratorLogic(GenericLogic):
                         if ensemble.rotating_frame:
                             offset_bin += samples_to_add
 
-                        # Check if the temporary sample array is full and write to the device if so.
+                        # Check if the temporary sample array is full and hand it over if so.
                         if array_write_index == array_length:
-                            # Set first/last chunk flags
-                            is_first_chunk = array_write_index == processed_samples
-                            is_last_chunk = processed_samples == ensemble_info['number_of_samples']
-                            written_samples, wfm_list = self.pulsegenerator().write_waveform(
-                                name=waveform_name,
-                                analog_samples=analog_samples,
-                                digital_samples=digital_samples,
-                                is_first_chunk=is_first_chunk,
-                                is_last_chunk=is_last_chunk,
-                                total_number_of_samples=ensemble_info['number_of_samples'])
-
-                            # Update written waveforms set
-                            written_waveforms.update(wfm_list)
-
-                            # check if write process was successful
-                            if written_samples != array_length:
-                                self.log.error('Sampling of block "{0}" in ensemble "{1}" failed. '
-                                               'Write to device was unsuccessful.\nThe number of '
-                                               'actually written samples ({2:d}) does not match '
-                                               'the number of samples staged to write ({3:d}).'
-                                               ''.format(block_name, ensemble.name, written_samples,
-                                                         array_length))
-                                if not self.__sequence_generation_in_progress:
-                                    self.module_state.unlock()
-                                self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
-                                self.sigSampleEnsembleComplete.emit(None)
-                                return -1, list(), dict()
-
-                            # Reset array write start pointer
+                            yield array_length, analog_samples, digital_samples
+
+                            # Reset array write start pointer and continue with the next set of
+                            # sample arrays
                             array_write_index = 0
+                            sample_buffers.append(sample_buffers.pop(0))
+                            analog_samples, digital_samples = sample_buffers[0]
 
                             # check if the temporary write array needs to be truncated for the next
                             # part. (because it is the last part of the ensemble to write which can
@@ -1796,34 +2528,443 @@ class SequenceGeneratorLogic(GenericLogic):
 
                     # Increment element index
                     element_count += 1
+        return
 
-        # Save sampling related parameters to the sampling_information container within the
-        # PulseBlockEnsemble.
-        # This step is only performed if the resulting waveforms are named by the PulseBlockEnsemble
-        # and not by a sequence nametag
-        if waveform_name == ensemble.name:
-            ensemble.sampling_information = dict()
-            ensemble.sampling_information.update(ensemble_info)
-            ensemble.sampling_information['pulse_generator_settings'] = self.pulse_generator_settings
-            ensemble.sampling_information['waveforms'] = natural_sort(written_waveforms)
-            self.save_ensemble(ensemble)
+    def _sample_chunks_vectorized(self, ensemble, ensemble_info, array_length, offset_bin,
+                                  analog_samples, digital_samples, spare_samples=None,
+                                  parallel=False):
+        """ Generator sampling a PulseBlockEnsemble by grouping PulseBlockElements.
+
+        Produces exactly the same samples and chunks as _sample_chunks_elementwise but instead of
+        iterating over each element (incl. repetitions) the element boundaries are taken from
+        "elements_length_bins" of the ensemble analysis. Digital samples are filled for all
+        elements by a single repeat. Consecutive elements using the same sampling function are
+        sampled as a single contiguous run and all short runs using the same sampling function are
+        sampled in a single call on a concatenated time array.
+        This only applies to sampling functions flagged as "pointwise". All other sampling
+        functions are still evaluated for each element separately.
+
+        For a description of the parameters and the yielded values see _sample_chunks_elementwise.
+        Chunks are views into the preallocated sample arrays which are reused for the next chunk.
+
+        @param list spare_samples: optional, see _sample_chunks_elementwise
+        @param bool parallel: optional, sample the analog channels of each chunk concurrently in
+                              the sampling worker pool (ConfigOption "sampling_workers")
+        """
+        number_of_samples = ensemble_info['number_of_samples']
+        if number_of_samples == 0:
+            return
 
-        self.log.info('Time needed for sampling and writing PulseBlockEnsemble {0} to device: {1} sec'
-                      ''.format(ensemble.name, int(np.rint(time.time() - start_time))))
-        if ensemble_info['number_of_samples'] == 0:
-            self.log.warning('Empty waveform (0 samples) created from PulseBlockEnsemble "{0}".'
-                             ''.format(ensemble.name))
-        if not self.__sequence_generation_in_progress:
-            self.module_state.unlock()
-        self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
-        self.sigSampleEnsembleComplete.emit(ensemble)
-        return offset_bin, natural_sort(written_waveforms), ensemble_info
+        # Start and end bins of all elements (incl. repetitions) in chronological order
+        element_end_bins = np.cumsum(ensemble_info['elements_length_bins'])
+        element_start_bins = element_end_bins - ensemble_info['elements_length_bins']
+
+        # Digital states and sampling functions of all elements in chronological order
+        digital_states, function_indices, functions = self._get_element_channel_arrays(ensemble)
+
+        parallel = parallel and self._sampling_pool is not None and len(function_indices) > 1
+
+        sample_buffers = [(analog_samples, digital_samples)]
+        if spare_samples:
+            sample_buffers.extend(spare_samples)
+
+        for chunk_index, chunk_start in enumerate(range(0, number_of_samples, array_length)):
+            chunk_end = min(chunk_start + array_length, number_of_samples)
+            chunk_length = chunk_end - chunk_start
+            analog_samples, digital_samples = sample_buffers[chunk_index % len(sample_buffers)]
+            analog_chunk = {chnl: arr[:chunk_length] for chnl, arr in analog_samples.items()}
+            digital_chunk = {chnl: arr[:chunk_length] for chnl, arr in digital_samples.items()}
+
+            # The analog channels are independent of each other and can be sampled concurrently.
+            channel_jobs = list()
+            for chnl, indices in function_indices.items():
+                kwargs = {'functions': functions[chnl],
+                          'function_indices': indices,
+                          'element_start_bins': element_start_bins,
+                          'element_end_bins': element_end_bins,
+                          'chunk_start': chunk_start,
+                          'chunk_end': chunk_end,
+                          'offset_bin': offset_bin,
+                          'rotating_frame': ensemble.rotating_frame,
+                          'samples': analog_chunk[chnl],
+                          'amplitude': self.__analog_levels[0][chnl]}
+                if parallel:
+                    channel_jobs.append(self._sampling_pool.submit(self._sample_analog_chunk,
+                                                                   **kwargs))
+                else:
+                    self._sample_analog_chunk(**kwargs)
+
+            # Process the chunk in blocks of 2**22 samples to limit temporary memory usage
+            for block_start in range(chunk_start, chunk_end, 4194304):
+                block_end = min(block_start + 4194304, chunk_end)
+                block_slice = slice(block_start - chunk_start, block_end - chunk_start)
+                elements, piece_length = self._get_element_pieces(
+                    element_start_bins, element_end_bins, block_start, block_end)
+                for chnl, states in digital_states.items():
+                    digital_chunk[chnl][block_slice] = np.repeat(states[elements], piece_length)
+
+            # Wait for the analog channels and re-raise exceptions of the worker threads
+            for job in channel_jobs:
+                job.result()
+
+            yield chunk_length, analog_chunk, digital_chunk
+        return
+
+    def _sample_analog_chunk(self, functions, function_indices, element_start_bins,
+                             element_end_bins, chunk_start, chunk_end, offset_bin, rotating_frame,
+                             samples, amplitude):
+        """ Samples a single analog channel for all elements (or parts of them) within a chunk.
+
+        @param list functions: The unique sampling function instances of the channel
+        @param numpy.ndarray function_indices: The sampling function index of each element
+        @param numpy.ndarray element_start_bins: The start bin of all elements
+        @param numpy.ndarray element_end_bins: The end bin of all elements
+        @param int chunk_start: The first bin of the chunk
+        @param int chunk_end: The end bin of the chunk (exclusive)
+        @param int offset_bin: The time bin offset of the first sample of the ensemble
+        @param bool rotating_frame: Flag indicating if the rotating frame is preserved
+        @param numpy.ndarray samples: The float32 sample array of the chunk to write into
+        @param float amplitude: The pp-amplitude of the analog channel to normalize the samples with
+        """
+        # float64 buffer for the samples of a block before normalization
+        sample_buffer = np.empty(min(chunk_end - chunk_start, 4194304))
+
+        # Process the chunk in blocks of 2**22 samples to limit temporary memory usage
+        for block_start in range(chunk_start, chunk_end, 4194304):
+            block_end = min(block_start + 4194304, chunk_end)
+            block_slice = slice(block_start - chunk_start, block_end - chunk_start)
+            elements, piece_length = self._get_element_pieces(
+                element_start_bins, element_end_bins, block_start, block_end)
+
+            # Time bin for each sample. Without rotating frame the time array of each element
+            # (or the part of it written in this chunk) starts at offset_bin.
+            time_bins = np.arange(block_start, block_end, dtype='int64')
+            if rotating_frame:
+                time_bins += offset_bin
+            else:
+                time_bins += np.repeat(
+                    offset_bin - np.maximum(element_start_bins[elements], chunk_start),
+                    piece_length)
+
+            self._sample_pointwise_runs(functions=functions,
+                                        piece_functions=function_indices[elements],
+                                        piece_length=piece_length,
+                                        time_bins=time_bins,
+                                        samples=samples[block_slice],
+                                        amplitude=amplitude,
+                                        rotating_frame=rotating_frame,
+                                        sample_buffer=sample_buffer)
+
+        # Sampling functions that are not pointwise need their own time array for each element
+        # (or the part of it written in this chunk).
+        if all(func.pointwise for func in functions):
+            return
+        elements, piece_length = self._get_element_pieces(
+            element_start_bins, element_end_bins, chunk_start, chunk_end)
+        piece_start = np.maximum(element_start_bins[elements], chunk_start)
+        for element, start, length in zip(elements, piece_start, piece_length):
+            func = functions[function_indices[element]]
+            if func.pointwise:
+                continue
+            time_bin = offset_bin + start if rotating_frame else offset_bin
+            func_samples = SamplingFunctions.get_samples(
+                function=func,
+                start_bin=time_bin,
+                number_of_samples=length,
+                sample_rate=self.__sample_rate,
+                out=sample_buffer[:length] if length <= sample_buffer.size else None,
+                cache=not rotating_frame or func.time_invariant)
+            write_start = start - chunk_start
+            np.divide(func_samples, amplitude, out=samples[write_start:write_start + length])
+        return
+
+    @staticmethod
+    def _get_element_pieces(element_start_bins, element_end_bins, start_bin, end_bin):
+        """ Helper method to determine the elements (or parts of them) within a range of bins.
+
+        @param numpy.ndarray element_start_bins: The start bin of all elements
+        @param numpy.ndarray element_end_bins: The end bin of all elements
+        @param int start_bin: The first bin of the range
+        @param int end_bin: The end bin of the range (exclusive)
+        @return (numpy.ndarray, numpy.ndarray): element indices and number of bins for each element
+                                                (part) in chronological order
+        """
+        first_element = np.searchsorted(element_end_bins, start_bin, side='right')
+        last_element = np.searchsorted(element_start_bins, end_bin, side='left')
+        piece_length = np.minimum(element_end_bins[first_element:last_element], end_bin) - \
+                       np.maximum(element_start_bins[first_element:last_element], start_bin)
+        non_empty = piece_length > 0
+        return np.arange(first_element, last_element)[non_empty], piece_length[non_empty]
+
+    def _sample_pointwise_runs(self, functions, piece_functions, piece_length, time_bins, samples,
+                               amplitude, rotating_frame=True, sample_buffer=None):
+        """ Evaluates all pointwise sampling functions for consecutive (parts of) elements and
+        writes the normalized result into the sample array. Elements using sampling functions that
+        are not pointwise are skipped.
+        Long runs of a single element (or in the rotating frame) are looked up in the sample cache
+        of SamplingFunctions.
+
+        @param list functions: The sampling function instances referenced by piece_functions
+        @param numpy.ndarray piece_functions: The index of the sampling function for each piece
+        @param numpy.ndarray piece_length: The number of samples for each piece
+        @param numpy.ndarray time_bins: The time bin for each sample
+        @param numpy.ndarray samples: The float32 sample array to write into
+        @param float amplitude: The pp-amplitude of the analog channel to normalize the samples with
+        @param bool rotating_frame: optional, flag indicating if the rotating frame is preserved.
+                                    Only time invariant samples are cached in the rotating frame.
+        @param numpy.ndarray sample_buffer: optional, float64 buffer of at least the length of
+                                            time_bins used to evaluate the sampling functions
+        """
+        if sample_buffer is None:
+            sample_buffer = np.empty(time_bins.size)
+
+        # Merge consecutive pieces using the same sampling function into contiguous runs
+        run_first_piece = np.append(0, np.flatnonzero(np.diff(piece_functions)) + 1)
+        run_functions = piece_functions[run_first_piece]
+        run_end = np.cumsum(np.add.reduceat(piece_length, run_first_piece))
+        run_length = np.diff(run_end, prepend=0)
+        run_start = run_end - run_length
+
+        # Long runs are sampled one by one. The overhead of a single call is negligible here.
+        is_long = run_length >= 1024
+        for run in np.flatnonzero(is_long):
+            func = functions[run_functions[run]]
+            if not func.pointwise:
+                continue
+            start, end = run_start[run], run_end[run]
+            if time_bins[end - 1] - time_bins[start] == end - start - 1:
+                # Contiguous time bins, i.e. a single element (or part of it) or rotating frame
+                func_samples = SamplingFunctions.get_samples(
+                    function=func,
+                    start_bin=time_bins[start],
+                    number_of_samples=end - start,
+                    sample_rate=self.__sample_rate,
+                    out=sample_buffer[:end - start],
+                    cache=not rotating_frame or func.time_invariant)
+            else:
+                func_samples = SamplingFunctions.evaluate(
+                    func, time_bins[start:end] / self.__sample_rate, sample_buffer[:end - start])
+            np.divide(func_samples, amplitude, out=samples[start:end])
+
+        # All short runs using the same sampling function are sampled at once
+        for func_index in np.unique(run_functions[~is_long]):
+            func = functions[func_index]
+            if not func.pointwise:
+                continue
+            runs = np.flatnonzero(~is_long & (run_functions == func_index))
+            lengths = run_length[runs]
+            sample_indices = np.arange(lengths.sum()) + np.repeat(
+                run_start[runs] - np.cumsum(lengths) + lengths, lengths)
+            func_samples = SamplingFunctions.evaluate(func,
+                                                      time_bins[sample_indices] / self.__sample_rate,
+                                                      sample_buffer[:sample_indices.size])
+            func_samples /= amplitude
+            samples[sample_indices] = func_samples
+        return
+
+    def _get_element_channel_arrays(self, ensemble):
+        """ Helper method to collect the digital channel states and sampling functions of all
+        PulseBlockElements (incl. repetitions) of a PulseBlockEnsemble in chronological order.
+
+        Equal sampling functions (same type and parameters) share the same index.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to evaluate
+        @return (dict, dict, dict): digital_states: bool arrays of element states for each digital
+                                                    channel
+                                    function_indices: int arrays of element sampling function
+                                                      indices for each analog channel
+                                    functions: lists of unique sampling function instances for
+                                               each analog channel
+        """
+        digital_states = dict()
+        function_indices = dict()
+        function_lookup = dict()
+        for block_name, reps in ensemble.block_list:
+            block = self.get_block(block_name)
+            for chnl in block.digital_channels:
+                states = np.array([elem.digital_high[chnl] for elem in block.element_list],
+                                  dtype=bool)
+                digital_states.setdefault(chnl, list()).append(np.tile(states, reps + 1))
+            for chnl in block.analog_channels:
+                lookup = function_lookup.setdefault(chnl, dict())
+                indices = np.array([lookup.setdefault(elem.pulse_function[chnl], len(lookup)) for
+                                    elem in block.element_list], dtype='int64')
+                function_indices.setdefault(chnl, list()).append(np.tile(indices, reps + 1))
+
+        digital_states = {chnl: np.concatenate(arrays) for chnl, arrays in digital_states.items()}
+        function_indices = {chnl: np.concatenate(arrays) for chnl, arrays in
+                            function_indices.items()}
+        functions = {chnl: list(lookup) for chnl, lookup in function_lookup.items()}
+        return digital_states, function_indices, functions
+
+    def compile_block_ensemble(self, ensemble):
+        """ Compiles a PulseBlockEnsemble into a compact representation of waveform segments plus
+        loop counts to be played as consecutive sequence steps.
+
+        Each repeated PulseBlock whose repetitions result in identical samples becomes a segment
+        of its own which is played (repetitions + 1) times. All other PulseBlocks in between are
+        merged into segments played once. A PulseBlock repetition is considered identical if the
+        PulseBlock has no length increments and either the ensemble is not in the rotating frame
+        or all its sampling functions are time invariant.
+
+        The compiled representation is only returned if it saves samples, if each segment
+        fulfills the waveform length constraints of the pulse generator and if the element
+        discretization is exactly the same as for the expanded ensemble.
+
+        @param str|PulseBlockEnsemble ensemble: PulseBlockEnsemble instance or name of a saved
+                                                PulseBlockEnsemble to compile
+
+        @return list: list of tuples (<segment PulseBlockEnsemble>, <repetitions>) in
+                      chronological order. None if the ensemble can not be compiled.
+        """
+        if isinstance(ensemble, str):
+            ensemble = self.get_ensemble(ensemble)
+            if not ensemble:
+                self.log.error('Unable to compile PulseBlockEnsemble. Not found in saved ensembles.')
+                return None
+        if len(ensemble) == 0 or self._sampling_ensemble_sanity_check(ensemble) < 0:
+            return None
+
+        # Group the blocks into segments: [<block_list>, <number of plays>]
+        segments = list()
+        for block_name, reps in ensemble:
+            if reps > 0 and self._is_block_loopable(self.get_block(block_name),
+                                                    ensemble.rotating_frame):
+                segments.append([[(block_name, 0)], reps + 1])
+            elif segments and segments[-1][1] == 1:
+                segments[-1][0].append((block_name, reps))
+            else:
+                segments.append([[(block_name, reps)], 1])
+        if all(plays == 1 for block_list, plays in segments):
+            return None
+
+        min_length = self.pulse_generator_constraints.waveform_length.min
+        granularity = self.pulse_generator_constraints.waveform_length.step
+        compiled = list()
+        expanded_length_bins = list()
+        for index, (block_list, plays) in enumerate(segments):
+            segment = PulseBlockEnsemble(name='{0}_seg{1:d}'.format(ensemble.name, index),
+                                         block_list=block_list,
+                                         rotating_frame=ensemble.rotating_frame)
+            segment_info = self.analyze_block_ensemble(segment)
+            number_of_samples = segment_info['number_of_samples']
+            if number_of_samples < max(min_length, 1) or number_of_samples % granularity != 0:
+                return None
+            expanded_length_bins.append(np.tile(segment_info['elements_length_bins'], plays))
+            compiled.append((segment, plays - 1))
+
+        # Make sure the segments are discretized exactly like the expanded ensemble
+        ensemble_info = self.analyze_block_ensemble(ensemble)
+        if not np.array_equal(np.concatenate(expanded_length_bins),
+                              ensemble_info['elements_length_bins']):
+            return None
+        return compiled
+
+    @staticmethod
+    def _is_block_loopable(block, rotating_frame):
+        """ Helper method to check if all repetitions of a PulseBlock result in identical samples.
+
+        @param PulseBlock block: The PulseBlock to check
+        @param bool rotating_frame: Flag indicating if the rotating frame is preserved
+
+        @return bool: True if the repetitions can be played by looping a single waveform
+        """
+        for element in block:
+            if element.increment_s != 0:
+                return False
+            if rotating_frame and not all(func.time_invariant for func in
+                                          element.pulse_function.values()):
+                return False
+        return True
+
+    def _compile_sequence_steps(self, sequence):
+        """ Helper method compiling the PulseBlockEnsembles of all steps of a PulseSequence (see
+        compile_block_ensemble). Steps that are repeated as a whole can only be compiled if their
+        ensemble results in a single segment. Loop counts exceeding the repetition constraint of
+        the pulse generator are split into several steps.
+
+        @param PulseSequence sequence: The PulseSequence to compile
+
+        @return list: The compiled segments for each sequence step. Each item is either a list of
+                      tuples (<segment PulseBlockEnsemble>, <repetitions>) or None if the step
+                      can not be compiled.
+        """
+        # Looping is only possible if the pulse generator supports repeated sequence steps
+        step_segments = [None] * len(sequence)
+        max_repetitions = self.pulse_generator_constraints.repetitions.max
+        if not self._compile_sequence_loops or not max_repetitions >= 1:
+            return step_segments
+        max_repetitions = int(max_repetitions)
+
+        compiled_ensembles = dict()
+        number_of_steps = 0
+        for step_index, seq_step in enumerate(sequence):
+            if seq_step.ensemble not in compiled_ensembles:
+                compiled_ensembles[seq_step.ensemble] = self.compile_block_ensemble(
+                    seq_step.ensemble)
+            segments = compiled_ensembles[seq_step.ensemble]
+            if segments is not None and seq_step.repetitions != 0:
+                if len(segments) != 1:
+                    segments = None
+                elif seq_step.repetitions < 0:
+                    segments = [(segments[0][0], -1)]
+                else:
+                    segments = [(segments[0][0],
+                                 (seq_step.repetitions + 1) * (segments[0][1] + 1) - 1)]
+            if segments is not None:
+                # Split loops exceeding the maximum number of repetitions
+                split_segments = list()
+                for segment, repetitions in segments:
+                    plays = repetitions + 1
+                    while plays > max_repetitions + 1:
+                        split_segments.append((segment, max_repetitions))
+                        plays -= max_repetitions + 1
+                    split_segments.append((segment, plays - 1 if repetitions >= 0 else -1))
+                segments = split_segments
+            step_segments[step_index] = segments
+            number_of_steps += 1 if segments is None else len(segments)
+
+        # Fall back to expanded PulseBlockEnsembles if there are too many sequence steps
+        max_steps = self.pulse_generator_constraints.sequence_steps.max
+        if max_steps and number_of_steps > max_steps:
+            self.log.warning('Compiled PulseSequence "{0}" would need {1:d} sequence steps but the '
+                             'pulse generator supports only {2:d}. Repetitions of PulseBlocks '
+                             'are sampled instead.'.format(sequence.name, number_of_steps,
+                                                           max_steps))
+            return [None] * len(sequence)
+        return step_segments
+
+    @staticmethod
+    def _get_segment_steps(seq_step, segments):
+        """ Helper method creating the sequence steps to play the compiled segments of a single
+        PulseSequence step. Triggers (wait_for, flag_trigger) are only assigned to the first step
+        and go_to only to the last one. Event jumps and flag_high apply to all steps.
+
+        @param SequenceStep seq_step: The step of the PulseSequence
+        @param list segments: The compiled segments of the step (see _compile_sequence_steps)
+
+        @return list: list of tuples (<segment PulseBlockEnsemble>, <SequenceStep>)
+        """
+        segment_steps = list()
+        for index, (segment, repetitions) in enumerate(segments):
+            written_step = seq_step.copy()
+            written_step.repetitions = repetitions
+            if index > 0:
+                written_step.wait_for = 'OFF'
+                written_step.flag_trigger = list()
+            if index < len(segments) - 1:
+                written_step.go_to = -1
+            segment_steps.append((segment, written_step))
+        return segment_steps
 
     @QtCore.Slot(str)
-    def sample_pulse_sequence(self, sequence):
+    @QtCore.Slot(str, bool)
+    def sample_pulse_sequence(self, sequence, resume=True):
         """ Samples the PulseSequence object, which serves as the construction plan.
 
         @param str|PulseSequence sequence: Name or instance of the PulseSequence to be sampled.
+        @param bool resume: optional, continue an interrupted sampling of the same PulseSequence
+                            from the last completed step instead of starting over (default True)
 
         The sequence object is sampled by call subsequently the sampling routine for the
         PulseBlockEnsemble objects and passing if needed the rotating frame option.
@@ -1835,6 +2976,13 @@ class SequenceGeneratorLogic(GenericLogic):
         ATTENTION: The phase preservation within a single PulseBlockEnsemble is NOT affected by
                    this method.
 
+        The waveforms of each step are written to the device as soon as they are sampled. After
+        each step the progress is stored in sampling_information['sampling_progress'] of the
+        sequence and sigSampleSequenceProgress is emitted. If sampling fails or is interrupted,
+        the next call resumes after the last completed step as long as the sequence, its
+        ensembles and the pulse generator settings are unchanged and the written waveforms are
+        still present on the device.
+
         More sophisticated sequence sampling method can be implemented here.
         """
         # Get PulseSequence from saved sequences if string has been passed as argument
@@ -1860,80 +3008,87 @@ class SequenceGeneratorLogic(GenericLogic):
             self.sigSampleSequenceComplete.emit(None)
             return
 
-        self._saved_pulse_sequences[sequence.name] = sequence
-
         # delete already written sequences on the device memory.
         if sequence.name in self.sampled_sequences:
             self.pulsegenerator().delete_sequence(sequence.name)
 
+        # Continue an interrupted sampling run or start from scratch
+        sequence_hash = self._get_sequence_hash(sequence)
+        progress = sequence.sampling_information.get('sampling_progress') if resume else None
+        if self._is_sampling_progress_valid(progress, sequence_hash):
+            self.log.info('Resuming sampling of PulseSequence "{0}" after step {1:d} of {2:d}.'
+                          ''.format(sequence.name, progress['completed_steps'], len(sequence)))
+        else:
+            progress = self._create_sampling_progress(sequence_hash)
+
         # Make sure the PulseSequence is contained in the saved sequences dict
-        sequence.sampling_information = dict()
-        self.save_sequence(sequence)
+        sequence.sampling_information = {'sampling_progress': progress}
+        self._save_sampling_information(sequence)
 
         # Take current time
         start_time = time.time()
+        last_save_time = start_time
+
+        # Compile the PulseBlockEnsembles of each step into segments to be played as looped
+        # sequence steps (None for steps to be sampled as a whole).
+        step_segments = self._compile_sequence_steps(sequence)
+
+        # The PulseBlockEnsembles of sequences without rotating frame are independent of each other
+        # and can be sampled ahead in the worker pool while the waveforms are written.
+        prefetch_names = list()
+        if self._sampling_pool is not None and not sequence.rotating_frame:
+            for step_index in range(progress['completed_steps'], len(sequence)):
+                ensemble_name = sequence[step_index].ensemble
+                if step_segments[step_index] is None and ensemble_name not in prefetch_names:
+                    prefetch_names.append(ensemble_name)
+
+        for step_index in range(progress['completed_steps'], len(sequence)):
+            step_start_time = time.time()
+            if prefetch_names:
+                self._prefetch_ensemble_samples(prefetch_names)
+
+            if not self._sample_sequence_step(sequence, step_index, step_segments[step_index],
+                                              progress):
+                self.log.error('Sampling of PulseBlockEnsemble "{0}" failed during sampling of '
+                               'PulseSequence "{1}".\nFailed to create waveforms on device. '
+                               'Sampling will resume after step {2:d} with the next call.'
+                               ''.format(sequence[step_index].ensemble, sequence.name,
+                                         progress['completed_steps']))
+                self._save_sampling_information(sequence)
+                self._cancel_prefetched_samples()
+                self.module_state.unlock()
+                self.__sequence_generation_in_progress = False
+                self.sigSampleSequenceComplete.emit(None)
+                return
 
-        # Produce a set of created waveforms
-        written_waveforms = set()
-        # Keep track of generated PulseBlockEnsembles and their corresponding ensemble_info dict
-        generated_ensembles = dict()
-
-        # Create a list in the process with each element holding the created waveform names as a
-        # tuple and the corresponding sequence parameters as defined in the PulseSequence object
+            # Record the progress. The progress is written to the asset database at most every few
+            # seconds to keep the overhead low for sequences with many short steps.
+            step_duration = time.time() - step_start_time
+            progress['completed_steps'] = step_index + 1
+            progress['step_durations'].append(step_duration)
+            if time.time() - last_save_time > self._progress_save_interval:
+                self._save_sampling_information(sequence)
+                last_save_time = time.time()
+            self.sigSampleSequenceProgress.emit(sequence.name, step_index + 1, len(sequence),
+                                                step_duration)
+
+        self._cancel_prefetched_samples()
+
+        # Create a list with each element holding the created waveform names as a tuple and the
+        # corresponding sequence parameters as defined in the PulseSequence object
         # Example: [(('waveform1', 'waveform2'), seq_param_dict1),
         #           (('waveform3', 'waveform4'), seq_param_dict2)]
-        sequence_param_dict_list = list()
-
-        # if all the Pulse_Block_Ensembles should be in the rotating frame, then each ensemble
-        # will be created in general with a different offset_bin. Therefore, in order to keep track
-        # of the sampled Pulse_Block_Ensembles one has to introduce a running number as an
-        # additional name tag, so keep the sampled files separate.
-        offset_bin = 0  # that will be used for phase preservation
-        for step_index, seq_step in enumerate(sequence):
-            if sequence.rotating_frame:
-                # to make something like 001
-                name_tag = seq_step.ensemble + '_' + str(step_index).zfill(3)
-            else:
-                name_tag = seq_step.ensemble
-                offset_bin = 0  # Keep the offset at 0
-
-            # Only sample ensembles if they have not already been sampled
-            if sequence.rotating_frame or \
-                    not self.get_ensemble(name_tag).sampling_information or \
-                    self.get_ensemble(name_tag).sampling_information['pulse_generator_settings'] != self.pulse_generator_settings:
-
-                offset_bin, waveform_list, ensemble_info = self.sample_pulse_block_ensemble(
-                    ensemble=seq_step.ensemble,
-                    offset_bin=offset_bin,
-                    name_tag=name_tag)
-
-                if len(waveform_list) == 0:
-                    self.log.error('Sampling of PulseBlockEnsemble "{0}" failed during sampling of '
-                                   'PulseSequence "{1}".\nFailed to create waveforms on device.'
-                                   ''.format(seq_step.ensemble, sequence.name))
-                    self.module_state.unlock()
-                    self.__sequence_generation_in_progress = False
-                    self.sigSampleSequenceComplete.emit(None)
-                    return
-
-                # Add to generated ensembles
-                ensemble_info['waveforms'] = waveform_list
-                generated_ensembles[name_tag] = ensemble_info
-
-                # Add created waveform names to the set
-                written_waveforms.update(waveform_list)
-            else:
-                self.log.debug('Waveform already sampled: {0}'.format(name_tag))
-                ensemble_info = self.get_ensemble(name_tag).sampling_information.copy()
-                del(ensemble_info['pulse_generator_settings'])
-                generated_ensembles[name_tag] = ensemble_info
-
-                # Add created waveform names to the set
-                written_waveforms.update(ensemble_info['waveforms'])
-
-            # Append written sequence step to sequence_param_dict_list
-            sequence_param_dict_list.append(
-                (tuple(generated_ensembles[name_tag]['waveforms']), seq_step))
+        # Jump targets are translated to the numbers of the written sequence steps.
+        sequence_param_dict_list = list(progress['step_list'])
+        if len(sequence_param_dict_list) != len(sequence):
+            first_written_steps = progress['first_written_steps']
+            for index, (waveforms, written_step) in enumerate(sequence_param_dict_list):
+                written_step = written_step.copy()
+                if 0 < written_step.go_to <= len(first_written_steps):
+                    written_step.go_to = first_written_steps[written_step.go_to - 1]
+                if 0 < written_step.event_jump_to <= len(first_written_steps):
+                    written_step.event_jump_to = first_written_steps[written_step.event_jump_to - 1]
+                sequence_param_dict_list[index] = (waveforms, written_step)
 
         # pass the whole information to the sequence creation method:
         steps_written = self.pulsegenerator().write_sequence(sequence.name,
@@ -1946,13 +3101,15 @@ class SequenceGeneratorLogic(GenericLogic):
                                                              len(sequence_param_dict_list)))
 
         # get important parameters from the sequence and save them to the sequence object
+        sequence.sampling_information = dict()
         sequence.sampling_information.update(self.analyze_sequence(sequence))
-        sequence.sampling_information['ensemble_info'] = generated_ensembles
+        sequence.sampling_information['ensemble_info'] = progress['generated_ensembles']
         sequence.sampling_information['pulse_generator_settings'] = self.pulse_generator_settings
-        sequence.sampling_information['waveforms'] = natural_sort(written_waveforms)
+        sequence.sampling_information['waveforms'] = natural_sort(progress['written_waveforms'])
         sequence.sampling_information['step_waveform_list'] = [step[0] for step in
                                                                sequence_param_dict_list]
-        self.save_sequence(sequence)
+        sequence.sampling_information['step_durations'] = progress['step_durations']
+        self._save_sampling_information(sequence)
 
         self.log.info('Time needed for sampling and writing PulseSequence {0} to device: {1} sec.'
                       ''.format(sequence.name, int(np.rint(time.time() - start_time))))
@@ -1964,6 +3121,180 @@ class SequenceGeneratorLogic(GenericLogic):
         self.sigSampleSequenceComplete.emit(sequence)
         return
 
+    def _sample_sequence_step(self, sequence, step_index, segments, progress):
+        """ Samples the PulseBlockEnsemble of a single PulseSequence step (or its compiled segments)
+        and writes the waveforms to the device. The written sequence steps and all information
+        needed to continue with the next step are added to the progress dict.
+
+        @param PulseSequence sequence: The PulseSequence to sample
+        @param int step_index: The index of the step to sample
+        @param list segments: The compiled segments of the step (see _compile_sequence_steps) or
+                              None to sample the ensemble as a whole
+        @param dict progress: The sampling progress (see _create_sampling_progress)
+
+        @return bool: True if successful, False otherwise
+        """
+        seq_step = sequence[step_index]
+        generated_ensembles = progress['generated_ensembles']
+        step_list = progress['step_list']
+        offset_bin = progress['offset_bin']  # that will be used for phase preservation
+
+        # if all the Pulse_Block_Ensembles should be in the rotating frame, then each ensemble
+        # will be created in general with a different offset_bin. Therefore, in order to keep track
+        # of the sampled Pulse_Block_Ensembles one has to introduce a running number as an
+        # additional name tag, so keep the sampled files separate.
+        if sequence.rotating_frame:
+            # to make something like 001
+            name_tag = seq_step.ensemble + '_' + str(step_index).zfill(3)
+        else:
+            name_tag = seq_step.ensemble
+            offset_bin = 0  # Keep the offset at 0
+
+        written_steps = list()
+        if segments is not None:
+            # Sample the segments of the compiled ensemble and add a sequence step for each
+            # loop. Identical segments are only sampled once.
+            step_offset_bin = offset_bin
+            for segment, written_step in self._get_segment_steps(seq_step, segments):
+                segment_offset_bin = offset_bin if segment.rotating_frame else step_offset_bin
+                segment_tag = progress['sampled_segments'].setdefault(
+                    (tuple(segment.block_list), segment_offset_bin),
+                    name_tag + segment.name[len(seq_step.ensemble):])
+                if segment_tag not in generated_ensembles:
+                    waveform_list, ensemble_info = self.sample_pulse_block_ensemble(
+                        ensemble=segment,
+                        offset_bin=segment_offset_bin,
+                        name_tag=segment_tag)[1:]
+                    if len(waveform_list) == 0:
+                        return False
+                    self._add_sampled_ensemble(progress, segment_tag, waveform_list,
+                                               ensemble_info)
+                if segment.rotating_frame:
+                    offset_bin += generated_ensembles[segment_tag]['number_of_samples'] * (
+                        written_step.repetitions + 1)
+                written_steps.append(
+                    (tuple(generated_ensembles[segment_tag]['waveforms']), written_step))
+            # The offset advances by a single play of the ensemble like for an ensemble sampled
+            # as a whole.
+            if offset_bin != step_offset_bin:
+                offset_bin = step_offset_bin + self.analyze_block_ensemble(
+                    seq_step.ensemble)['number_of_samples']
+        else:
+            # Only sample each ensemble once per sequence. Waveforms already present on the device
+            # are detected by their content hash and are not sampled again.
+            if name_tag not in generated_ensembles:
+                offset_bin, waveform_list, ensemble_info = self.sample_pulse_block_ensemble(
+                    ensemble=seq_step.ensemble,
+                    offset_bin=offset_bin,
+                    name_tag=name_tag)
+                if len(waveform_list) == 0:
+                    return False
+                self._add_sampled_ensemble(progress, name_tag, waveform_list, ensemble_info)
+            written_steps.append((tuple(generated_ensembles[name_tag]['waveforms']), seq_step))
+
+        # Append written sequence steps
+        progress['offset_bin'] = offset_bin
+        progress['first_written_steps'].append(len(step_list) + 1)
+        step_list.extend(written_steps)
+        return True
+
+    def _add_sampled_ensemble(self, progress, name_tag, waveform_list, ensemble_info):
+        """ Adds a sampled PulseBlockEnsemble (or segment) to the sampling progress of a
+        PulseSequence.
+
+        @param dict progress: The sampling progress (see _create_sampling_progress)
+        @param str name_tag: The name tag the ensemble has been sampled with
+        @param list waveform_list: The names of the written waveforms
+        @param dict ensemble_info: The ensemble_info dict returned by sample_pulse_block_ensemble
+        """
+        # Add to generated ensembles
+        ensemble_info['waveforms'] = waveform_list
+        progress['generated_ensembles'][name_tag] = ensemble_info
+        progress['waveform_hashes'][name_tag] = self._device_waveform_hashes.get(
+            name_tag, (None,))[0]
+        # Add created waveform names to the set
+        progress['written_waveforms'].update(waveform_list)
+        return
+
+    @staticmethod
+    def _create_sampling_progress(sequence_hash):
+        """ Creates an empty sampling progress record for a PulseSequence.
+
+        @param str sequence_hash: The content hash of the PulseSequence (see _get_sequence_hash)
+
+        @return dict: The progress record containing
+                      sequence_hash: the content hash of the sampled PulseSequence
+                      completed_steps: the number of completely sampled PulseSequence steps
+                      offset_bin: the time bin offset for the next step (rotating frame)
+                      generated_ensembles: ensemble_info dicts of the sampled waveforms by name tag
+                      waveform_hashes: waveform content hashes by name tag
+                      written_waveforms: set of written waveform names on the device
+                      sampled_segments: name tags of sampled segments of compiled ensembles by
+                                        (<block_list>, <offset_bin>)
+                      step_list: tuples of (<waveform names>, <SequenceStep>) to write
+                      first_written_steps: number of the first written sequence step for each
+                                           sampled PulseSequence step (starting at 1)
+                      step_durations: the time in seconds needed to sample each step
+        """
+        return {'sequence_hash': sequence_hash,
+                'completed_steps': 0,
+                'offset_bin': 0,
+                'generated_ensembles': dict(),
+                'waveform_hashes': dict(),
+                'written_waveforms': set(),
+                'sampled_segments': dict(),
+                'step_list': list(),
+                'first_written_steps': list(),
+                'step_durations': list()}
+
+    def _is_sampling_progress_valid(self, progress, sequence_hash):
+        """ Checks if sampling of a PulseSequence can be resumed from a progress record.
+        This is the case if the content hash of the sequence did not change and all waveforms
+        written so far are still present on the device.
+
+        @param dict progress: The progress record (see _create_sampling_progress)
+        @param str sequence_hash: The current content hash of the PulseSequence
+
+        @return bool: True if sampling can be resumed, False otherwise
+        """
+        if not progress or progress.get('sequence_hash') != sequence_hash:
+            return False
+        sampled_waveforms = set(self.sampled_waveforms)
+        for name_tag, waveform_hash in progress['waveform_hashes'].items():
+            device_hash, waveforms = self._device_waveform_hashes.get(name_tag, (None, list()))
+            if device_hash != waveform_hash or not sampled_waveforms.issuperset(waveforms):
+                return False
+        return True
+
+    def _get_sequence_hash(self, sequence):
+        """ Calculates a content hash identifying a PulseSequence including all its
+        PulseBlockEnsembles and PulseBlocks as well as the pulse generator settings.
+
+        @param PulseSequence sequence: The PulseSequence
+
+        @return str: The hexadecimal SHA-1 digest
+        """
+        content = dict()
+        content['rotating_frame'] = bool(sequence.rotating_frame)
+        content['steps'] = [dict(seq_step) for seq_step in sequence]
+        content['compile_sequence_loops'] = bool(self._compile_sequence_loops)
+        content['activation_config'] = natural_sort(self.__activation_config[1])
+        content['sample_rate'] = float(self.__sample_rate)
+        content['analog_levels'] = list(self.__analog_levels)
+        content['digital_levels'] = list(self.__digital_levels)
+        content['interleave'] = bool(self.__interleave)
+        content['ensembles'] = dict()
+        for seq_step in sequence:
+            if seq_step.ensemble in content['ensembles']:
+                continue
+            ensemble = self.get_ensemble(seq_step.ensemble)
+            content['ensembles'][seq_step.ensemble] = [
+                bool(ensemble.rotating_frame),
+                [(self._saved_pulse_blocks[block_name].get_dict_representation(), reps)
+                 for block_name, reps in ensemble.block_list]]
+        content_str = json.dumps(content, sort_keys=True, default=repr)
+        return hashlib.sha1(content_str.encode()).hexdigest()
+
     def _delete_waveform(self, names):
         if isinstance(names, str):
             names = [names]
@@ -1971,6 +3302,10 @@ class SequenceGeneratorLogic(GenericLogic):
         for wfm in names:
             if wfm in current_waveforms:
                 self.pulsegenerator().delete_waveform(wfm)
+        # Forget the content hashes of deleted waveforms
+        for name_tag, (wfm_hash, waveforms) in list(self._device_waveform_hashes.items()):
+            if not set(waveforms).isdisjoint(names):
+                del self._device_waveform_hashes[name_tag]
         self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
         return
 
@@ -1985,7 +3320,7 @@ class SequenceGeneratorLogic(GenericLogic):
         if nametag in self.saved_pulse_block_ensembles:
             ensemble = self.saved_pulse_block_ensembles[nametag]
             ensemble.sampling_information = dict()
-            self.save_ensemble(ensemble)
+            self._save_sampling_information(ensemble)
         return
 
     def _delete_sequence(self, names):
@@ -22,22 +22,25 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 from cycler import cycler
 import datetime
 import inspect
+import io
+import json
 import logging
 import matplotlib.pyplot as plt
 import numpy as np
 import os
+import struct
 import sys
 import time
 
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from qtpy import QtCore
 from core.module import ConfigOption
 from core.util import units
 from core.util.mutex import Mutex
 from core.util.network import netobtain
 from logic.generic_logic import GenericLogic
 from matplotlib.backends.backend_pdf import PdfPages
-from PIL import Image
-from PIL import PngImagePlugin
 
 
 class DailyLogHandler(logging.FileHandler):
@@ -127,6 +130,13 @@ class SaveLogic(GenericLogic):
     _win_data_dir = ConfigOption('win_data_directory', 'C:/Data/')
     _unix_data_dir = ConfigOption('unix_data_directory', 'Data')
     log_into_daily_directory = ConfigOption('log_into_daily_directory', False, missing='warn')
+    # Number of worker threads writing data and rendering figures saved with save_data_async
+    _save_workers = ConfigOption('save_workers', 1, missing='nothing')
+
+    # Emitted by save_data_async jobs with the job id and the path of the saved data file
+    sigDataSaved = QtCore.Signal(int, str)
+    # Emitted by save_data_async jobs with the job id and the error message if saving failed
+    sigSaveFailed = QtCore.Signal(int, str)
 
     # Matplotlib style definition for saving plots
     mpl_qd_style = {
@@ -193,6 +203,11 @@ class SaveLogic(GenericLogic):
 
         self._daily_loghandler = None
 
+        # worker pool and pending jobs of save_data_async
+        self._save_pool = None
+        self._save_jobs = dict()
+        self._save_job_count = 0
+
     def on_activate(self):
         """ Definition, configuration and initialisation of the SaveLogic.
         """
@@ -208,7 +223,12 @@ class SaveLogic(GenericLogic):
         else:
             self._daily_loghandler = None
 
+        self._save_pool = ThreadPoolExecutor(max_workers=max(1, int(self._save_workers)))
+
     def on_deactivate(self):
+        # write all pending data of save_data_async before deactivation
+        self._save_pool.shutdown(wait=True)
+        self._save_pool = None
         if self._daily_loghandler is not None:
             # removes the log handler logging into the daily directory
             logging.getLogger().removeHandler(self._daily_loghandler)
@@ -275,7 +295,10 @@ class SaveLogic(GenericLogic):
                                    filename and a timestamp, because then the timestamp will be
                                    ignored.
         @param string filetype: optional, the file format the data should be saved in. Valid inputs
-                                are 'text', 'xml' and 'npz'. Default is 'text'.
+                                are 'text', 'npz' and 'npy'. Default is 'text'.
+                                'npy' saves each data item as binary .npy file and the header and
+                                parameters in a JSON file. Rows can be appended later on with
+                                append_data and the data can be read back with load_data.
         @param string or list of strings fmt: optional, format specifier for saved data. See python
                                               documentation for
                                               "Format Specification Mini-Language". If you want for
@@ -320,6 +343,174 @@ class SaveLogic(GenericLogic):
         YOU ARE RESPONSIBLE FOR THE IDENTIFIER! DO NOT FORGET THE UNITS FOR THE SAVED TIME
         TRACE/MATRIX.
         """
+        return self._save_data(data, module_name=self._get_calling_module_name(),
+                               filepath=filepath, parameters=parameters, filename=filename,
+                               filelabel=filelabel, timestamp=timestamp, filetype=filetype,
+                               fmt=fmt, delimiter=delimiter, plotfig=plotfig)
+
+    def save_data_async(self, data, filepath=None, parameters=None, filename=None, filelabel=None,
+                        timestamp=None, filetype='text', fmt='%.15e', delimiter='\t',
+                        plotfig=None):
+        """
+        Asynchronous version of save_data. Takes a snapshot of the data and parameters and returns
+        immediately. Writing the data and rendering the figure is done by a pool of worker threads
+        (ConfigOption "save_workers"). All pending jobs are written before the SaveLogic is
+        deactivated.
+
+        The figure is rendered to PDF and PNG in the calling thread before the job is submitted,
+        since pyplot is not thread-safe. It is closed afterwards.
+
+        See save_data for a description of the parameters.
+
+        @return int: The id of the save job. It is emitted by sigDataSaved (together with the path
+                     of the data file) upon completion or by sigSaveFailed (together with the error
+                     message) upon failure. -1 if the job could not be submitted.
+        """
+        if timestamp is None:
+            timestamp = datetime.datetime.now()
+        module_name = self._get_calling_module_name()
+        # Copy the data arrays since the caller may alter them in-place while the job is pending
+        data = OrderedDict((key, np.array(netobtain(value), copy=True))
+                           for key, value in data.items())
+        if isinstance(parameters, dict):
+            # Only copy the dict itself, the values are formatted into the header by the job
+            parameters = parameters.copy()
+        if plotfig is not None:
+            plotfig = self._render_figure(plotfig, module_name, timestamp)
+
+        with self.lock:
+            if self._save_pool is None:
+                self.log.error('Unable to save data asynchronously. SaveLogic is not active.')
+                return -1
+            self._save_job_count += 1
+            job_id = self._save_job_count
+            future = self._save_pool.submit(self._save_data, data, module_name=module_name,
+                                            filepath=filepath, parameters=parameters,
+                                            filename=filename, filelabel=filelabel,
+                                            timestamp=timestamp, filetype=filetype, fmt=fmt,
+                                            delimiter=delimiter, plotfig=plotfig)
+            self._save_jobs[job_id] = future
+        future.add_done_callback(lambda f: self._save_job_done(job_id, f))
+        return job_id
+
+    def flush(self, timeout=None):
+        """
+        Blocks until all jobs of save_data_async submitted so far are done.
+
+        @param float timeout: optional, the maximum time to wait in seconds
+
+        @return bool: True if all jobs are done, False if the timeout expired
+        """
+        with self.lock:
+            futures = list(self._save_jobs.values())
+        stop_time = None if timeout is None else time.time() + timeout
+        for future in futures:
+            try:
+                future.result(None if stop_time is None else max(stop_time - time.time(), 0))
+            except FutureTimeoutError:
+                return False
+            except:
+                pass
+        return True
+
+    def _save_job_done(self, job_id, future):
+        """
+        Callback of finished save_data_async jobs emitting sigDataSaved or sigSaveFailed.
+        """
+        with self.lock:
+            self._save_jobs.pop(job_id, None)
+        error = future.exception()
+        if error is None and not isinstance(future.result(), str):
+            # _save_data reports some failures by returning -1 instead of raising
+            error = 'No data file was written.'
+        if error is None:
+            self.sigDataSaved.emit(job_id, future.result())
+        else:
+            self.log.error('Saving data failed (job {0:d}): {1}'.format(job_id, error))
+            self.sigSaveFailed.emit(job_id, str(error))
+        return
+
+    def _render_figure(self, plotfig, module_name, timestamp):
+        """
+        Renders a matplotlib figure to PDF and PNG including the qudi metadata and closes it.
+        Must be called from the thread which created the figure, since pyplot is not thread-safe.
+
+        @param matplotlib.figure.Figure plotfig: The figure to render
+        @param str module_name: The name of the module which called save_data
+        @param datetime timestamp: The timestamp of the saved data
+
+        @return tuple(bytes, bytes): The rendered figure as PDF and PNG file content
+        """
+        # create Metadata
+        metadata = dict()
+        metadata['Title'] = 'Image produced by qudi: ' + module_name
+        metadata['Author'] = 'qudi - Software Suite'
+        metadata['Subject'] = 'Find more information on: https://github.com/Ulm-IQO/qudi'
+        metadata['Keywords'] = 'Python 3, Qt, experiment control, automation, measurement, software, framework, modular'
+        metadata['Producer'] = 'qudi - Software Suite'
+        metadata['CreationDate'] = timestamp
+        metadata['ModDate'] = timestamp
+
+        # Create the PdfPages object to which we will save the pages:
+        # The with statement makes sure that the PdfPages object is closed properly at
+        # the end of the block, even if an Exception occurs.
+        pdf_buffer = io.BytesIO()
+        with PdfPages(pdf_buffer) as pdf:
+            pdf.savefig(plotfig, bbox_inches='tight', pad_inches=0.05)
+
+            # We can also set the file's metadata via the PdfPages object:
+            pdf_metadata = pdf.infodict()
+            for x in metadata:
+                pdf_metadata[x] = metadata[x]
+
+        # PNG text chunks can only hold strings, so let's convert our times
+        metadata['CreationDate'] = metadata['CreationDate'].strftime('%Y%m%d-%H%M-%S')
+        metadata['ModDate'] = metadata['ModDate'].strftime('%Y%m%d-%H%M-%S')
+        for x in metadata:
+            # make sure every value of the metadata is a string
+            if not isinstance(metadata[x], str):
+                metadata[x] = str(metadata[x])
+
+        # save the PNG including the metadata
+        png_buffer = io.BytesIO()
+        plotfig.savefig(png_buffer, format='png', bbox_inches='tight', pad_inches=0.05,
+                        metadata=metadata)
+
+        # close matplotlib figure
+        plt.close(plotfig)
+        return pdf_buffer.getvalue(), png_buffer.getvalue()
+
+    @staticmethod
+    def _get_calling_module_name():
+        """
+        Helper method to trace back the call of save_data/save_data_async to the module which was
+        calling it.
+
+        @return str: The name of the calling module, 'UNSPECIFIED' if it could not be determined
+        """
+        try:
+            frm = inspect.stack()[2]
+            # this will get the object, which called the save_data function.
+            mod = inspect.getmodule(frm[0])
+            # that will extract the name of the class.
+            return mod.__name__.split('.')[-1]
+        except:
+            # Sometimes it is not possible to get the object which called the save_data function
+            # (such as when calling this from the console).
+            return 'UNSPECIFIED'
+
+    def _save_data(self, data, module_name, filepath=None, parameters=None, filename=None,
+                   filelabel=None, timestamp=None, filetype='text', fmt='%.15e', delimiter='\t',
+                   plotfig=None):
+        """
+        Implementation of save_data. See save_data for a description of the parameters.
+
+        @param str module_name: The name of the module which called save_data
+        @param plotfig: optional, matplotlib figure or (PDF bytes, PNG bytes) of an already
+                        rendered figure (see _render_figure)
+
+        @return str: The path of the saved data file. -1 if saving failed.
+        """
         start_time = time.time()
         # Create timestamp if none is present
         if timestamp is None:
@@ -375,18 +566,6 @@ class SaveLogic(GenericLogic):
                            'arrays only. Saving data failed!')
             return -1
 
-        # try to trace back the functioncall to the class which was calling it.
-        try:
-            frm = inspect.stack()[1]
-            # this will get the object, which called the save_data function.
-            mod = inspect.getmodule(frm[0])
-            # that will extract the name of the class.
-            module_name = mod.__name__.split('.')[-1]
-        except:
-            # Sometimes it is not possible to get the object which called the save_data function
-            # (such as when calling this from the console).
-            module_name = 'UNSPECIFIED'
-
         # determine proper file path
         if filepath is None:
             filepath = self.get_path_for_module(module_name)
@@ -436,6 +615,8 @@ class SaveLogic(GenericLogic):
                                'try to save the parameters nevertheless.')
                 header += 'not specified parameters: {0}\n'.format(parameters)
         header += '\nData:\n=====\n'
+        if not isinstance(parameters, dict):
+            parameters = dict()
 
         # write data to file
         # FIXME: Implement other file formats
@@ -482,78 +663,56 @@ class SaveLogic(GenericLogic):
             self.save_array_as_text(data=data[identifier_str], filename=filename, filepath=filepath,
                                     fmt=fmt, header=header, delimiter=delimiter, comments='#',
                                     append=False)
+            saved_path = os.path.join(filepath, filename)
+        # write each data item to a npy file and save header and parameters in a JSON file
+        elif filetype == 'npy':
+            base_filename = os.path.splitext(filename)[0]
+            columns = list()
+            for i, (keyname, arr) in enumerate(data.items()):
+                column_filename = '{0}_{1:d}.npy'.format(base_filename, i)
+                self.save_array_as_npy(data=arr, filename=column_filename, filepath=filepath)
+                columns.append({'name': keyname, 'file': column_filename})
+            metadata = {'format': 'qudi-npy',
+                        'version': 1,
+                        'module': module_name,
+                        'timestamp': timestamp.isoformat(),
+                        'poi': self.active_poi_name,
+                        'header': header + str(list(data.keys()))[1:-1],
+                        'parameters': self._to_json_compatible(parameters),
+                        'columns': columns}
+            saved_path = os.path.join(filepath, base_filename + '.json')
+            with open(saved_path, 'w') as file:
+                json.dump(metadata, file, indent=1)
         # write npz file and save parameters in textfile
         elif filetype == 'npz':
             header += str(list(data.keys()))[1:-1]
             np.savez_compressed(filepath + '/' + filename[:-4], **data)
+            saved_path = os.path.join(filepath, filename[:-4] + '.npz')
             self.save_array_as_text(data=[], filename=filename[:-4]+'_params.dat', filepath=filepath,
                                     fmt=fmt, header=header, delimiter=delimiter, comments='#',
                                     append=False)
         else:
-            self.log.error('Only saving of data as textfile and npz-file is implemented. Filetype "{0}" is not '
-                           'supported yet. Saving as textfile.'.format(filetype))
+            self.log.error('Only saving of data as textfile, npz-file and npy-files is implemented. Filetype '
+                           '"{0}" is not supported yet. Saving as textfile.'.format(filetype))
             self.save_array_as_text(data=data[identifier_str], filename=filename, filepath=filepath,
                                     fmt=fmt, header=header, delimiter=delimiter, comments='#',
                                     append=False)
+            saved_path = os.path.join(filepath, filename)
 
         #--------------------------------------------------------------------------------------------
         # Save thumbnail figure of plot
         if plotfig is not None:
-            # create Metadata
-            metadata = dict()
-            metadata['Title'] = 'Image produced by qudi: ' + module_name
-            metadata['Author'] = 'qudi - Software Suite'
-            metadata['Subject'] = 'Find more information on: https://github.com/Ulm-IQO/qudi'
-            metadata['Keywords'] = 'Python 3, Qt, experiment control, automation, measurement, software, framework, modular'
-            metadata['Producer'] = 'qudi - Software Suite'
-            if timestamp is not None:
-                metadata['CreationDate'] = timestamp
-                metadata['ModDate'] = timestamp
-            else:
-                metadata['CreationDate'] = time
-                metadata['ModDate'] = time
-
-            # determine the PDF-Filename
-            fig_fname_vector = os.path.join(filepath, filename)[:-4] + '_fig.pdf'
-
-            # Create the PdfPages object to which we will save the pages:
-            # The with statement makes sure that the PdfPages object is closed properly at
-            # the end of the block, even if an Exception occurs.
-            with PdfPages(fig_fname_vector) as pdf:
-                pdf.savefig(plotfig, bbox_inches='tight', pad_inches=0.05)
-
-                # We can also set the file's metadata via the PdfPages object:
-                pdf_metadata = pdf.infodict()
-                for x in metadata:
-                    pdf_metadata[x] = metadata[x]
-
-            # determine the PNG-Filename and save the plain PNG
-            fig_fname_image = os.path.join(filepath, filename)[:-4] + '_fig.png'
-            plotfig.savefig(fig_fname_image, bbox_inches='tight', pad_inches=0.05)
-
-            # Use Pillow (an fork for PIL) to attach metadata to the PNG
-            png_image = Image.open(fig_fname_image)
-            png_metadata = PngImagePlugin.PngInfo()
-
-            # PIL can only handle Strings, so let's convert our times
-            metadata['CreationDate'] = metadata['CreationDate'].strftime('%Y%m%d-%H%M-%S')
-            metadata['ModDate'] = metadata['ModDate'].strftime('%Y%m%d-%H%M-%S')
-
-            for x in metadata:
-                # make sure every value of the metadata is a string
-                if not isinstance(metadata[x], str):
-                    metadata[x] = str(metadata[x])
-
-                # add the metadata to the picture
-                png_metadata.add_text(x, metadata[x])
-
-            # save the picture again, this time including the metadata
-            png_image.save(fig_fname_image, "png", pnginfo=png_metadata)
-
-            # close matplotlib figure
-            plt.close(plotfig)
+            if not isinstance(plotfig, tuple):
+                plotfig = self._render_figure(plotfig, module_name, timestamp)
+            pdf_data, png_data = plotfig
+            # determine the figure filenames and write the rendered figure
+            with open(os.path.join(filepath, filename)[:-4] + '_fig.pdf', 'wb') as file:
+                file.write(pdf_data)
+            with open(os.path.join(filepath, filename)[:-4] + '_fig.png', 'wb') as file:
+                file.write(png_data)
             self.log.debug('Time needed to save data: {0:.2f}s'.format(time.time()-start_time))
             #----------------------------------------------------------------------------------
+        return saved_path
 
     def save_array_as_text(self, data, filename, filepath='', fmt='%.15e', header='',
                            delimiter='\t', comments='#', append=False):
@@ -572,6 +731,132 @@ class SaveLogic(GenericLogic):
                            comments=comments)
         return
 
+    def save_array_as_npy(self, data, filename, filepath='', append=False):
+        """
+        An Independent method, which can save a 1D or 2D numpy.ndarray as binary npy file.
+        Can append rows (along the first axis) to files created by this method. The npy header of
+        those files reserves space for the growing first dimension, so appending does not rewrite
+        the already saved data.
+        """
+        data = np.asarray(data)
+        path = os.path.join(filepath, filename)
+        if not append or not os.path.isfile(path):
+            with open(path, 'wb') as file:
+                file.write(self._npy_header(data.dtype, data.shape))
+                np.ascontiguousarray(data).tofile(file)
+            return
+
+        with open(path, 'r+b') as file:
+            version = np.lib.format.read_magic(file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+            header_length = file.tell()
+            if fortran_order or tuple(shape[1:]) != tuple(data.shape[1:]) or \
+                    len(shape) != data.ndim:
+                raise ValueError('Unable to append array of shape {0} to npy file "{1}" with shape '
+                                 '{2}.'.format(data.shape, path, shape))
+            new_header = self._npy_header(dtype, (shape[0] + data.shape[0],) + tuple(shape[1:]))
+            if len(new_header) != header_length:
+                raise ValueError('Unable to append to npy file "{0}". File has not been created by '
+                                 'SaveLogic.'.format(path))
+            file.seek(0, os.SEEK_END)
+            np.ascontiguousarray(data, dtype=dtype).tofile(file)
+            file.seek(0)
+            file.write(new_header)
+        return
+
+    def append_data(self, data, filename, filepath=''):
+        """
+        Appends rows to the data saved by save_data with filetype 'npy'.
+
+        @param dictionary data: Dictionary containing the data to be appended. Must contain the
+                                same keys as the data saved before. Each item is appended along
+                                its first axis, i.e. 1D arrays are extended and 2D arrays get
+                                additional rows.
+        @param string filename: The filename passed to save_data (or the name of its JSON file)
+        @param string filepath: optional, the path to the directory the data was saved in
+        """
+        with self.lock:
+            metadata = self._load_npy_metadata(filename, filepath)
+            columns = {column['name']: column['file'] for column in metadata['columns']}
+            if set(columns) != set(data):
+                self.log.error('Unable to append data. Data keys {0} do not match saved data keys '
+                               '{1}.'.format(list(data), list(columns)))
+                return -1
+            for keyname, arr in data.items():
+                self.save_array_as_npy(data=netobtain(arr), filename=columns[keyname],
+                                       filepath=filepath, append=True)
+        return
+
+    def load_data(self, filename, filepath='', mmap_mode=None):
+        """
+        Loads the data saved by save_data with filetype 'npy'.
+
+        @param string filename: The filename passed to save_data (or the name of its JSON file)
+        @param string filepath: optional, the path to the directory the data was saved in
+        @param str mmap_mode: optional, memory map the data arrays instead of reading them into
+                              memory (see numpy.load)
+
+        @return (OrderedDict, dict): The data dictionary as passed to save_data and the metadata
+                                     (keys 'header', 'parameters', 'module', 'timestamp', ...)
+        """
+        metadata = self._load_npy_metadata(filename, filepath)
+        data = OrderedDict()
+        for column in metadata['columns']:
+            data[column['name']] = np.load(os.path.join(filepath, column['file']),
+                                           mmap_mode=mmap_mode)
+        return data, metadata
+
+    @staticmethod
+    def _load_npy_metadata(filename, filepath=''):
+        """
+        Helper method to read the JSON file describing data saved with filetype 'npy'.
+        """
+        base_filename = os.path.splitext(filename)[0]
+        with open(os.path.join(filepath, base_filename + '.json'), 'r') as file:
+            return json.load(file)
+
+    @staticmethod
+    def _npy_header(dtype, shape):
+        """
+        Helper method to create a npy (format version 1.0) header. The header is padded to the
+        length needed for a first dimension of 20 digits, so it keeps its size when the first
+        dimension grows.
+
+        @param numpy.dtype dtype: The data type of the array
+        @param tuple shape: The shape of the array
+
+        @return bytes: The npy header incl. magic string
+        """
+        template = "{{'descr': {0!r}, 'fortran_order': False, 'shape': {1!r}, }}"
+        descr = np.lib.format.dtype_to_descr(np.dtype(dtype))
+        header = template.format(descr, tuple(shape))
+        reserved = len(template.format(descr, (10**20,) + tuple(shape[1:])))
+        # magic string (6), version (2), header length (2) and terminating newline (1)
+        header_length = reserved + 11 + (-(reserved + 11) % 64) - 10
+        header = header.ljust(header_length - 1) + '\n'
+        return b'\x93NUMPY\x01\x00' + struct.pack('<H', header_length) + header.encode('latin1')
+
+    @classmethod
+    def _to_json_compatible(cls, value):
+        """
+        Helper method to convert parameters into JSON compatible types. Unknown types are
+        converted to str.
+        """
+        if isinstance(value, dict):
+            return {str(key): cls._to_json_compatible(val) for key, val in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [cls._to_json_compatible(val) for val in value]
+        if isinstance(value, np.ndarray):
+            return cls._to_json_compatible(value.tolist())
+        if isinstance(value, np.generic):
+            return value.item()
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        return str(value)
+
     def get_daily_directory(self):
         """
         Creates the daily directory.
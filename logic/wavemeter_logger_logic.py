@@ -354,22 +354,16 @@ class WavemeterLoggerLogic(GenericLogic):
         # The end of the recent_wavelength_window is the time of the latest wavelength data
         self._recent_wavelength_window[1] = self._wavelength_data[-1][0]
 
-        # (speed-up) We only need to worry about "recent" counts, because as the count data gets
-        # very long all the earlier points will already be attached to wavelength values.
-        count_recentness = 100  # TODO: calculate this from count_freq and wavemeter refresh rate
-
         # TODO: Does this depend on things, or do we loop fast enough to get every wavelength value?
         wavelength_recentness = np.min([5, len(self._wavelength_data)])
 
-        recent_counts = np.array(self._counter_logic._data_to_save[-count_recentness:])
         recent_wavelengths = np.array(self._wavelength_data[-wavelength_recentness:])
 
-        # The latest counts are those recorded during the recent_wavelength_window
-        count_idx = [0, 0]
-        count_idx[0] = np.searchsorted(recent_counts[:, 0], self._recent_wavelength_window[0])
-        count_idx[1] = np.searchsorted(recent_counts[:, 0], self._recent_wavelength_window[1])
-
-        latest_counts = recent_counts[count_idx[0]:count_idx[1]]
+        # The latest counts are those recorded during the recent_wavelength_window.
+        # The recorder returns a view of the recorded rows, so there is no need to restrict this
+        # to "recent" counts.
+        latest_counts = self._counter_logic.data_recorder.window(self._recent_wavelength_window[0],
+                                                                 self._recent_wavelength_window[1])
 
         # Interpolate to obtain wavelength values at the times of each count
         interpolated_wavelengths = np.interp(latest_counts[:, 0],
@@ -410,7 +404,7 @@ class WavemeterLoggerLogic(GenericLogic):
         # Note: The histogram may be recalculated (bins changed, etc) from the stitched data.
         # There is no need to recompute the interpolation for the stitched data.
         if complete_histogram:
-            count_window = len(self._counter_logic._data_to_save)
+            count_window = len(self._counter_logic.data_recorder)
             self._data_index = 0
             self.log.info('Recalcutating Laser Scanning Histogram for: '
                           '{0:d} counts and {1:d} wavelength.'.format(
@@ -419,14 +413,14 @@ class WavemeterLoggerLogic(GenericLogic):
                           )
                           )
         else:
-            count_window = min(100, len(self._counter_logic._data_to_save))
+            count_window = min(100, len(self._counter_logic.data_recorder))
 
         if count_window < 2:
             time.sleep(self._logic_update_timing * 1e-3)
             self.sig_update_histogram_next.emit(False)
             return
 
-        temp = np.array(self._counter_logic._data_to_save[-count_window:])
+        temp = self._counter_logic.data_recorder.last(count_window)
 
         # only do something if there is wavelength data to work with
         if len(self._wavelength_data) > 0:
@@ -536,7 +530,7 @@ class WavemeterLoggerLogic(GenericLogic):
 
         # prepare the data in a dict or in an OrderedDict:
         data = OrderedDict()
-        data['Time (s),Signal (counts/s)'] = self._counter_logic._data_to_save
+        data['Time (s),Signal (counts/s)'] = self._counter_logic.data_recorder.get_data()
 
         # write the parameters:
         parameters = OrderedDict()
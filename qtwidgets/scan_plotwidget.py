@@ -20,8 +20,10 @@ Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
 top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
 """
 
+import numpy as np
 from pyqtgraph import PlotWidget, ImageItem, ViewBox, InfiniteLine, ROI
-from qtpy import QtCore
+from pyqtgraph import functions as fn
+from qtpy import QtCore, QtGui
 from core.util.filters import scan_blink_correction
 
 __all__ = ['ScanImageItem', 'ScanPlotWidget', 'ScanViewBox']
@@ -42,6 +44,8 @@ class ScanImageItem(ImageItem):
         self.use_blink_correction = False
         self.blink_correction_axis = 0
         self.orig_image = None
+        # (QImage, levels, lookup table) of the last rendering, see update_image_rows
+        self._rendered_with = None
         super().__init__(*args, **kwargs)
         return
 
@@ -87,6 +91,71 @@ class ScanImageItem(ImageItem):
             image = scan_blink_correction(image=image, axis=self.blink_correction_axis)
         return super().setImage(image=image, autoLevels=autoLevels, **kwargs)
 
+    def render(self):
+        """
+        pg.ImageItem method override to remember the levels and lookup table the cached QImage was
+        rendered with.
+        """
+        super().render()
+        levels = getattr(self, 'levels', None)
+        self._rendered_with = (getattr(self, 'qimage', None),
+                               None if levels is None else np.array(levels, copy=True),
+                               getattr(self, 'lut', None))
+
+    def _can_update_image_rows(self, image):
+        """
+        Checks if the rendered image can be patched by update_image_rows. This relies on pyqtgraph
+        internals, so it also checks that they are available.
+
+        @param numpy.ndarray image: the new image
+
+        @return bool: True if the rows can be patched, False if the image must be set completely
+        """
+        if not (hasattr(fn, 'makeARGB') and hasattr(fn, 'makeQImage')):
+            return False
+        qimage = getattr(self, 'qimage', None)
+        levels = getattr(self, 'levels', None)
+        if (self.image is None or qimage is None or levels is None or self.use_blink_correction
+                or getattr(self, 'autoDownsample', True)
+                or getattr(self, 'axisOrder', None) != 'row-major'
+                or np.shape(image) != self.image.shape):
+            return False
+        # The cached QImage is stale if levels or lookup table changed without re-rendering it
+        if self._rendered_with is None:
+            return False
+        rendered_qimage, rendered_levels, rendered_lut = self._rendered_with
+        return (rendered_qimage is qimage and rendered_lut is getattr(self, 'lut', None)
+                and np.array_equal(rendered_levels, levels))
+
+    def update_image_rows(self, image, start, stop):
+        """
+        Copies the rows [start, stop) of image into the displayed image and only renders these rows
+        into the already rendered image. Levels and lookup table are kept.
+        Falls back to setImage if the image can not be patched, e.g. if the shape changed, blink
+        correction is active, nothing has been rendered yet or the rendering is outdated.
+
+        @param numpy.ndarray image: the new image (row-major)
+        @param int start: the first changed row
+        @param int stop: the last changed row + 1
+        """
+        if not self._can_update_image_rows(image):
+            return self.setImage(image=image, autoLevels=False)
+        start = max(int(start), 0)
+        stop = min(int(stop), self.image.shape[0])
+        if start >= stop:
+            return
+        self.image[start:stop] = image[start:stop]
+
+        lut = self.lut(self.image) if callable(self.lut) else self.lut
+        argb, alpha = fn.makeARGB(self.image[start:stop], lut=lut, levels=self.levels)
+        rows = fn.makeQImage(argb, alpha, transpose=False)
+        painter = QtGui.QPainter(self.qimage)
+        painter.setCompositionMode(QtGui.QPainter.CompositionMode_Source)
+        painter.drawImage(0, start, rows)
+        painter.end()
+        self.update()
+        return
+
     def mouseClickEvent(self, ev):
         if not ev.double():
             pos = self.getViewBox().mapSceneToView(ev.scenePos())